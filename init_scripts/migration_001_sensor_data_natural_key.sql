@@ -0,0 +1,25 @@
+-- migration_001_sensor_data_natural_key.sql
+-- Natürlicher Schlüssel (sensor_id, measurement_timestamp) für sensor_data.
+-- Läuft bei neuen Datenbanken automatisch nach init_db.sql, bestehende Datenbanken:
+--   psql -U $DB_USER -d $DB_NAME -f init_scripts/migration_001_sensor_data_natural_key.sql
+
+\connect umwelt;
+
+-- 1. Bereits vorhandene Duplikate entfernen (der älteste Eintrag je Sensor/Zeitpunkt bleibt erhalten)
+DELETE FROM sensor_data a
+USING sensor_data b
+WHERE a.sensor_id = b.sensor_id
+  AND a.measurement_timestamp = b.measurement_timestamp
+  AND a.id > b.id;
+
+-- 2. Eindeutiger Index, enthält beide Partitionierungsspalten der Hypertable (Zeit + sensor_id)
+CREATE UNIQUE INDEX IF NOT EXISTS uq_sensor_data_sensor_id_ts
+    ON sensor_data (sensor_id, measurement_timestamp);
+
+-- 3. Aggregate über den gesamten Zeitraum neu berechnen, damit entfernte Duplikate nicht mehr mitgezählt werden
+CALL refresh_continuous_aggregate('sensor_data_hourly_avg', NULL, NULL);
+CALL refresh_continuous_aggregate('sensor_data_daily_avg', NULL, NULL);
+CALL refresh_continuous_aggregate('sensor_data_weekly_avg', NULL, NULL);
+CALL refresh_continuous_aggregate('sensor_data_monthly_avg', NULL, NULL);
+CALL refresh_continuous_aggregate('sensor_data_yearly_avg', NULL, NULL);
+CALL refresh_continuous_aggregate('sensor_data_daily_summary_agg', NULL, NULL);
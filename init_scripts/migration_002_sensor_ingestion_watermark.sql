@@ -0,0 +1,20 @@
+-- migration_002_sensor_ingestion_watermark.sql
+-- Ingestion-Watermark pro Sensor (statt nur sensor_box.last_data_fetched).
+-- Läuft bei neuen Datenbanken automatisch nach init_db.sql, bestehende Datenbanken:
+--   psql -U $DB_USER -d $DB_NAME -f init_scripts/migration_002_sensor_ingestion_watermark.sql
+
+\connect umwelt;
+
+-- 1. Tabelle: lückenlos abgerufen bis (exklusive) je Sensor
+CREATE TABLE IF NOT EXISTS sensor_ingestion_watermark (
+    sensor_id VARCHAR(50) PRIMARY KEY REFERENCES sensor (sensor_id),
+    fetched_through TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+);
+
+-- 2. Bestehende Sensoren mit dem bisherigen Box-Watermark initialisieren
+INSERT INTO sensor_ingestion_watermark (sensor_id, fetched_through)
+SELECT s.sensor_id, b.last_data_fetched
+FROM sensor s
+JOIN sensor_box b ON b.box_id = s.box_id
+ON CONFLICT (sensor_id) DO NOTHING;
@@ -0,0 +1,23 @@
+-- migration_003_ingestion_backfill_partition.sql
+-- Partition-Ledger für den parallelen Backfill (backfill_flow): ein Eintrag je (Sensor, Zeitfenster).
+-- Läuft bei neuen Datenbanken automatisch nach init_db.sql, bestehende Datenbanken:
+--   psql -U $DB_USER -d $DB_NAME -f init_scripts/migration_003_ingestion_backfill_partition.sql
+
+\connect umwelt;
+
+-- status: pending -> running -> done | failed. Nicht abgeschlossene Partitionen werden beim nächsten Lauf fortgesetzt.
+CREATE TABLE IF NOT EXISTS ingestion_backfill_partition (
+    sensor_id VARCHAR(50) NOT NULL REFERENCES sensor (sensor_id),
+    partition_from TIMESTAMP WITH TIME ZONE NOT NULL,
+    partition_to TIMESTAMP WITH TIME ZONE NOT NULL,
+    box_id VARCHAR(50) NOT NULL REFERENCES sensor_box (box_id),
+    status VARCHAR(16) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    points_inserted BIGINT NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    PRIMARY KEY (sensor_id, partition_from, partition_to)
+);
+
+CREATE INDEX IF NOT EXISTS ix_ingestion_backfill_partition_box_status
+    ON ingestion_backfill_partition (box_id, status);
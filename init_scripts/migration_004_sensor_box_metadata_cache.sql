@@ -0,0 +1,11 @@
+-- migration_004_sensor_box_metadata_cache.sql
+-- Validatoren der zuletzt synchronisierten Box-Metadaten: ETag/Last-Modified für bedingte Requests
+-- und ein Hash des Payloads (ohne lastMeasurementAt), um den DB-Sync bei unveränderten Metadaten zu überspringen.
+-- Läuft bei neuen Datenbanken automatisch nach init_db.sql, bestehende Datenbanken:
+--   psql -U $DB_USER -d $DB_NAME -f init_scripts/migration_004_sensor_box_metadata_cache.sql
+
+\connect umwelt;
+
+ALTER TABLE sensor_box ADD COLUMN IF NOT EXISTS metadata_hash VARCHAR(64);
+ALTER TABLE sensor_box ADD COLUMN IF NOT EXISTS metadata_etag VARCHAR(255);
+ALTER TABLE sensor_box ADD COLUMN IF NOT EXISTS metadata_last_modified VARCHAR(64);
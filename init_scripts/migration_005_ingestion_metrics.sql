@@ -0,0 +1,25 @@
+-- migration_005_ingestion_metrics.sql
+-- Strukturierte Metriken der Ingestion (utils/ingestion_metrics.py): eine Zeile pro Beobachtung, z.B.
+-- Latenz eines OpenSenseMap-Requests, Dauer/Größe eines DB-Writes, Punkte eines Chunks oder Daten-Lag je Sensor.
+-- Läuft bei neuen Datenbanken automatisch nach init_db.sql, bestehende Datenbanken:
+--   psql -U $DB_USER -d $DB_NAME -f init_scripts/migration_005_ingestion_metrics.sql
+
+\connect umwelt;
+
+CREATE TABLE IF NOT EXISTS ingestion_metrics (
+    time TIMESTAMP WITH TIME ZONE NOT NULL,
+    metric VARCHAR(64) NOT NULL,
+    value DOUBLE PRECISION NOT NULL,
+    sensor_id VARCHAR(50),
+    box_id VARCHAR(50),
+    flow_run_id VARCHAR(36),
+    labels JSONB
+);
+
+SELECT create_hypertable('ingestion_metrics', 'time', chunk_time_interval => INTERVAL '1 day', if_not_exists => TRUE);
+
+CREATE INDEX IF NOT EXISTS ix_ingestion_metrics_metric_time ON ingestion_metrics (metric, time DESC);
+CREATE INDEX IF NOT EXISTS ix_ingestion_metrics_sensor_time ON ingestion_metrics (sensor_id, time DESC) WHERE sensor_id IS NOT NULL;
+
+-- Metriken sind Diagnosedaten: nach 30 Tagen verwerfen
+SELECT add_retention_policy('ingestion_metrics', INTERVAL '30 days', if_not_exists => TRUE);
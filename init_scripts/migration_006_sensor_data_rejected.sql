@@ -0,0 +1,22 @@
+-- migration_006_sensor_data_rejected.sql
+-- Seitentabelle für Messwerte, die die Plausibilitätsprüfung der Ingestion (utils/plausibility.py) verwirft:
+-- Werte außerhalb des Messbereichs, Einzelausreißer und hängende Sensoren. sensor_data enthält damit nur
+-- plausible Werte, verworfene bleiben für Analysen und ein späteres Zurückspielen erhalten.
+-- Läuft bei neuen Datenbanken automatisch nach init_db.sql, bestehende Datenbanken:
+--   psql -U $DB_USER -d $DB_NAME -f init_scripts/migration_006_sensor_data_rejected.sql
+
+\connect umwelt;
+
+-- reason: range, spike oder stuck
+CREATE TABLE IF NOT EXISTS sensor_data_rejected (
+    sensor_id VARCHAR(50) NOT NULL REFERENCES sensor (sensor_id),
+    measurement_timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
+    value DOUBLE PRECISION NOT NULL,
+    reason VARCHAR(16) NOT NULL,
+    rejected_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    PRIMARY KEY (sensor_id, measurement_timestamp)
+);
+
+SELECT create_hypertable('sensor_data_rejected', 'measurement_timestamp', chunk_time_interval => INTERVAL '30 days', if_not_exists => TRUE);
+
+CREATE INDEX IF NOT EXISTS ix_sensor_data_rejected_reason_ts ON sensor_data_rejected (reason, measurement_timestamp DESC);
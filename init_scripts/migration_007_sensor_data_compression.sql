@@ -0,0 +1,36 @@
+-- migration_007_sensor_data_compression.sql
+-- Native Kompression für sensor_data: Segmente je sensor_id, innerhalb eines Segments nach Messzeitpunkt sortiert.
+-- Bereichsabfragen je Sensor (Statistiken, Aggregationen, Continuous-Aggregate-Refresh) lesen damit nur die
+-- komprimierten Batches des Sensors und nur die Spalten, die sie brauchen.
+-- Benötigt TimescaleDB >= 2.11 (INSERT ... ON CONFLICT in komprimierte Chunks für verspätete Daten).
+-- Läuft bei neuen Datenbanken automatisch nach init_db.sql, bestehende Datenbanken:
+--   psql -U $DB_USER -d $DB_NAME -f init_scripts/migration_007_sensor_data_compression.sql
+
+\connect umwelt;
+
+-- id steht nur in compress_orderby, weil TimescaleDB für komprimierte Chunks alle Spalten des Primärschlüssels
+-- (id, measurement_timestamp, sensor_id) in segmentby/orderby verlangt. Die Einstellungen lassen sich nach
+-- der ersten Kompression nicht mehr ändern, daher nur beim ersten Lauf setzen.
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+        FROM timescaledb_information.hypertables
+        WHERE hypertable_name = 'sensor_data' AND compression_enabled
+    ) THEN
+        ALTER TABLE sensor_data SET (
+            timescaledb.compress,
+            timescaledb.compress_segmentby = 'sensor_id',
+            timescaledb.compress_orderby = 'measurement_timestamp DESC, id'
+        );
+        RAISE INFO 'Kompression für sensor_data aktiviert.';
+    ELSE
+        RAISE INFO 'Kompression für sensor_data ist bereits aktiviert.';
+    END IF;
+END
+$$;
+
+-- Chunks (1 Tag) werden nach 7 Tagen komprimiert: die 5-Minuten-Ticks und die Refresh-Fenster der
+-- stündlichen/täglichen Aggregate liegen davor. Verspätete Daten in komprimierten Chunks schreibt die
+-- Ingestion direkt (ON CONFLICT), die Policy komprimiert solche teilweise komprimierten Chunks erneut.
+SELECT add_compression_policy('sensor_data', compress_after => INTERVAL '7 days', if_not_exists => TRUE);
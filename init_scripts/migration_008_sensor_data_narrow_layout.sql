@@ -0,0 +1,186 @@
+-- migration_008_sensor_data_narrow_layout.sql
+-- Schmales Zeilenlayout für sensor_data: (sensor_key, measurement_timestamp, value) statt
+-- (id, sensor_id VARCHAR(50), value, measurement_timestamp). sensor_key ist ein kompakter INTEGER-Schlüssel
+-- aus der Tabelle sensor, die damit als Wörterbuch für die OpenSenseMap-IDs dient. Die Surrogat-ID und die
+-- Einzelindizes auf measurement_timestamp und sensor_id entfallen, einziger Index ist
+-- (sensor_key, measurement_timestamp DESC): Schlüssel für ON CONFLICT und Zugriffspfad für alle
+-- Bereichsabfragen je Sensor ("neueste Werte zuerst").
+-- Die Hypertable wird ohne Space-Partitionierung neu angelegt (Zeit-Chunks von 1 Tag), bestehende Daten
+-- werden übernommen, die Continuous Aggregates auf sensor_key umgestellt und neu berechnet.
+-- Läuft bei neuen Datenbanken automatisch nach init_db.sql, bestehende Datenbanken:
+--   psql -U $DB_USER -d $DB_NAME -f init_scripts/migration_008_sensor_data_narrow_layout.sql
+
+\connect umwelt;
+
+-- 1. Wörterbuch: kompakter Schlüssel je Sensor (bestehende Zeilen werden beim Hinzufügen durchnummeriert)
+ALTER TABLE sensor ADD COLUMN IF NOT EXISTS sensor_key INTEGER GENERATED BY DEFAULT AS IDENTITY;
+CREATE UNIQUE INDEX IF NOT EXISTS uq_sensor_sensor_key ON sensor (sensor_key);
+
+-- 2. sensor_data umbauen, solange noch das alte Layout mit sensor_id vorliegt
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1
+        FROM information_schema.columns
+        WHERE table_name = 'sensor_data' AND column_name = 'sensor_id'
+    ) THEN
+        -- Die Continuous Aggregates hängen an der alten Tabelle und werden unten neu angelegt
+        DROP MATERIALIZED VIEW IF EXISTS sensor_data_hourly_avg;
+        DROP MATERIALIZED VIEW IF EXISTS sensor_data_daily_avg;
+        DROP MATERIALIZED VIEW IF EXISTS sensor_data_weekly_avg;
+        DROP MATERIALIZED VIEW IF EXISTS sensor_data_monthly_avg;
+        DROP MATERIALIZED VIEW IF EXISTS sensor_data_yearly_avg;
+        DROP MATERIALIZED VIEW IF EXISTS sensor_data_daily_summary_agg;
+
+        CREATE TABLE sensor_data_narrow (
+            sensor_key INTEGER NOT NULL REFERENCES sensor (sensor_key),
+            measurement_timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
+            value DOUBLE PRECISION NOT NULL
+        );
+        PERFORM create_hypertable(
+            'sensor_data_narrow',
+            'measurement_timestamp',
+            chunk_time_interval => INTERVAL '1 day',
+            create_default_indexes => FALSE
+        );
+        CREATE UNIQUE INDEX uq_sensor_data_sensor_key_ts
+            ON sensor_data_narrow (sensor_key, measurement_timestamp DESC);
+
+        INSERT INTO sensor_data_narrow (sensor_key, measurement_timestamp, value)
+        SELECT s.sensor_key, d.measurement_timestamp, d.value
+        FROM sensor_data d
+        JOIN sensor s ON s.sensor_id = d.sensor_id
+        WHERE d.value IS NOT NULL
+        ON CONFLICT DO NOTHING;
+
+        DROP TABLE sensor_data;
+        ALTER TABLE sensor_data_narrow RENAME TO sensor_data;
+        RAISE INFO 'sensor_data auf das schmale Layout umgestellt.';
+    ELSE
+        RAISE INFO 'sensor_data hat bereits das schmale Layout.';
+    END IF;
+END
+$$;
+
+-- 3. Continuous Aggregates je sensor_key (gleiche Buckets wie in init_db.sql)
+CREATE MATERIALIZED VIEW IF NOT EXISTS sensor_data_hourly_avg
+WITH (timescaledb.continuous) AS
+SELECT
+    time_bucket('1 hour', measurement_timestamp) AS hour,
+    sensor_key,
+    AVG(value) AS average_value
+FROM sensor_data
+GROUP BY 1, 2
+WITH NO DATA;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS sensor_data_daily_avg
+WITH (timescaledb.continuous) AS
+SELECT
+    time_bucket('1 day', measurement_timestamp) AS day,
+    sensor_key,
+    AVG(value) AS average_value
+FROM sensor_data
+GROUP BY 1, 2
+WITH NO DATA;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS sensor_data_weekly_avg
+WITH (timescaledb.continuous) AS
+SELECT
+    time_bucket('1 week', measurement_timestamp) AS week,
+    sensor_key,
+    AVG(value) AS average_value
+FROM sensor_data
+GROUP BY 1, 2
+WITH NO DATA;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS sensor_data_monthly_avg
+WITH (timescaledb.continuous) AS
+SELECT
+    time_bucket('1 month', measurement_timestamp) AS month,
+    sensor_key,
+    AVG(value) AS average_value
+FROM sensor_data
+GROUP BY 1, 2
+WITH NO DATA;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS sensor_data_yearly_avg
+WITH (timescaledb.continuous) AS
+SELECT
+    time_bucket('1 year', measurement_timestamp) AS year,
+    sensor_key,
+    AVG(value) AS average_value
+FROM sensor_data
+GROUP BY 1, 2
+WITH NO DATA;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS sensor_data_daily_summary_agg
+WITH (timescaledb.continuous) AS
+SELECT
+    time_bucket('1 day', measurement_timestamp) AS day,
+    sensor_key,
+    MIN(value) AS min_value,
+    MAX(value) AS max_value,
+    AVG(value) AS average_value,
+    COUNT(*) AS count
+FROM sensor_data
+GROUP BY 1, 2
+WITH NO DATA;
+
+SELECT add_continuous_aggregate_policy('sensor_data_hourly_avg',
+  start_offset => INTERVAL '3 hours',
+  end_offset => INTERVAL '1 hour',
+  schedule_interval => INTERVAL '5 minutes',
+  if_not_exists => TRUE);
+
+SELECT add_continuous_aggregate_policy('sensor_data_daily_avg',
+  start_offset => INTERVAL '3 days',
+  end_offset => INTERVAL '1 day',
+  schedule_interval => INTERVAL '15 minutes',
+  if_not_exists => TRUE);
+
+SELECT add_continuous_aggregate_policy('sensor_data_weekly_avg',
+  start_offset => INTERVAL '3 weeks',
+  end_offset => INTERVAL '1 week',
+  schedule_interval => INTERVAL '1 hour',
+  if_not_exists => TRUE);
+
+SELECT add_continuous_aggregate_policy('sensor_data_monthly_avg',
+  start_offset => INTERVAL '3 months',
+  end_offset => INTERVAL '1 month',
+  schedule_interval => INTERVAL '6 hours',
+  if_not_exists => TRUE);
+
+SELECT add_continuous_aggregate_policy('sensor_data_daily_summary_agg',
+  start_offset => INTERVAL '3 days',
+  end_offset => INTERVAL '1 day',
+  schedule_interval => INTERVAL '15 minutes',
+  if_not_exists => TRUE);
+
+-- 4. Kompression wie in migration_007, segmentiert nach sensor_key. Ohne Surrogat-ID braucht
+-- compress_orderby keine zusätzliche Spalte mehr.
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+        FROM timescaledb_information.hypertables
+        WHERE hypertable_name = 'sensor_data' AND compression_enabled
+    ) THEN
+        ALTER TABLE sensor_data SET (
+            timescaledb.compress,
+            timescaledb.compress_segmentby = 'sensor_key',
+            timescaledb.compress_orderby = 'measurement_timestamp DESC'
+        );
+        RAISE INFO 'Kompression für sensor_data aktiviert.';
+    END IF;
+END
+$$;
+
+SELECT add_compression_policy('sensor_data', compress_after => INTERVAL '7 days', if_not_exists => TRUE);
+
+-- 5. Aggregate über den gesamten Zeitraum füllen (bei erneutem Lauf ohne Änderungen schnell)
+CALL refresh_continuous_aggregate('sensor_data_hourly_avg', NULL, NULL);
+CALL refresh_continuous_aggregate('sensor_data_daily_avg', NULL, NULL);
+CALL refresh_continuous_aggregate('sensor_data_weekly_avg', NULL, NULL);
+CALL refresh_continuous_aggregate('sensor_data_monthly_avg', NULL, NULL);
+CALL refresh_continuous_aggregate('sensor_data_yearly_avg', NULL, NULL);
+CALL refresh_continuous_aggregate('sensor_data_daily_summary_agg', NULL, NULL);
@@ -0,0 +1,81 @@
+-- migration_009_sensor_data_rollups.sql
+-- Hierarchische Rollups für sensor_data mit 1 Minute, 1 Stunde und 1 Tag Auflösung. Statt eines Mittelwerts
+-- speichern sie Anzahl, Summe, Quadratsumme, Minimum und Maximum je Sensor und Bucket. Diese Größen lassen sich
+-- verlustfrei zu gröberen Buckets zusammenfassen (Mittelwert = Summe / Anzahl, Standardabweichung aus
+-- Quadratsumme), daher baut jede Stufe auf der feineren auf statt erneut die Rohdaten zu lesen.
+-- Benötigt TimescaleDB >= 2.9 (Continuous Aggregates auf Continuous Aggregates).
+-- Läuft bei neuen Datenbanken automatisch nach init_db.sql, bestehende Datenbanken:
+--   psql -U $DB_USER -d $DB_NAME -f init_scripts/migration_009_sensor_data_rollups.sql
+
+\connect umwelt;
+
+-- 1. Minuten-Rollup direkt aus sensor_data
+CREATE MATERIALIZED VIEW IF NOT EXISTS sensor_data_rollup_1m
+WITH (timescaledb.continuous, timescaledb.materialized_only = true) AS
+SELECT
+    time_bucket('1 minute', measurement_timestamp) AS bucket,
+    sensor_key,
+    COUNT(*) AS value_count,
+    SUM(value) AS value_sum,
+    SUM(value * value) AS value_sumsq,
+    MIN(value) AS value_min,
+    MAX(value) AS value_max
+FROM sensor_data
+GROUP BY 1, 2
+WITH NO DATA;
+
+-- 2. Stunden-Rollup aus dem Minuten-Rollup
+CREATE MATERIALIZED VIEW IF NOT EXISTS sensor_data_rollup_1h
+WITH (timescaledb.continuous, timescaledb.materialized_only = true) AS
+SELECT
+    time_bucket('1 hour', bucket) AS bucket,
+    sensor_key,
+    CAST(SUM(value_count) AS BIGINT) AS value_count,
+    SUM(value_sum) AS value_sum,
+    SUM(value_sumsq) AS value_sumsq,
+    MIN(value_min) AS value_min,
+    MAX(value_max) AS value_max
+FROM sensor_data_rollup_1m
+GROUP BY 1, 2
+WITH NO DATA;
+
+-- 3. Tages-Rollup aus dem Stunden-Rollup
+CREATE MATERIALIZED VIEW IF NOT EXISTS sensor_data_rollup_1d
+WITH (timescaledb.continuous, timescaledb.materialized_only = true) AS
+SELECT
+    time_bucket('1 day', bucket) AS bucket,
+    sensor_key,
+    CAST(SUM(value_count) AS BIGINT) AS value_count,
+    SUM(value_sum) AS value_sum,
+    SUM(value_sumsq) AS value_sumsq,
+    MIN(value_min) AS value_min,
+    MAX(value_max) AS value_max
+FROM sensor_data_rollup_1h
+GROUP BY 1, 2
+WITH NO DATA;
+
+-- 4. Refresh-Policies. Ein Refresh materialisiert nur invalidierte Bereiche, ein weites start_offset kostet
+-- ohne verspätete Daten also kaum etwas und fängt Nachlieferungen nach Ausfällen der Ingestion ab.
+-- Jede Stufe endet mindestens eine Bucket-Größe der feineren Stufe vor deren Ende.
+SELECT add_continuous_aggregate_policy('sensor_data_rollup_1m',
+  start_offset => INTERVAL '2 days',
+  end_offset => INTERVAL '1 minute',
+  schedule_interval => INTERVAL '5 minutes',
+  if_not_exists => TRUE);
+
+SELECT add_continuous_aggregate_policy('sensor_data_rollup_1h',
+  start_offset => INTERVAL '7 days',
+  end_offset => INTERVAL '1 hour',
+  schedule_interval => INTERVAL '15 minutes',
+  if_not_exists => TRUE);
+
+SELECT add_continuous_aggregate_policy('sensor_data_rollup_1d',
+  start_offset => INTERVAL '30 days',
+  end_offset => INTERVAL '1 day',
+  schedule_interval => INTERVAL '1 hour',
+  if_not_exists => TRUE);
+
+-- 5. Bestand materialisieren, von fein nach grob (bei erneutem Lauf ohne Änderungen schnell)
+CALL refresh_continuous_aggregate('sensor_data_rollup_1m', NULL, NULL);
+CALL refresh_continuous_aggregate('sensor_data_rollup_1h', NULL, NULL);
+CALL refresh_continuous_aggregate('sensor_data_rollup_1d', NULL, NULL);
@@ -0,0 +1,17 @@
+-- migration_010_sensor_data_retention.sql
+-- Gestufte Aufbewahrung für sensor_data: Rohdaten (und das gleich feine sensor_data_rollup_1m) bleiben nur für ein
+-- konfigurierbares Fenster erhalten, ältere Zeiträume liegen danach nur noch in sensor_data_rollup_1h und _1d vor.
+-- Die Chunks löscht der Prefect-Flow flows/retention.py, nachdem er geprüft hat, dass die Rollups den Zeitraum
+-- vollständig abdecken (keine add_retention_policy, die ohne diese Prüfung löschen würde).
+-- Diese Tabelle hält den Horizont fest: ab retained_from liegen die Rohdaten vollständig vor. Abfragen lesen
+-- Zeiträume davor aus den Rollups, Inserts und Refreshes der Continuous Aggregates bleiben oberhalb des Horizonts.
+-- Läuft bei neuen Datenbanken automatisch nach init_db.sql, bestehende Datenbanken:
+--   psql -U $DB_USER -d $DB_NAME -f init_scripts/migration_010_sensor_data_retention.sql
+
+\connect umwelt;
+
+CREATE TABLE IF NOT EXISTS sensor_data_retention (
+    hypertable_name VARCHAR(63) PRIMARY KEY,
+    retained_from TIMESTAMP WITH TIME ZONE NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+);
@@ -0,0 +1,189 @@
+# services/backend/app/api/v1/endpoints/ingest.py
+import asyncio
+import logging
+import secrets
+from datetime import timedelta
+from typing import Tuple
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+import numpy as np
+import pandas as pd
+
+from core.config import settings
+from utils.db_session import engine, get_db
+from utils.ingest_parsing import (
+    IngestPayloadError,
+    UnsupportedIngestFormatError,
+    ValidatedMeasurements,
+    read_measurement_frame,
+    validate_measurements
+)
+from shared.crud import crud_sensor
+from shared.plausibility import STUCK_LOOKBACK, anchor_from_context, classify_measurements, rule_for_unit
+from shared.schemas import sensor as sensor_schema
+
+router = APIRouter()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Backpressure: höchstens INGEST_MAX_CONCURRENT_WRITES gleichzeitige Bulk-Writes pro Prozess,
+# weitere Uploads warten bis INGEST_QUEUE_TIMEOUT_SECONDS und bekommen danach 503 + Retry-After
+_write_slots = asyncio.Semaphore(settings.INGEST_MAX_CONCURRENT_WRITES)
+
+
+def _require_ingest_token(x_ingest_token: str | None = Header(None)) -> None:
+    """
+    Schreibzugriff nur mit X-Ingest-Token == INGEST_API_TOKEN (der Endpunkt ist über Caddy öffentlich erreichbar).
+    Ohne konfiguriertes Token ist die Push-Ingestion deaktiviert (403), ein fehlendes oder falsches Token ergibt 401.
+    """
+    if not settings.INGEST_API_TOKEN:
+        raise HTTPException(status_code=403, detail="Push-Ingestion ist deaktiviert (INGEST_API_TOKEN nicht gesetzt)")
+    if x_ingest_token is None or not secrets.compare_digest(x_ingest_token.encode(), settings.INGEST_API_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Ungültiges oder fehlendes X-Ingest-Token", headers={"WWW-Authenticate": "X-Ingest-Token"})
+
+
+async def _read_body_limited(request: Request) -> bytes:
+    """ Liest den Request-Body und bricht mit 413 ab, sobald INGEST_MAX_BODY_BYTES überschritten ist. """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.INGEST_MAX_BODY_BYTES:
+        raise HTTPException(status_code=413, detail=f"Request Body größer als {settings.INGEST_MAX_BODY_BYTES} Bytes")
+
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > settings.INGEST_MAX_BODY_BYTES:
+            raise HTTPException(status_code=413, detail=f"Request Body größer als {settings.INGEST_MAX_BODY_BYTES} Bytes")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def _filter_implausible(db: Session, validated: ValidatedMeasurements) -> Tuple[ValidatedMeasurements, int]:
+    """
+    Plausibilitätsprüfung wie beim Abruf der OpenSenseMap: je Sensor Regel zur Einheit und letzter gespeicherter
+    Messwert als Anker. Verworfene Zeilen werden nach sensor_data_rejected geschrieben (ohne Commit, gemeinsam
+    mit dem COPY der übrigen Zeilen). Gibt die plausiblen Zeilen und die Anzahl verworfener Zeilen zurück.
+    """
+    keep = np.ones(len(validated), dtype=bool)
+    for sensor_id in np.unique(validated.sensor_ids):
+        rows = validated.sensor_ids == sensor_id
+        context = crud_sensor.sensor_data.get_plausibility_context(db, sensor_id=sensor_id, lookback=STUCK_LOOKBACK)
+        rule = rule_for_unit(context.get("unit")) if context else None
+        if rule is None:
+            continue
+        timestamps, values = validated.timestamps[rows], validated.values[rows]
+        reasons = classify_measurements(timestamps, values, rule, anchor_from_context(context))
+        rejected = reasons != ""
+        if rejected.any():
+            crud_sensor.sensor_data_rejected.create_multi_columnar(
+                db,
+                sensor_id=sensor_id,
+                measurement_timestamps=timestamps[rejected],
+                values=values[rejected],
+                reasons=reasons[rejected]
+            )
+            keep[np.flatnonzero(rows)[rejected]] = False
+    return validated._replace(
+        sensor_ids=validated.sensor_ids[keep],
+        timestamps=validated.timestamps[keep],
+        values=validated.values[keep]
+    ), int((~keep).sum())
+
+
+def _validate_and_write(db: Session, body: bytes, media_type: str, on_conflict: str) -> sensor_schema.SensorDataIngestResult:
+    """
+    Parsen, spaltenweise validieren, unplausible Werte aussortieren und per COPY schreiben (läuft im Threadpool).
+    Danach werden wie beim Abruf Messwerte vor dem Fenster der Refresh-Policies in die Continuous Aggregates übernommen.
+    """
+    frame = read_measurement_frame(body, media_type)
+    if len(frame) > settings.INGEST_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Mehr als {settings.INGEST_MAX_ROWS} Messwerte pro Request")
+
+    max_timestamp = pd.Timestamp.now(tz="UTC") + timedelta(seconds=settings.INGEST_MAX_FUTURE_SKEW_SECONDS)
+    validated = validate_measurements(
+        frame,
+        known_sensor_ids=lambda sensor_ids: crud_sensor.sensor.get_existing_ids(db, sensor_ids=sensor_ids),
+        max_timestamp=max_timestamp
+    )
+
+    accepted = len(validated)
+    implausible = 0
+    if len(validated) and settings.PLAUSIBILITY_FILTER_ENABLED:
+        validated, implausible = _filter_implausible(db, validated)
+
+    inserted = 0
+    if len(validated):
+        # Commit schließt die verworfenen Zeilen in sensor_data_rejected mit ein
+        inserted = crud_sensor.sensor_data.create_multi_columnar(
+            db,
+            sensor_id=validated.sensor_ids,
+            measurement_timestamps=validated.timestamps,
+            values=validated.values,
+            on_conflict=on_conflict
+        )
+        earliest_written = pd.Timestamp(validated.timestamps.min()).tz_localize("UTC").to_pydatetime()
+        horizon = crud_sensor.continuous_aggregate.refresh_late_writes(db, engine, earliest_written=earliest_written)
+        if horizon is not None:
+            logger.info(f"Push-Ingestion: Messwerte ab {earliest_written} bis {horizon} in die Continuous Aggregates übernommen.")
+    elif implausible:
+        db.commit()
+
+    return sensor_schema.SensorDataIngestResult(
+        received=len(frame),
+        accepted=accepted,
+        inserted=inserted,
+        rejected_invalid=validated.invalid_count,
+        rejected_unknown_sensor=validated.unknown_count,
+        rejected_implausible=implausible,
+        unknown_sensor_ids=validated.unknown_sensor_ids
+    )
+
+
+# --- POST Endpunkte (Push von lokalen Geräten) ---
+
+@router.post(
+    "/sensor_data/batch",
+    response_model=sensor_schema.SensorDataIngestResult,
+    dependencies=[Depends(_require_ingest_token)]
+)
+async def ingest_sensor_data_batch(
+    request: Request,
+    db: Session = Depends(get_db),
+    on_conflict: str = Query("nothing", pattern="^(nothing|update)$")
+):
+    """
+    Nimmt gebatchte Messwerte beliebig vieler Sensoren als NDJSON (ein Objekt pro Zeile) oder
+    Arrow IPC-Stream entgegen (Spalten sensor_id, measurement_timestamp bzw. createdAt, value)
+    und schreibt die gültigen Zeilen in einem COPY. Ungültige Zeilen und unbekannte Sensoren werden
+    verworfen und gezählt. Erfordert den Header X-Ingest-Token (auch für on_conflict=update,
+    das gespeicherte Messwerte überschreibt).
+    """
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    body = await _read_body_limited(request)
+
+    try:
+        await asyncio.wait_for(_write_slots.acquire(), timeout=settings.INGEST_QUEUE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        logger.warning("Push-Ingestion ausgelastet, Request wird mit 503 abgelehnt.")
+        raise HTTPException(
+            status_code=503,
+            detail="Ingestion ausgelastet, bitte später erneut senden",
+            headers={"Retry-After": str(settings.INGEST_RETRY_AFTER_SECONDS)}
+        )
+
+    try:
+        result = await run_in_threadpool(_validate_and_write, db, body, media_type, on_conflict)
+    except UnsupportedIngestFormatError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except IngestPayloadError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    finally:
+        _write_slots.release()
+
+    logger.info(
+        f"Push-Ingestion: {result.received} empfangen, {result.inserted} geschrieben, "
+        f"{result.rejected_invalid} ungültig, {result.rejected_unknown_sensor} unbekannter Sensor, "
+        f"{result.rejected_implausible} unplausibel."
+    )
+    return result
@@ -4,7 +4,7 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi_cache.decorator import cache
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, timezone
 
 from utils.db_session import get_db
 from shared.crud import crud_sensor
@@ -161,7 +161,7 @@ def read_sensor_data_aggregate(
     from_date: datetime = Query(..., alias="from-date", description="Start date for aggregation (RFC3339 format)"),
     to_date: datetime = Query(..., alias="to-date", description="End date for aggregation (RFC3339 format)"),
     interval: str = Query(..., description="Aggregation interval (e.g., '5m', '15m', '1h', '1d', '1w', '1M')"),
-    aggregation_type: str = Query(..., description="Type of aggregation ('avg', 'min', 'max', 'count', 'sum')"),
+    aggregation_type: str = Query(..., description="Type of aggregation ('avg', 'min', 'max', 'count', 'sum', 'stddev')"),
     smoothing_window: Optional[int] = Query(None, gt=0, description="Optional: Window size for smoothing on aggregated data"),
     interpolation_method: Optional[str] = Query(None, description="Optional: Method for gap filling ('linear', 'locf')"),
     db: Session = Depends(get_db)
@@ -177,11 +177,36 @@ def read_sensor_data_aggregate(
     if db_sensor is None:
         raise HTTPException(status_code=404, detail="Sensor not found")
 
-    use_continuous_aggregate = False
-    aggregated_data = []
+    try:
+        aggregated_data = crud_sensor.sensor_data.get_aggregated_data_from_continuous_aggregates(
+            db,
+            sensor_id=sensor_id,
+            from_date=from_date,
+            to_date=to_date,
+            interval=interval,
+            aggregation_type=aggregation_type,
+            smoothing_window=smoothing_window,
+            interpolation_method=interpolation_method
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    use_continuous_aggregate = aggregated_data is not None
+    if use_continuous_aggregate:
+        logger.info(f"Serving sensor {sensor_id} from rollups (raw data only for partial/unmaterialized buckets)")
 
     # Wenn keine passende kontinuierliche Aggregation verwendet wurde oder Fehler auftraten
     if not use_continuous_aggregate:
+        # Vor dem Aufbewahrungshorizont liegen nur noch Rollups vor, der Rohdatenpfad fände dort keine Messwerte
+        retained_from = crud_sensor.sensor_data_retention.get_retained_from(db)
+        from_utc = from_date if from_date.tzinfo is not None else from_date.replace(tzinfo=timezone.utc)
+        if retained_from is not None and from_utc < retained_from:
+            raise HTTPException(
+                status_code=400,
+                detail=(
+                    f"Rohdaten liegen erst ab {retained_from.isoformat()} vor (Aufbewahrungshorizont). Davor sind nur "
+                    "Intervalle ab einer Minute ohne interpolation_method möglich, from-date muss sonst am Horizont oder danach liegen."
+                )
+            )
         logger.info(f"Falling back to raw data aggregation for sensor {sensor_id}")
         try:
             aggregated_data = crud_sensor.sensor_data.get_aggregated_data_by_sensor_id( 
@@ -22,6 +22,16 @@ class Settings(BaseSettings):
     INITIAL_TIME_WINDOW_IN_DAYS: int = 365
     FETCH_TIME_WINDOW_DAYS: int = 4
 
+    # Push-Ingestion (api/v1/endpoints/ingest.py)
+    INGEST_MAX_BODY_BYTES: int = 16 * 1024 * 1024
+    INGEST_MAX_ROWS: int = 200_000
+    INGEST_MAX_CONCURRENT_WRITES: int = 4       # Gleichzeitige Bulk-Writes pro Prozess
+    INGEST_QUEUE_TIMEOUT_SECONDS: float = 5.0   # Maximale Wartezeit auf einen Write-Slot, danach 503
+    INGEST_RETRY_AFTER_SECONDS: int = 5
+    INGEST_MAX_FUTURE_SKEW_SECONDS: int = 300   # Zeitstempel dürfen höchstens so weit in der Zukunft liegen
+    INGEST_API_TOKEN: str | None = None         # Header X-Ingest-Token, ohne Token ist der Push-Endpunkt deaktiviert
+    PLAUSIBILITY_FILTER_ENABLED: bool = True    # Unplausible Push-Messwerte nach sensor_data_rejected verschieben (shared/plausibility.py)
+
     def __init__(self, **values):
         super().__init__(**values)
         safe_password = quote_plus(self.DB_PASSWORD)
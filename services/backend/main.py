@@ -19,6 +19,7 @@ from shared.crud import crud_sensor
 # Router
 from api.v1.endpoints import sensors as sensors_router
 from api.v1.endpoints import predictions as predictions_router
+from api.v1.endpoints import ingest as ingest_router
 
 # Importiere FastAPICache und Redis Backend
 from fastapi_cache import FastAPICache
@@ -154,5 +155,6 @@ def perform_healthcheck():
 
 app.include_router(sensors_router.router, prefix="/api/v1", tags=["sensors"])
 app.include_router(predictions_router.router, prefix="/api/v1", tags=["predictions"])
+app.include_router(ingest_router.router, prefix="/api/v1", tags=["ingest"])
 app.include_router(health_router, prefix="/api", tags=["health-check"])
 
@@ -0,0 +1,106 @@
+# utils/ingest_parsing.py
+
+import io
+from typing import Callable, Iterable, List, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/jsonl", "application/ndjson")
+ARROW_MEDIA_TYPES = ("application/vnd.apache.arrow.stream",)
+
+# Spaltennamen im Upload; createdAt wird wie bei der OpenSenseMap API als Zeitstempel akzeptiert
+TIMESTAMP_COLUMNS = ("measurement_timestamp", "createdAt")
+SENSOR_ID_MAX_LENGTH = 50 # VARCHAR(50) in sensor_data
+
+
+class IngestPayloadError(ValueError):
+    """ Upload kann nicht als Messwert-Tabelle gelesen werden (Format oder Pflichtspalten). """
+
+
+class UnsupportedIngestFormatError(IngestPayloadError):
+    """ Content-Type wird nicht unterstützt. """
+
+
+class ValidatedMeasurements(NamedTuple):
+    """ Spaltenweise validierte Messwerte eines Uploads. """
+    sensor_ids: np.ndarray  # object (str)
+    timestamps: np.ndarray  # datetime64[ns], UTC
+    values: np.ndarray      # float64
+    invalid_count: int      # Ungültige sensor_id, Zeitstempel oder Wert bzw. Zeitstempel zu weit in der Zukunft
+    unknown_count: int      # Sensor existiert nicht
+    unknown_sensor_ids: List[str]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+def read_measurement_frame(body: bytes, media_type: str) -> pd.DataFrame:
+    """
+    Liest einen Upload als DataFrame mit den Spalten sensor_id, measurement_timestamp und value.
+    NDJSON: ein Objekt pro Zeile. Arrow: IPC-Stream mit einer Tabelle (benötigt pyarrow).
+    """
+    if media_type in NDJSON_MEDIA_TYPES:
+        if not body.strip():
+            return pd.DataFrame(columns=["sensor_id", "measurement_timestamp", "value"])
+        try:
+            # dtype=False: IDs und Zeitstempel bleiben Strings, Konvertierung erfolgt in validate_measurements
+            frame = pd.read_json(io.BytesIO(body), lines=True, dtype=False, convert_dates=False)
+        except ValueError as e:
+            raise IngestPayloadError(f"Ungültiges NDJSON: {e}") from e
+    elif media_type in ARROW_MEDIA_TYPES:
+        try:
+            import pyarrow.ipc # optional, nur für Arrow-Uploads nötig
+        except ImportError as e:
+            raise UnsupportedIngestFormatError("Arrow-Uploads werden nicht unterstützt (pyarrow nicht installiert).") from e
+        try:
+            frame = pyarrow.ipc.open_stream(body).read_all().to_pandas()
+        except Exception as e:
+            raise IngestPayloadError(f"Ungültiger Arrow-Stream: {e}") from e
+    else:
+        raise UnsupportedIngestFormatError(f"Nicht unterstützter Content-Type '{media_type}'.")
+
+    timestamp_column = next((c for c in TIMESTAMP_COLUMNS if c in frame.columns), None)
+    missing = [c for c in ("sensor_id", "value") if c not in frame.columns] + ([] if timestamp_column else ["measurement_timestamp"])
+    if missing:
+        raise IngestPayloadError(f"Pflichtspalten fehlen: {', '.join(missing)}")
+    return frame.rename(columns={timestamp_column: "measurement_timestamp"})[["sensor_id", "measurement_timestamp", "value"]]
+
+
+def validate_measurements(
+    frame: pd.DataFrame,
+    known_sensor_ids: Callable[[Iterable[str]], set],
+    max_timestamp: pd.Timestamp,
+    max_unknown_ids: int = 20
+) -> ValidatedMeasurements:
+    """
+    Validiert alle Zeilen spaltenweise (ohne Objekt pro Messwert): sensor_id nicht leer und höchstens
+    50 Zeichen, Zeitstempel parsebar (ohne Offset gilt UTC) und nicht nach max_timestamp, Wert endlich.
+    known_sensor_ids bekommt die eindeutigen IDs und liefert die existierenden zurück.
+    """
+    sensor_ids = frame["sensor_id"].astype("string")
+    timestamps = pd.to_datetime(frame["measurement_timestamp"], utc=True, errors="coerce", format="ISO8601")
+    values = pd.to_numeric(frame["value"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+    valid = (
+        sensor_ids.notna().to_numpy()
+        & (sensor_ids.str.len().fillna(0).to_numpy() > 0)
+        & (sensor_ids.str.len().fillna(0).to_numpy() <= SENSOR_ID_MAX_LENGTH)
+        & timestamps.notna().to_numpy()
+        & (timestamps <= max_timestamp).fillna(False).to_numpy()
+        & np.isfinite(values)
+    )
+
+    candidate_ids = sensor_ids[valid].unique()
+    existing = known_sensor_ids([str(sid) for sid in candidate_ids])
+    known = sensor_ids.isin(existing).to_numpy() & valid
+    unknown_ids = sorted(str(sid) for sid in candidate_ids if sid not in existing)
+
+    return ValidatedMeasurements(
+        sensor_ids=sensor_ids[known].to_numpy(dtype=object),
+        timestamps=timestamps[known].dt.tz_convert(None).to_numpy(dtype="datetime64[ns]"),
+        values=values[known],
+        invalid_count=int((~valid).sum()),
+        unknown_count=int((valid & ~known).sum()),
+        unknown_sensor_ids=unknown_ids[:max_unknown_ids]
+    )
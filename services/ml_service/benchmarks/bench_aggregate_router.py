@@ -0,0 +1,147 @@
+# benchmarks/bench_aggregate_router.py
+#
+# Prüft den Rollup-Router (CRUDSensorData.get_aggregated_data_from_continuous_aggregates) gegen
+# den Rohdatenpfad (get_aggregated_data_by_sensor_id) und misst beide. Für jede Kombination aus Sensor, Intervall,
+# Aggregationstyp und Zeitraum müssen dieselben Buckets mit denselben Werten (relative Toleranz wegen
+# Gleitkomma-Summen) und derselben Anzahl herauskommen. Die Zeiträume enden bewusst
+# nicht auf Bucket-Grenzen, damit Kopf und Rest aus den Rohdaten mitgeprüft werden.
+# Liest nur, schreibt nichts. Abweichungen können auch aus Buckets stammen, die nach verspätet geschriebenen
+# Daten noch nicht neu materialisiert wurden (refresh_continuous_aggregate bzw. nächster Policy-Lauf).
+# Zeiträume vor dem Aufbewahrungshorizont der Rohdaten (flows/retention.py) werden übersprungen.
+#
+# Aufruf im Worker-Container:
+#   uv run python benchmarks/bench_aggregate_router.py --sensors 5 --runs 3
+
+import os
+import sys
+import math
+import time
+import argparse
+import statistics
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.db_utils import SessionLocal
+from shared.crud import crud_sensor
+
+INTERVALS = ["5m", "15m", "1h", "6h", "1d", "1w", "14 days", "1 month", "1 year"]
+AGGREGATION_TYPES = ["avg", "min", "max", "count", "sum", "stddev"]
+# Die Standardabweichung aus Quadratsummen verliert bei großem Mittelwert und kleiner Streuung Stellen
+REL_TOLERANCE = {"stddev": 1e-6}
+RANGES = [timedelta(days=7, hours=5), timedelta(days=95, hours=7), timedelta(days=400, hours=3)]
+
+
+def _sensor_ids(db, n: int) -> list:
+    # Sensoren mit den meisten Messwerten laut Tages-Rollup
+    rows = db.execute(
+        text(
+            "SELECT s.sensor_id FROM sensor_data_rollup_1d r JOIN sensor s ON s.sensor_key = r.sensor_key "
+            "GROUP BY s.sensor_id ORDER BY sum(r.value_count) DESC LIMIT :n"
+        ),
+        {"n": n}
+    )
+    return [row.sensor_id for row in rows]
+
+
+def _as_float(value):
+    return float(value) if value is not None else None
+
+
+def _compare(raw: list, routed: list, aggregation_type: str) -> list:
+    """ Liste der Abweichungen als Text, leer bei Übereinstimmung. """
+    raw_by_bucket = {row["time_bucket"]: row for row in raw}
+    routed_by_bucket = {row["time_bucket"]: row for row in routed}
+    problems = []
+    if raw_by_bucket.keys() != routed_by_bucket.keys():
+        missing = sorted(raw_by_bucket.keys() - routed_by_bucket.keys())
+        extra = sorted(routed_by_bucket.keys() - raw_by_bucket.keys())
+        problems.append(f"Buckets: {len(missing)} fehlen (z.B. {missing[:1]}), {len(extra)} zusätzlich (z.B. {extra[:1]})")
+    for bucket in sorted(raw_by_bucket.keys() & routed_by_bucket.keys()):
+        expected = _as_float(raw_by_bucket[bucket]["aggregated_value"])
+        actual = _as_float(routed_by_bucket[bucket]["aggregated_value"])
+        if (expected is None) != (actual is None) or (
+            expected is not None and not math.isclose(expected, actual, rel_tol=REL_TOLERANCE.get(aggregation_type, 1e-9), abs_tol=1e-6)
+        ):
+            problems.append(f"{bucket}: Wert {actual} statt {expected}")
+        routed_count = routed_by_bucket[bucket]["count"]
+        if routed_count is not None and int(routed_count) != int(raw_by_bucket[bucket]["count"]):
+            problems.append(f"{bucket}: Anzahl {routed_count} statt {raw_by_bucket[bucket]['count']}")
+    return problems
+
+
+def _timed(fn, runs: int):
+    timings, result = [], None
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - t0)
+    return result, statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Prüfung und Benchmark: Rollup-Router vs. Rohdaten")
+    parser.add_argument("--sensors", type=int, default=5)
+    parser.add_argument("--sensor-ids", nargs="*", default=None)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    if SessionLocal is None:
+        raise RuntimeError("Keine Datenbankverbindung konfiguriert.")
+
+    db = SessionLocal()
+    failures = 0
+    try:
+        sensor_ids = args.sensor_ids or _sensor_ids(db, args.sensors)
+        to_date = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(minutes=7)
+        retained_from = crud_sensor.sensor_data_retention.get_retained_from(db)
+
+        print(f"{'Intervall':>9} | {'Typ':>6} | {'Zeitraum':>9} | {'Abfragen':>8} | {'Geroutet':>8} | "
+              f"{'Roh [ms]':>9} | {'Router [ms]':>11} | {'Faktor':>6} | {'Fehler':>6}")
+        for interval in INTERVALS:
+            for aggregation_type in AGGREGATION_TYPES:
+                for span in RANGES:
+                    from_date = to_date - span
+                    if retained_from is not None and from_date < retained_from:
+                        continue
+                    raw_ms, routed_ms, routed_count, errors = [], [], 0, 0
+                    for sensor_id in sensor_ids:
+                        params = dict(
+                            sensor_id=sensor_id, from_date=from_date, to_date=to_date,
+                            interval=interval, aggregation_type=aggregation_type
+                        )
+                        raw, raw_s = _timed(lambda: crud_sensor.sensor_data.get_aggregated_data_by_sensor_id(db, **params), args.runs)
+                        routed, routed_s = _timed(
+                            lambda: crud_sensor.sensor_data.get_aggregated_data_from_continuous_aggregates(db, **params), args.runs
+                        )
+                        if routed is None:
+                            continue
+                        routed_count += 1
+                        raw_ms.append(raw_s * 1000)
+                        routed_ms.append(routed_s * 1000)
+                        problems = _compare(raw, routed, aggregation_type)
+                        if problems:
+                            errors += 1
+                            print(f"  ABWEICHUNG {sensor_id} {interval} {aggregation_type} {from_date} -> {to_date}: {problems[:3]}")
+                    failures += errors
+                    if routed_count:
+                        raw_median, routed_median = statistics.median(raw_ms), statistics.median(routed_ms)
+                        print(f"{interval:>9} | {aggregation_type:>6} | {span.days:>7} d | {len(sensor_ids):>8} | {routed_count:>8} | "
+                              f"{raw_median:>9.1f} | {routed_median:>11.1f} | {raw_median / routed_median:>5.1f}x | {errors:>6}")
+                    else:
+                        print(f"{interval:>9} | {aggregation_type:>6} | {span.days:>7} d | {len(sensor_ids):>8} | {0:>8} | "
+                              f"{'-':>9} | {'-':>11} | {'-':>6} | {'-':>6}")
+    finally:
+        db.rollback()
+        db.close()
+
+    if failures:
+        print(f"\n{failures} Abfragen weichen vom Rohdatenpfad ab.")
+        sys.exit(1)
+    print("\nAlle gerouteten Abfragen stimmen mit dem Rohdatenpfad überein.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# benchmarks/bench_compression.py
+#
+# Scan-Latenz und Plattenplatz von sensor_data vor und nach der nativen Kompression
+# (init_scripts/migration_007_sensor_data_compression.sql). Synthetische Messwerte mehrerer Sensoren
+# werden in einen Zeitraum im Jahr 2000 geschrieben, dessen Chunks nur Benchmark-Daten enthalten.
+# Gemessen werden die Bereichsabfragen des Backends auf den Rohdaten (get_aggregated_data_by_sensor_id,
+# _get_statistics_from_raw, die Rollups enthalten die Benchmark-Chunks nicht)
+# sowie die Größe der betroffenen Chunks.
+# Bricht ab, wenn der Aufbewahrungshorizont (flows/retention.py) nach dem Jahr 2000 liegt: Inserts davor werden
+# verworfen und die Abfragen lesen dort aus den Rollups, gemessen würde also nichts.
+#
+# Aufruf im Worker-Container (schreibt in die konfigurierte Datenbank und räumt danach auf):
+#   uv run python benchmarks/bench_compression.py --sensors 8 --days 90 --interval-seconds 60 --runs 5
+
+import os
+import sys
+import time
+import argparse
+import statistics
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import text
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.db_utils import SessionLocal
+from shared.crud import crud_sensor
+from shared.schemas import sensor as sensor_schema
+
+BENCH_BOX_ID = "benchmark-box"
+BENCH_SENSOR_PREFIX = "benchmark-compress-"
+BENCH_START = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+_BENCH_CHUNKS_SQL = """
+SELECT format('%I.%I', chunk_schema, chunk_name) AS chunk
+FROM timescaledb_information.chunks
+WHERE hypertable_name = 'sensor_data' AND range_start >= :window_start AND range_end <= :window_end
+"""
+
+
+def _sensor_ids(n: int) -> list:
+    return [f"{BENCH_SENSOR_PREFIX}{i}" for i in range(n)]
+
+
+def _setup(db, sensor_ids: list) -> None:
+    now = datetime.now(timezone.utc)
+    if not crud_sensor.sensor_box.get(db, id=BENCH_BOX_ID):
+        crud_sensor.sensor_box.create(db, obj_in=sensor_schema.SensorBoxCreate(
+            box_id=BENCH_BOX_ID, name=BENCH_BOX_ID, createdAt=now, updatedAt=now
+        ))
+    for sensor_id in sensor_ids:
+        if not crud_sensor.sensor.get(db, id=sensor_id):
+            crud_sensor.sensor.create(db, obj_in=sensor_schema.SensorCreate(
+                sensor_id=sensor_id, box_id=BENCH_BOX_ID, sensor_type="benchmark", unit="°C"
+            ))
+
+
+def _cleanup(db, sensor_ids: list, window_end: datetime) -> None:
+    # Die Chunks im Jahr 2000 enthalten nur Benchmark-Daten und werden komplett entfernt
+    db.execute(
+        text("SELECT drop_chunks('sensor_data', older_than => CAST(:window_end AS timestamptz), newer_than => CAST(:window_start AS timestamptz))"),
+        {"window_start": BENCH_START, "window_end": window_end}
+    )
+    db.execute(
+        text("DELETE FROM sensor_data WHERE sensor_key IN (SELECT sensor_key FROM sensor WHERE sensor_id = ANY(:sids))"),
+        {"sids": sensor_ids}
+    )
+    db.execute(text("DELETE FROM sensor WHERE sensor_id = ANY(:sids)"), {"sids": sensor_ids})
+    db.execute(text("DELETE FROM sensor_box WHERE box_id = :bid AND NOT EXISTS (SELECT 1 FROM sensor WHERE box_id = :bid)"), {"bid": BENCH_BOX_ID})
+    db.commit()
+
+
+def _load(db, sensor_ids: list, days: int, interval_seconds: int) -> int:
+    n = int(days * 86400 / interval_seconds)
+    timestamps = np.datetime64(BENCH_START.replace(tzinfo=None), "ns") + np.arange(n) * np.timedelta64(interval_seconds, "s")
+    rng = np.random.default_rng(42)
+    for sensor_id in sensor_ids:
+        # Tagesgang plus Rauschen, auf 0.01 gerundet wie typische OpenSenseMap-Werte
+        hours = np.arange(n) * interval_seconds / 3600
+        values = np.round(12 + 8 * np.sin(2 * np.pi * hours / 24) + rng.normal(0, 0.5, n), 2)
+        crud_sensor.sensor_data.create_multi_columnar(db, sensor_id=sensor_id, measurement_timestamps=timestamps, values=values)
+    return n * len(sensor_ids)
+
+
+def _bench_chunks(db, window_end: datetime) -> list:
+    return [row.chunk for row in db.execute(text(_BENCH_CHUNKS_SQL), {"window_start": BENCH_START, "window_end": window_end})]
+
+
+def _size_bytes(db, chunks: list, compressed: bool) -> int:
+    if compressed:
+        sql = ("SELECT COALESCE(sum(after_compression_total_bytes), 0) FROM chunk_compression_stats('sensor_data') "
+               "WHERE format('%I.%I', chunk_schema, chunk_name) = ANY(:chunks)")
+    else:
+        sql = ("SELECT COALESCE(sum(total_bytes), 0) FROM chunks_detailed_size('sensor_data') "
+               "WHERE format('%I.%I', chunk_schema, chunk_name) = ANY(:chunks)")
+    return int(db.execute(text(sql), {"chunks": chunks}).scalar())
+
+
+def _measure_scans(db, sensor_ids: list, window_end: datetime, runs: int) -> dict:
+    query_from = BENCH_START
+    query_to = min(window_end, BENCH_START + timedelta(days=30))
+    timings = {"aggregated_1h": [], "statistics": []}
+    for _ in range(runs):
+        for sensor_id in sensor_ids:
+            t0 = time.perf_counter()
+            crud_sensor.sensor_data.get_aggregated_data_by_sensor_id(
+                db, sensor_id=sensor_id, from_date=query_from, to_date=query_to, interval="1 hour", aggregation_type="avg"
+            )
+            timings["aggregated_1h"].append(time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            crud_sensor.sensor_data._get_statistics_from_raw(db, sensor_id=sensor_id, from_date=BENCH_START, to_date=window_end)
+            timings["statistics"].append(time.perf_counter() - t0)
+    return {name: statistics.median(values) for name, values in timings.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark: sensor_data vor und nach der Kompression")
+    parser.add_argument("--sensors", type=int, default=8)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--interval-seconds", type=int, default=60)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    if SessionLocal is None:
+        raise RuntimeError("Keine Datenbankverbindung konfiguriert.")
+
+    sensor_ids = _sensor_ids(args.sensors)
+    window_end = BENCH_START + timedelta(days=args.days)
+
+    db = SessionLocal()
+    retained_from = crud_sensor.sensor_data_retention.get_retained_from(db)
+    if retained_from is not None and retained_from > BENCH_START:
+        db.close()
+        print(f"Aufbewahrungshorizont {retained_from} liegt nach {BENCH_START}, Benchmark-Daten würden verworfen. Abbruch.")
+        sys.exit(1)
+
+    try:
+        _setup(db, sensor_ids)
+        rows = _load(db, sensor_ids, args.days, args.interval_seconds)
+        db.execute(text("ANALYZE sensor_data"))
+        db.commit()
+        chunks = _bench_chunks(db, window_end)
+        print(f"{rows:,} Messwerte in {len(chunks)} Chunks ({args.sensors} Sensoren, {args.days} Tage)")
+
+        size_before = _size_bytes(db, chunks, compressed=False)
+        scans_before = _measure_scans(db, sensor_ids, window_end, args.runs)
+
+        t0 = time.perf_counter()
+        for chunk in chunks:
+            db.execute(text("SELECT compress_chunk(CAST(:chunk AS regclass), if_not_compressed => TRUE)"), {"chunk": chunk})
+        db.commit()
+        compress_seconds = time.perf_counter() - t0
+
+        size_after = _size_bytes(db, chunks, compressed=True)
+        scans_after = _measure_scans(db, sensor_ids, window_end, args.runs)
+
+        print(f"Kompression aller Chunks: {compress_seconds:.1f} s")
+        print(f"\n{'':>16} | {'Vorher':>12} | {'Nachher':>12} | {'Faktor':>7}")
+        print(f"{'Größe [MB]':>16} | {size_before / 1e6:>12.1f} | {size_after / 1e6:>12.1f} | {size_before / max(size_after, 1):>6.1f}x")
+        for name in scans_before:
+            before_ms, after_ms = scans_before[name] * 1000, scans_after[name] * 1000
+            print(f"{name + ' [ms]':>16} | {before_ms:>12.1f} | {after_ms:>12.1f} | {before_ms / after_ms:>6.1f}x")
+    finally:
+        db.rollback()
+        _cleanup(db, sensor_ids, window_end)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
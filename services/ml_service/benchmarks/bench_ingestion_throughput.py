@@ -0,0 +1,145 @@
+# benchmarks/bench_ingestion_throughput.py
+#
+# End-to-End-Durchsatz der Ingestion (HTTP -> Parsen -> COPY) gegen den lokalen OpenSenseMap-Ersatz
+# (benchmarks/osm_standin.py), ohne das öffentliche API-Limit zu belasten. Startet den Ersatz als
+# Subprozess, lädt alle Boxen über ingest_box im Dask Task Runner und misst gespeicherte Messwerte pro Sekunde.
+#
+# Aufruf im Worker-Container (schreibt in die konfigurierte Datenbank und räumt danach auf):
+#   uv run python benchmarks/bench_ingestion_throughput.py --boxes 4 --sensors-per-box 5 --days 30 --latency-ms 50
+#   uv run python benchmarks/bench_ingestion_throughput.py --recordings ./http_recordings --days 30
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+from typing import List
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark: Ingestion-Durchsatz gegen lokalen OpenSenseMap-Ersatz")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--boxes", type=int, default=2)
+    parser.add_argument("--sensors-per-box", type=int, default=5)
+    parser.add_argument("--interval-seconds", type=float, default=60.0)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--padding-bytes", type=int, default=0)
+    parser.add_argument("--recordings", default=None, help="Aufzeichnungsverzeichnis statt synthetischer Daten")
+    parser.add_argument("--days", type=int, default=30, help="Abgerufener Zeitraum (initial_fetch_days)")
+    parser.add_argument("--fetch-chunk-days", type=int, default=4)
+    parser.add_argument("--max-chunks-in-flight", type=int, default=3)
+    parser.add_argument("--max-boxes-in-flight", type=int, default=4)
+    parser.add_argument("--no-adaptive", action="store_true", help="Feste Chunkgröße statt adaptiver Planung")
+    return parser.parse_args()
+
+
+def _start_standin(args: argparse.Namespace) -> subprocess.Popen:
+    cmd = [
+        sys.executable, os.path.join(os.path.dirname(__file__), "osm_standin.py"),
+        "--port", str(args.port),
+        "--boxes", str(args.boxes),
+        "--sensors-per-box", str(args.sensors_per_box),
+        "--interval-seconds", str(args.interval_seconds),
+        "--history-days", str(args.days + 1),
+        "--latency-ms", str(args.latency_ms),
+        "--padding-bytes", str(args.padding_bytes)
+    ]
+    if args.recordings:
+        cmd += ["--recordings", args.recordings]
+    process = subprocess.Popen(cmd)
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("OpenSenseMap-Ersatz konnte nicht gestartet werden.")
+        try:
+            with socket.create_connection(("127.0.0.1", args.port), timeout=0.5):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("OpenSenseMap-Ersatz antwortet nicht.")
+
+
+def main() -> None:
+    args = _parse_args()
+
+    # Settings werden beim Import gelesen: API-URL auf den Ersatz umbiegen, kein Rate Limit, kein Replay
+    os.environ["OSM_API_URL"] = f"http://127.0.0.1:{args.port}"
+    os.environ["OSM_RATE_LIMIT_PER_SECOND"] = "0"
+    os.environ["HTTP_REPLAY_MODE"] = "off"
+
+    from sqlalchemy import text
+    from prefect import flow
+    from prefect_dask.task_runners import DaskTaskRunner
+
+    from flows.data_ingestion import ingest_box
+    from tasks.fetch_data import fetch_boxes_metadata
+    from utils.config import settings
+    from utils.db_utils import SessionLocal
+
+    if SessionLocal is None:
+        raise RuntimeError("Keine Datenbankverbindung konfiguriert.")
+
+    @flow(name="bench-ingestion-throughput", task_runner=DaskTaskRunner(cluster_kwargs={"n_workers": settings.DASK_N_WORKERS}))
+    async def bench_flow() -> List[str]:
+        boxes = await fetch_boxes_metadata(box_ids=None, bbox="-180,-90,180,90")
+        box_slots = asyncio.Semaphore(max(1, args.max_boxes_in_flight))
+
+        async def run_box(metadata):
+            async with box_slots:
+                await ingest_box(
+                    metadata["_id"],
+                    metadata,
+                    initial_fetch_days=args.days,
+                    fetch_chunk_days=args.fetch_chunk_days,
+                    max_chunks_in_flight=args.max_chunks_in_flight,
+                    adaptive_chunking=not args.no_adaptive
+                )
+
+        await asyncio.gather(*(run_box(metadata) for metadata in boxes))
+        return [metadata["_id"] for metadata in boxes]
+
+    def cleanup(db, box_ids: List[str]) -> None:
+        params = {"box_ids": list(box_ids)}
+        sensor_ids = "SELECT sensor_id FROM sensor WHERE box_id = ANY(:box_ids)"
+        sensor_keys = "SELECT sensor_key FROM sensor WHERE box_id = ANY(:box_ids)"
+        db.execute(text(f"DELETE FROM sensor_data WHERE sensor_key IN ({sensor_keys})"), params)
+        db.execute(text(f"DELETE FROM sensor_data_rejected WHERE sensor_id IN ({sensor_ids})"), params)
+        db.execute(text(f"DELETE FROM sensor_ingestion_watermark WHERE sensor_id IN ({sensor_ids})"), params)
+        db.execute(text("DELETE FROM sensor WHERE box_id = ANY(:box_ids)"), params)
+        db.execute(text("DELETE FROM sensor_box WHERE box_id = ANY(:box_ids)"), params)
+        db.commit()
+
+    process = _start_standin(args)
+    db = SessionLocal()
+    box_ids: List[str] = []
+    try:
+        t0 = time.perf_counter()
+        box_ids = asyncio.run(bench_flow())
+        elapsed = time.perf_counter() - t0
+
+        sensors, rows = db.execute(
+            text(
+                "SELECT count(DISTINCT s.sensor_id), count(d.sensor_key) FROM sensor s "
+                "LEFT JOIN sensor_data d ON d.sensor_key = s.sensor_key WHERE s.box_id = ANY(:box_ids)"
+            ),
+            {"box_ids": box_ids}
+        ).one()
+
+        print(f"{'Boxen':>6} | {'Sensoren':>8} | {'Messwerte':>12} | {'Dauer [s]':>10} | {'Messwerte/s':>12}")
+        print(f"{len(box_ids):>6} | {sensors:>8} | {rows:>12,} | {elapsed:>10.2f} | {rows / elapsed:>12,.0f}")
+    finally:
+        if box_ids:
+            cleanup(db, box_ids)
+        db.close()
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/bench_measurement_parsing.py
+#
+# Micro-Benchmark: Kosten pro Messwert für das Parsen eines API-Chunks.
+#   alt: parse_api_datetime + float() + astimezone + SensorDataCreate pro Punkt
+#   neu: utils.measurement_parsing.parse_measurements (vektorisiert, spaltenweise)
+#
+# Benötigt keine Datenbank:
+#   uv run python benchmarks/bench_measurement_parsing.py --sizes 1000 10000 100000
+
+import os
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.parse_datetime import parse_api_datetime
+from utils.measurement_parsing import parse_measurements
+from shared.schemas import sensor as sensor_schema
+
+SENSOR_ID = "benchmark-sensor"
+
+
+def _synthetic_measurements(n: int, invalid_ratio: float = 0.01):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    invalid_every = int(1 / invalid_ratio) if invalid_ratio else 0
+    measurements = []
+    for i in range(n):
+        created_at = (start + timedelta(seconds=60 * i)).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+        value = f"{(i % 400) / 10.0:.2f}"
+        if invalid_every and i % invalid_every == 0:
+            value = "n/a"
+        measurements.append({"value": value, "createdAt": created_at})
+    return measurements
+
+
+def parse_per_point(measurements):
+    """ Bisheriger Pfad aus fetch_store_sensor_chunk (ohne Logging). """
+    parsed = []
+    for measurement in measurements:
+        try:
+            ts = parse_api_datetime(measurement.get("createdAt"))
+            val_str = measurement.get("value")
+            if ts is None or val_str is None:
+                continue
+            parsed.append(sensor_schema.SensorDataCreate(
+                sensor_id=SENSOR_ID, value=float(val_str), measurement_timestamp=ts.astimezone(timezone.utc)
+            ))
+        except (ValueError, TypeError, KeyError):
+            continue
+    return parsed
+
+
+def _best_of(fn, arg, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Micro-Benchmark: Messwert-Parsing pro Punkt vs. vektorisiert")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'Punkte':>10} | {'alt [ns/Punkt]':>15} | {'neu [ns/Punkt]':>15} | {'Faktor':>7}")
+    for n in args.sizes:
+        measurements = _synthetic_measurements(n)
+        t_old = _best_of(parse_per_point, measurements, args.repeat)
+        t_new = _best_of(parse_measurements, measurements, args.repeat)
+        print(f"{n:>10} | {t_old / n * 1e9:>15,.0f} | {t_new / n * 1e9:>15,.0f} | {t_old / t_new:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# benchmarks/bench_sensor_data_insert.py
+#
+# Vergleicht den bisherigen ORM-Pfad (SensorDataCreate + bulk_save_objects)
+# mit dem spaltenbasierten COPY-Pfad von CRUDSensorData.
+#
+# Aufruf im Worker-Container (schreibt in die konfigurierte Datenbank und räumt danach auf):
+#   uv run python benchmarks/bench_sensor_data_insert.py --sizes 10000 100000 1000000
+
+import os
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.db_utils import SessionLocal
+from shared.crud import crud_sensor
+from shared.schemas import sensor as sensor_schema
+
+BENCH_BOX_ID = "benchmark-box"
+BENCH_SENSOR_ID = "benchmark-sensor"
+
+
+def _setup(db) -> None:
+    now = datetime.now(timezone.utc)
+    if not crud_sensor.sensor_box.get(db, id=BENCH_BOX_ID):
+        crud_sensor.sensor_box.create(db, obj_in=sensor_schema.SensorBoxCreate(
+            box_id=BENCH_BOX_ID, name=BENCH_BOX_ID, createdAt=now, updatedAt=now
+        ))
+    if not crud_sensor.sensor.get(db, id=BENCH_SENSOR_ID):
+        crud_sensor.sensor.create(db, obj_in=sensor_schema.SensorCreate(
+            sensor_id=BENCH_SENSOR_ID, box_id=BENCH_BOX_ID, sensor_type="benchmark", unit="-"
+        ))
+
+
+def _cleanup(db, drop_metadata: bool = False) -> None:
+    db.execute(
+        text("DELETE FROM sensor_data WHERE sensor_key = (SELECT sensor_key FROM sensor WHERE sensor_id = :sid)"),
+        {"sid": BENCH_SENSOR_ID}
+    )
+    if drop_metadata:
+        db.execute(text("DELETE FROM sensor WHERE sensor_id = :sid"), {"sid": BENCH_SENSOR_ID})
+        db.execute(text("DELETE FROM sensor_box WHERE box_id = :bid"), {"bid": BENCH_BOX_ID})
+    db.commit()
+
+
+def _synthetic_columns(n: int):
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    timestamps = [start + timedelta(seconds=i) for i in range(n)]
+    values = [float(i % 400) / 10.0 for i in range(n)]
+    return timestamps, values
+
+
+def bench_orm(db, timestamps, values) -> float:
+    t0 = time.perf_counter()
+    objs = [
+        sensor_schema.SensorDataCreate(sensor_id=BENCH_SENSOR_ID, value=v, measurement_timestamp=ts)
+        for ts, v in zip(timestamps, values)
+    ]
+    crud_sensor.sensor_data.create_multi(db, objs_in=objs)
+    return time.perf_counter() - t0
+
+
+def bench_copy(db, timestamps, values) -> float:
+    t0 = time.perf_counter()
+    crud_sensor.sensor_data.create_multi_columnar(
+        db, sensor_id=BENCH_SENSOR_ID, measurement_timestamps=timestamps, values=values
+    )
+    return time.perf_counter() - t0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark: ORM-Bulk-Insert vs. COPY für sensor_data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    if SessionLocal is None:
+        raise RuntimeError("Keine Datenbankverbindung konfiguriert.")
+
+    db = SessionLocal()
+    try:
+        _setup(db)
+        print(f"{'Zeilen':>10} | {'ORM [s]':>10} | {'COPY [s]':>10} | {'ORM [Zeilen/s]':>15} | {'COPY [Zeilen/s]':>15} | {'Faktor':>7}")
+        for n in args.sizes:
+            timestamps, values = _synthetic_columns(n)
+
+            _cleanup(db)
+            t_orm = bench_orm(db, timestamps, values)
+            _cleanup(db)
+            t_copy = bench_copy(db, timestamps, values)
+            _cleanup(db)
+
+            print(f"{n:>10} | {t_orm:>10.2f} | {t_copy:>10.2f} | {n / t_orm:>15,.0f} | {n / t_copy:>15,.0f} | {t_orm / t_copy:>6.1f}x")
+    finally:
+        _cleanup(db, drop_metadata=True)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# benchmarks/bench_sensor_data_layout.py
+#
+# Vergleicht das bisherige breite Zeilenlayout von sensor_data (id, sensor_id VARCHAR, value, measurement_timestamp,
+# vier Indizes, Space-Partitionierung nach sensor_id) mit dem schmalen Layout aus
+# init_scripts/migration_008_sensor_data_narrow_layout.sql (sensor_key INTEGER, measurement_timestamp, value,
+# ein Index (sensor_key, measurement_timestamp DESC)). Beide Varianten werden als eigene Hypertables angelegt,
+# per COPY befüllt und mit den typischen Bereichsabfragen je Sensor gemessen: Insert-Durchsatz, Größe von
+# Tabelle und Indizes, neueste N Werte und Zeitfenster-Scan.
+#
+# Aufruf im Worker-Container (legt nur die Benchmark-Tabellen an und entfernt sie danach wieder):
+#   uv run python benchmarks/bench_sensor_data_layout.py --sensors 50 --days 30 --interval-seconds 60 --runs 20
+
+import os
+import io
+import sys
+import time
+import argparse
+import statistics
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import text
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.db_utils import SessionLocal
+
+BENCH_START = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+LAYOUTS = {
+    "breit": {
+        "table": "bench_layout_wide",
+        "ddl": [
+            "CREATE TABLE bench_layout_wide ("
+            " id SERIAL, sensor_id VARCHAR(50) NOT NULL, value DOUBLE PRECISION,"
+            " measurement_timestamp TIMESTAMPTZ NOT NULL,"
+            " PRIMARY KEY (id, measurement_timestamp, sensor_id))",
+            "CREATE INDEX ON bench_layout_wide (measurement_timestamp)",
+            "CREATE INDEX ON bench_layout_wide (sensor_id)",
+            "SELECT create_hypertable('bench_layout_wide', 'measurement_timestamp', 'sensor_id', 8,"
+            " chunk_time_interval => INTERVAL '1 day')",
+            "CREATE UNIQUE INDEX ON bench_layout_wide (sensor_id, measurement_timestamp)",
+        ],
+        "copy": "COPY bench_layout_wide (sensor_id, value, measurement_timestamp) FROM STDIN",
+        "latest": "SELECT value, measurement_timestamp FROM bench_layout_wide WHERE sensor_id = :sensor"
+                  " ORDER BY measurement_timestamp DESC LIMIT 1000",
+        "window": "SELECT avg(value), min(value), max(value), count(*) FROM bench_layout_wide WHERE sensor_id = :sensor"
+                  " AND measurement_timestamp >= :from_date AND measurement_timestamp < :to_date",
+    },
+    "schmal": {
+        "table": "bench_layout_narrow",
+        "ddl": [
+            "CREATE TABLE bench_layout_narrow ("
+            " sensor_key INTEGER NOT NULL, measurement_timestamp TIMESTAMPTZ NOT NULL, value DOUBLE PRECISION NOT NULL)",
+            "SELECT create_hypertable('bench_layout_narrow', 'measurement_timestamp',"
+            " chunk_time_interval => INTERVAL '1 day', create_default_indexes => FALSE)",
+            "CREATE UNIQUE INDEX ON bench_layout_narrow (sensor_key, measurement_timestamp DESC)",
+        ],
+        "copy": "COPY bench_layout_narrow (sensor_key, value, measurement_timestamp) FROM STDIN",
+        "latest": "SELECT value, measurement_timestamp FROM bench_layout_narrow WHERE sensor_key = :sensor"
+                  " ORDER BY measurement_timestamp DESC LIMIT 1000",
+        "window": "SELECT avg(value), min(value), max(value), count(*) FROM bench_layout_narrow WHERE sensor_key = :sensor"
+                  " AND measurement_timestamp >= :from_date AND measurement_timestamp < :to_date",
+    },
+}
+
+
+def _sensor_label(layout: str, i: int):
+    # Breites Layout: OpenSenseMap-artige 24-stellige Hex-ID, schmales Layout: Wörterbuch-Schlüssel
+    return f"{i:024x}" if layout == "breit" else i + 1
+
+
+def _copy_payload(layout: str, sensors: int, days: int, interval_seconds: int) -> bytes:
+    n = int(days * 86400 / interval_seconds)
+    timestamps = np.datetime64(BENCH_START.replace(tzinfo=None), "ns") + np.arange(n) * np.timedelta64(interval_seconds, "s")
+    ts_strings = np.datetime_as_string(timestamps.astype("datetime64[s]"), unit="s", timezone="UTC")
+    rng = np.random.default_rng(42)
+    buffer = io.StringIO()
+    for i in range(sensors):
+        label = _sensor_label(layout, i)
+        values = np.round(12 + 8 * np.sin(2 * np.pi * np.arange(n) * interval_seconds / 86400) + rng.normal(0, 0.5, n), 2)
+        buffer.writelines(f"{label}\t{v!r}\t{ts}\n" for v, ts in zip(values.tolist(), ts_strings))
+    return buffer.getvalue().encode("utf-8")
+
+
+def _drop(db) -> None:
+    for spec in LAYOUTS.values():
+        db.execute(text(f"DROP TABLE IF EXISTS {spec['table']}"))
+    db.commit()
+
+
+def _bench_layout(db, layout: str, payload: bytes, sensors: int, days: int, runs: int) -> dict:
+    spec = LAYOUTS[layout]
+    for statement in spec["ddl"]:
+        db.execute(text(statement))
+    db.commit()
+
+    cursor = db.connection().connection.cursor()
+    try:
+        t0 = time.perf_counter()
+        cursor.copy_expert(spec["copy"], io.BytesIO(payload))
+        db.commit()
+        insert_seconds = time.perf_counter() - t0
+    finally:
+        cursor.close()
+
+    db.execute(text(f"ANALYZE {spec['table']}"))
+    db.commit()
+    rows = db.execute(text(f"SELECT count(*) FROM {spec['table']}")).scalar()
+    table_bytes, index_bytes = db.execute(
+        text("SELECT table_bytes + toast_bytes, index_bytes FROM hypertable_detailed_size(:table)"),
+        {"table": spec["table"]}
+    ).one()
+
+    window_to = BENCH_START + timedelta(days=days)
+    window_from = window_to - timedelta(days=7)
+    timings = {"latest": [], "window": []}
+    for _ in range(runs):
+        for i in range(sensors):
+            sensor = _sensor_label(layout, i)
+            t0 = time.perf_counter()
+            db.execute(text(spec["latest"]), {"sensor": sensor}).all()
+            timings["latest"].append(time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            db.execute(text(spec["window"]), {"sensor": sensor, "from_date": window_from, "to_date": window_to}).all()
+            timings["window"].append(time.perf_counter() - t0)
+
+    return {
+        "rows_per_s": rows / insert_seconds,
+        "table_mb": table_bytes / 1e6,
+        "index_mb": index_bytes / 1e6,
+        "bytes_per_row": (table_bytes + index_bytes) / max(rows, 1),
+        "latest_ms": statistics.median(timings["latest"]) * 1000,
+        "window_ms": statistics.median(timings["window"]) * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark: breites vs. schmales Zeilenlayout für sensor_data")
+    parser.add_argument("--sensors", type=int, default=50)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--interval-seconds", type=int, default=60)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    if SessionLocal is None:
+        raise RuntimeError("Keine Datenbankverbindung konfiguriert.")
+
+    db = SessionLocal()
+    try:
+        _drop(db)
+        results = {}
+        for layout in LAYOUTS:
+            payload = _copy_payload(layout, args.sensors, args.days, args.interval_seconds)
+            results[layout] = _bench_layout(db, layout, payload, args.sensors, args.days, args.runs)
+
+        print(f"{args.sensors} Sensoren, {args.days} Tage, alle {args.interval_seconds} s\n")
+        print(f"{'Layout':>8} | {'Insert [Zeilen/s]':>17} | {'Tabelle [MB]':>12} | {'Indizes [MB]':>12} | "
+              f"{'Bytes/Zeile':>11} | {'Neueste 1000 [ms]':>17} | {'7 Tage [ms]':>11}")
+        for layout, res in results.items():
+            print(f"{layout:>8} | {res['rows_per_s']:>17,.0f} | {res['table_mb']:>12.1f} | {res['index_mb']:>12.1f} | "
+                  f"{res['bytes_per_row']:>11.1f} | {res['latest_ms']:>17.2f} | {res['window_ms']:>11.2f}")
+    finally:
+        db.rollback()
+        _drop(db)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# benchmarks/bench_statistics.py
+#
+# Prüft die Rollup-gestützten Kennzahlen (CRUDSensorData.get_statistics_by_sensor_id) gegen einen einzelnen Scan
+# der Rohdaten (_get_statistics_from_raw) und misst beide in Abhängigkeit von der Länge des Zeitraums. Die Zeiträume
+# beginnen und enden bewusst mitten am Tag, damit die Randtage aus den Rohdaten mitgeprüft werden. Anzahl, Minimum
+# und Maximum müssen exakt, Mittelwert und Standardabweichung mit relativer Toleranz übereinstimmen.
+# Zeiträume vor dem Aufbewahrungshorizont der Rohdaten (flows/retention.py) werden übersprungen.
+# Liest nur, schreibt nichts.
+#
+# Aufruf im Worker-Container:
+#   uv run python benchmarks/bench_statistics.py --sensors 5 --runs 3
+
+import os
+import sys
+import math
+import time
+import argparse
+import statistics
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.db_utils import SessionLocal
+from shared.crud import crud_sensor
+
+RANGES = [
+    timedelta(hours=20), timedelta(days=3, hours=5), timedelta(days=30, hours=7),
+    timedelta(days=180, hours=3), timedelta(days=365, hours=11), timedelta(days=730, hours=2)
+]
+REL_TOLERANCE = {"average_value": 1e-9, "stddev_value": 1e-6}
+
+
+def _sensor_ids(db, n: int) -> list:
+    # Sensoren mit den meisten Messwerten laut Tages-Rollup
+    rows = db.execute(
+        text(
+            "SELECT s.sensor_id FROM sensor_data_rollup_1d r JOIN sensor s ON s.sensor_key = r.sensor_key "
+            "GROUP BY s.sensor_id ORDER BY sum(r.value_count) DESC LIMIT :n"
+        ),
+        {"n": n}
+    )
+    return [row.sensor_id for row in rows]
+
+
+def _compare(raw: dict, rollup: dict) -> list:
+    """ Liste der Abweichungen als Text, leer bei Übereinstimmung. """
+    problems = []
+    if int(raw["count"]) != int(rollup["count"]):
+        problems.append(f"Anzahl {rollup['count']} statt {raw['count']}")
+    for key in ("average_value", "min_value", "max_value", "stddev_value"):
+        expected, actual = raw[key], rollup[key]
+        if (expected is None) != (actual is None) or (
+            expected is not None and not math.isclose(float(expected), float(actual), rel_tol=REL_TOLERANCE.get(key, 0.0), abs_tol=1e-9)
+        ):
+            problems.append(f"{key} {actual} statt {expected}")
+    return problems
+
+
+def _timed(fn, runs: int):
+    timings, result = [], None
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - t0)
+    return result, statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Prüfung und Benchmark: Kennzahlen aus Rollups vs. Rohdaten")
+    parser.add_argument("--sensors", type=int, default=5)
+    parser.add_argument("--sensor-ids", nargs="*", default=None)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    if SessionLocal is None:
+        raise RuntimeError("Keine Datenbankverbindung konfiguriert.")
+
+    db = SessionLocal()
+    failures = 0
+    try:
+        sensor_ids = args.sensor_ids or _sensor_ids(db, args.sensors)
+        to_date = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(minutes=7)
+        retained_from = crud_sensor.sensor_data_retention.get_retained_from(db)
+
+        print(f"{'Zeitraum':>9} | {'Abfragen':>8} | {'Roh [ms]':>9} | {'Rollup [ms]':>11} | {'Faktor':>6} | {'Fehler':>6}")
+        for span in RANGES:
+            from_date = to_date - span
+            if retained_from is not None and from_date < retained_from:
+                print(f"{span.days:>7} d | vor dem Aufbewahrungshorizont {retained_from}, übersprungen")
+                continue
+            raw_ms, rollup_ms, errors = [], [], 0
+            for sensor_id in sensor_ids:
+                params = dict(sensor_id=sensor_id, from_date=from_date, to_date=to_date)
+                raw, raw_s = _timed(lambda: crud_sensor.sensor_data._get_statistics_from_raw(db, **params), args.runs)
+                rollup, rollup_s = _timed(lambda: crud_sensor.sensor_data.get_statistics_by_sensor_id(db, **params), args.runs)
+                raw_ms.append(raw_s * 1000)
+                rollup_ms.append(rollup_s * 1000)
+                problems = _compare(raw, rollup)
+                if problems:
+                    errors += 1
+                    print(f"  ABWEICHUNG {sensor_id} {from_date} -> {to_date}: {problems}")
+            failures += errors
+            raw_median, rollup_median = statistics.median(raw_ms), statistics.median(rollup_ms)
+            print(f"{span.days:>7} d | {len(sensor_ids):>8} | {raw_median:>9.1f} | {rollup_median:>11.1f} | "
+                  f"{raw_median / rollup_median:>5.1f}x | {errors:>6}")
+    finally:
+        db.rollback()
+        db.close()
+
+    if failures:
+        print(f"\n{failures} Abfragen weichen vom Rohdaten-Scan ab.")
+        sys.exit(1)
+    print("\nAlle Kennzahlen stimmen mit dem Rohdaten-Scan überein.")
+
+
+if __name__ == "__main__":
+    main()
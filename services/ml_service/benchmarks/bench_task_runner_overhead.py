@@ -0,0 +1,76 @@
+# benchmarks/bench_task_runner_overhead.py
+#
+# Fixkosten pro Flow-Run je Task Runner für einen typischen 5-Minuten-Tick: eine Runde mit einem
+# kleinen async Task je Sensor (simulierte I/O-Latenz statt HTTP/DB).
+#   thread: ThreadPoolTaskRunner (utils.task_runners.thread_task_runner)
+#   dask:   lokaler Dask-Cluster pro Flow-Run (bisheriger DaskTaskRunner())
+#
+# Benötigt keine Datenbank und keine API:
+#   uv run python benchmarks/bench_task_runner_overhead.py --runs 5 --sensors 10 --task-latency-ms 50
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from prefect import flow, task
+
+from utils.task_runners import dask_task_runner, thread_task_runner
+
+
+@task(name="Bench Sensor Chunk")
+async def fake_sensor_chunk(sensor_id: int, latency_s: float) -> int:
+    await asyncio.sleep(latency_s)
+    return sensor_id
+
+
+def _build_flow(runner):
+    @flow(name="bench-task-runner-overhead", task_runner=runner)
+    async def tick_flow(sensors: int, latency_s: float) -> int:
+        futures = fake_sensor_chunk.map(sensor_id=list(range(sensors)), latency_s=latency_s)
+        results = await asyncio.to_thread(futures.result)
+        return len(results)
+
+    return tick_flow
+
+
+def _measure(runner_factory, runs: int, sensors: int, latency_s: float) -> list:
+    durations = []
+    for _ in range(runs):
+        # Neuer Runner pro Lauf wie bei einem Deployment-Run (Dask startet jedes Mal einen Cluster)
+        tick_flow = _build_flow(runner_factory())
+        t0 = time.perf_counter()
+        asyncio.run(tick_flow(sensors, latency_s))
+        durations.append(time.perf_counter() - t0)
+    return durations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark: Fixkosten pro Flow-Run, ThreadPool vs. Dask")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--sensors", type=int, default=10)
+    parser.add_argument("--task-latency-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    latency_s = args.task_latency_ms / 1000
+    results = {
+        "thread": _measure(thread_task_runner, args.runs, args.sensors, latency_s),
+        "dask": _measure(dask_task_runner, args.runs, args.sensors, latency_s)
+    }
+
+    print(f"{'Runner':>8} | {'Median [s]':>10} | {'Min [s]':>8} | {'Max [s]':>8} | {'Overhead [s]':>12}")
+    for name, durations in results.items():
+        median = statistics.median(durations)
+        # Overhead: Laufzeit abzüglich der simulierten I/O-Zeit einer Runde
+        print(f"{name:>8} | {median:>10.2f} | {min(durations):>8.2f} | {max(durations):>8.2f} | {median - latency_s:>12.2f}")
+
+    saved = statistics.median(results["dask"]) - statistics.median(results["thread"])
+    print(f"\nErsparnis pro Run mit ThreadPoolTaskRunner: {saved:.2f} s (Median, {args.runs} Runs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+# benchmarks/osm_standin.py
+#
+# Lokaler Ersatz für die OpenSenseMap API (nur die von der Ingestion genutzten Endpunkte):
+#   GET /boxes?bbox=...                  -> alle Boxen
+#   GET /boxes/{box_id}                  -> Box-Metadaten inkl. Sensoren
+#   GET /boxes/{box_id}/data/{sensor_id} -> Messwerte im Fenster [from-date, to-date], neueste zuerst
+#
+# Daten sind entweder synthetisch (deterministisch) oder stammen aus Aufzeichnungen von utils/http_replay.py.
+#   uv run python benchmarks/osm_standin.py --boxes 10 --sensors-per-box 5 --interval-seconds 60 --latency-ms 50
+#   uv run python benchmarks/osm_standin.py --recordings ./http_recordings
+
+import os
+import re
+import sys
+import json
+import math
+import asyncio
+import argparse
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Tuple
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.http_replay import RecordingStore
+from utils.parse_datetime import parse_api_datetime
+
+_BOX_PATH = re.compile(r"^/boxes/(?P<box_id>[^/]+)$")
+_DATA_PATH = re.compile(r"^/boxes/(?P<box_id>[^/]+)/data/(?P<sensor_id>[^/]+)$")
+
+# Anzahl Messwerte pro gestreamtem Stück der Antwort
+_STREAM_CHUNK_POINTS = 500
+
+
+@dataclass
+class StandinConfig:
+    boxes: int = 1
+    sensors_per_box: int = 5
+    interval_seconds: float = 60.0      # Abstand synthetischer Messwerte (bestimmt die Datendichte)
+    history_days: int = 365             # Synthetische Daten reichen so weit zurück
+    latency_ms: float = 0.0             # Künstliche Latenz vor jeder Antwort
+    max_points: int = 10_000            # API-Limit pro Antwort
+    padding_bytes: int = 0              # Zusätzliches Feld pro Messwert, um die Payload zu vergrößern
+    recordings: str | None = None
+    now: datetime = field(default_factory=lambda: datetime.now(timezone.utc).replace(microsecond=0))
+
+
+def _object_id(prefix: int, index: int) -> str:
+    """ 24-stellige Hex-ID im Format der OpenSenseMap (MongoDB ObjectId). """
+    return f"{prefix:08x}{index:016x}"
+
+
+def _format_ts(ts: datetime) -> str:
+    return ts.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+class SyntheticSource:
+    """ Deterministische Boxen und Messwerte (Sinus-Tagesgang pro Sensor). """
+
+    def __init__(self, config: StandinConfig):
+        self.config = config
+        self.boxes: Dict[str, Dict[str, Any]] = {}
+        for b in range(config.boxes):
+            box_id = _object_id(0x5fae0000, b)
+            self.boxes[box_id] = {
+                "_id": box_id,
+                "name": f"standin-box-{b}",
+                "exposure": "outdoor",
+                "model": "standin",
+                "currentLocation": {"type": "Point", "coordinates": [7.6 + b * 0.001, 51.9]},
+                "createdAt": _format_ts(config.now - timedelta(days=config.history_days)),
+                "updatedAt": _format_ts(config.now),
+                "lastMeasurementAt": _format_ts(config.now),
+                "sensors": [
+                    {
+                        "_id": _object_id(0x5fae1000 + b, s),
+                        "title": f"Sensor {s}",
+                        "unit": "°C",
+                        "sensorType": "STANDIN",
+                        "icon": "osem-thermometer"
+                    }
+                    for s in range(config.sensors_per_box)
+                ]
+            }
+
+    def measurements(self, box_id: str, sensor_id: str, from_date: datetime, to_date: datetime) -> Iterator[Dict[str, Any]]:
+        if box_id not in self.boxes:
+            raise KeyError(box_id)
+        step = self.config.interval_seconds
+        start = self.config.now - timedelta(days=self.config.history_days)
+        # Raster ab `start`, neueste zuerst, Fenster inklusive beider Grenzen wie bei der API
+        last_index = math.floor((min(to_date, self.config.now) - start).total_seconds() / step)
+        first_index = max(0, math.ceil((from_date - start).total_seconds() / step))
+        phase = int(sensor_id[-4:], 16) % 24
+        padding = "x" * self.config.padding_bytes
+        for i in range(last_index, first_index - 1, -1):
+            ts = start + timedelta(seconds=i * step)
+            hours = ts.timestamp() / 3600 + phase
+            item = {"value": f"{15 + 8 * math.sin(hours / 24 * 2 * math.pi):.2f}", "createdAt": _format_ts(ts)}
+            if padding:
+                item["padding"] = padding
+            yield item
+
+
+class RecordedSource:
+    """ Boxen und Messwerte aus einem Aufzeichnungsverzeichnis (utils/http_replay.py). """
+
+    def __init__(self, directory: str):
+        self.boxes: Dict[str, Dict[str, Any]] = {}
+        self._data: Dict[Tuple[str, str], List[Tuple[datetime, Dict[str, Any]]]] = {}
+
+        merged: Dict[Tuple[str, str], Dict[str, Dict[str, Any]]] = {}
+        for meta, body_path in RecordingStore(directory).iter_entries():
+            if meta.get("status_code") != 200:
+                continue
+            path = meta.get("path", "")
+            if match := _BOX_PATH.match(path):
+                self.boxes[match["box_id"]] = json.loads(body_path.read_bytes())
+            elif match := _DATA_PATH.match(path):
+                points = merged.setdefault((match["box_id"], match["sensor_id"]), {})
+                for item in json.loads(body_path.read_bytes()):
+                    points[item["createdAt"]] = item
+
+        for key, points in merged.items():
+            parsed = [(parse_api_datetime(created_at), item) for created_at, item in points.items()]
+            self._data[key] = sorted((p for p in parsed if p[0] is not None), key=lambda p: p[0], reverse=True)
+
+    def measurements(self, box_id: str, sensor_id: str, from_date: datetime, to_date: datetime) -> Iterator[Dict[str, Any]]:
+        if box_id not in self.boxes:
+            raise KeyError(box_id)
+        for ts, item in self._data.get((box_id, sensor_id), []):
+            if ts > to_date:
+                continue
+            if ts < from_date:
+                break
+            yield item
+
+
+def create_app(config: StandinConfig) -> FastAPI:
+    source = RecordedSource(config.recordings) if config.recordings else SyntheticSource(config)
+    app = FastAPI(title="OpenSenseMap Stand-in")
+
+    async def delay() -> None:
+        if config.latency_ms > 0:
+            await asyncio.sleep(config.latency_ms / 1000)
+
+    @app.get("/boxes")
+    async def get_boxes(bbox: str | None = None):
+        await delay()
+        return JSONResponse(list(source.boxes.values()))
+
+    @app.get("/boxes/{box_id}")
+    async def get_box(box_id: str):
+        await delay()
+        if box_id not in source.boxes:
+            raise HTTPException(status_code=404, detail="Box not found")
+        return JSONResponse(source.boxes[box_id])
+
+    @app.get("/boxes/{box_id}/data/{sensor_id}")
+    async def get_data(
+        box_id: str,
+        sensor_id: str,
+        from_date: str = Query(..., alias="from-date"),
+        to_date: str = Query(..., alias="to-date"),
+        format: str = "json"
+    ):
+        await delay()
+        from_dt, to_dt = parse_api_datetime(from_date), parse_api_datetime(to_date)
+        if from_dt is None or to_dt is None:
+            raise HTTPException(status_code=422, detail="Invalid from-date/to-date")
+        if box_id not in source.boxes:
+            raise HTTPException(status_code=404, detail="Box not found")
+
+        def body() -> Iterator[bytes]:
+            yield b"["
+            chunk: List[str] = []
+            separator = ""
+            for count, item in enumerate(source.measurements(box_id, sensor_id, from_dt, to_dt)):
+                if count >= config.max_points:
+                    break
+                chunk.append(json.dumps(item, separators=(",", ":")))
+                if len(chunk) >= _STREAM_CHUNK_POINTS:
+                    yield (separator + ",".join(chunk)).encode("utf-8")
+                    chunk, separator = [], ","
+            if chunk:
+                yield (separator + ",".join(chunk)).encode("utf-8")
+            yield b"]"
+
+        return StreamingResponse(body(), media_type="application/json")
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Lokaler OpenSenseMap-Ersatz für Ingestion-Benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--boxes", type=int, default=1)
+    parser.add_argument("--sensors-per-box", type=int, default=5)
+    parser.add_argument("--interval-seconds", type=float, default=60.0)
+    parser.add_argument("--history-days", type=int, default=365)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--max-points", type=int, default=10_000)
+    parser.add_argument("--padding-bytes", type=int, default=0)
+    parser.add_argument("--recordings", default=None, help="Aufzeichnungsverzeichnis statt synthetischer Daten")
+    args = parser.parse_args()
+
+    config = StandinConfig(
+        boxes=args.boxes,
+        sensors_per_box=args.sensors_per_box,
+        interval_seconds=args.interval_seconds,
+        history_days=args.history_days,
+        latency_ms=args.latency_ms,
+        max_points=args.max_points,
+        padding_bytes=args.padding_bytes,
+        recordings=args.recordings
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import os
+import sys
+import asyncio
+from collections import Counter
+from prefect import flow, get_run_logger
+from prefect.artifacts import create_markdown_artifact
+from prefect_dask.task_runners import DaskTaskRunner
+
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flows.ml_training import train_all_models
+from tasks.fetch_data import fetch_box_metadata
+from tasks.persist_in_db import sync_box_and_sensors_in_db, update_final_box_status
+from tasks.backfill import plan_backfill_partitions, backfill_partition, finalize_backfill_watermarks
+from utils.fetch_window import determine_sensor_fetch_windows
+from utils.continuous_aggregates import (
+    pause_continuous_aggregate_policies,
+    resume_continuous_aggregate_policies,
+    refresh_continuous_aggregates
+)
+from utils.compression import pause_compression_policy, resume_compression_policy, compress_chunks_in_window
+from utils.config import settings
+
+
+@flow(
+        log_prints=True,
+        task_runner=DaskTaskRunner(cluster_kwargs={"n_workers": settings.BACKFILL_DASK_N_WORKERS})
+      )
+async def backfill_flow(
+    box_id: str,
+    backfill_days: int = 365,
+    partition_days: float = settings.BACKFILL_PARTITION_DAYS,
+    pause_aggregate_policies: bool = settings.BACKFILL_PAUSE_AGGREGATE_POLICIES,
+    manage_compression: bool = settings.BACKFILL_MANAGE_COMPRESSION
+):
+    """
+    Initialer Massenimport einer Box: Der historische Zeitraum wird je Sensor in unabhängige Partitionen
+    zerlegt, die parallel auf die Dask-Worker verteilt werden. Der Fortschritt steht im Partition-Ledger
+    (ingestion_backfill_partition), ein abgebrochener Lauf setzt beim nächsten Start die offenen Partitionen fort.
+    Während des Imports sind die Refresh-Policies der Continuous Aggregates pausiert, am Ende wird der
+    betroffene Zeitraum einmalig materialisiert. Ebenso ruht die Kompressions-Policy, die in bereits
+    komprimierte Chunks geschriebenen Daten werden danach einmalig komprimiert.
+    Das Deployment lässt nur einen Lauf gleichzeitig zu (concurrency_limit 1), da die Policies clusterweit gelten.
+    """
+    logger = get_run_logger()
+
+    # 0. Von einem abgebrochenen Lauf (Worker beendet, finally nicht erreicht) pausierte Policies wieder aktivieren
+    resume_continuous_aggregate_policies()
+    resume_compression_policy()
+
+    # 1. Metadaten holen, Box & Sensoren synchronisieren
+    metadata = await fetch_box_metadata(box_id)
+    db_box_state, is_new_box = sync_box_and_sensors_in_db(metadata, backfill_days)
+
+    # 2. Fenster je Sensor (ab Watermark) und Partitionen bestimmen
+    sensor_windows = determine_sensor_fetch_windows(db_box_state, metadata.get('lastMeasurementAt'))
+    partitions = plan_backfill_partitions(box_id, sensor_windows, partition_days)
+    if not partitions:
+        logger.info(f"[Backfill {box_id}] Keine offenen Partitionen, Daten sind aktuell.")
+        return
+
+    # 3. Partitionen parallel laden, Aggregat-Policies währenddessen pausieren
+    if pause_aggregate_policies:
+        pause_continuous_aggregate_policies()
+    if manage_compression:
+        pause_compression_policy()
+    try:
+        partition_futures = backfill_partition.map(
+            sensor_id=[sensor_id for sensor_id, _, _ in partitions],
+            box_id=box_id,
+            partition_from=[partition_from for _, partition_from, _ in partitions],
+            partition_to=[partition_to for _, _, partition_to in partitions]
+        )
+        partition_results = await asyncio.to_thread(partition_futures.result, raise_on_failure=False)
+    finally:
+        if pause_aggregate_policies:
+            resume_continuous_aggregate_policies()
+        if manage_compression:
+            resume_compression_policy()
+
+    fetch_results = [
+        res if isinstance(res, dict) else {
+            "sensor_id": sensor_id, "chunk_from": partition_from, "chunk_to": partition_to, "success": False, "error": str(res)
+        }
+        for (sensor_id, partition_from, partition_to), res in zip(partitions, partition_results)
+    ]
+    status_counts = Counter("done" if res.get("success") else "failed" for res in fetch_results)
+    logger.info(f"[Backfill {box_id}] Partitionen: {dict(status_counts)}")
+
+    # 4. Watermarks und Box-Status fortschreiben
+    fetched_through = finalize_backfill_watermarks(sensor_windows)
+    to_date = max(partition_to for _, _, partition_to in partitions)
+    update_final_box_status(box_id, to_date, fetch_results, fetched_through=fetched_through)
+
+    # 5. Betroffenen Zeitraum einmalig in die Continuous Aggregates übernehmen
+    backfill_from = min(partition_from for _, partition_from, _ in partitions)
+    refresh_continuous_aggregates(backfill_from, to_date)
+
+    # 6. Nachgeladene Daten in alten Chunks komprimieren (nach dem Refresh, der sie noch unkomprimiert liest)
+    if manage_compression:
+        compress_chunks_in_window(backfill_from, to_date)
+
+    await create_markdown_artifact(
+        key=f"backfill-{box_id.lower()}",
+        markdown="\n".join(
+            ["| Sensor | Von | Bis | Status | Neue Punkte |", "|---|---|---|---|---|"]
+            + [
+                f"| {res['sensor_id']} | {res['chunk_from']} | {res['chunk_to']} | "
+                f"{'OK' if res.get('success') else 'Fehler: ' + res.get('error', '')} | {res.get('points_inserted', 0)} |"
+                for res in fetch_results
+            ]
+        ),
+        description=f"Backfill für Box {box_id}"
+    )
+
+    if status_counts["failed"]:
+        logger.warning(f"[Backfill {box_id}] {status_counts['failed']} Partitionen fehlgeschlagen, der nächste Lauf setzt sie fort.")
+    elif is_new_box:
+        logger.info(f"Starte Modelltraining für Box {box_id}...")
+        training_results = await train_all_models()
+        logger.info(f"Modelltraining für Box {box_id} abgeschlossen. Ergebnisse: {training_results}")
@@ -1,21 +1,39 @@
 import os
 import sys
+import asyncio
 import requests
-from typing import List
-from datetime import timedelta
+from collections import deque
+from typing import Any, Deque, Dict, List, Tuple
+from datetime import datetime
 from prefect import flow, get_run_logger
 from prefect.artifacts import create_markdown_artifact
-from prefect_dask.task_runners import DaskTaskRunner
-from prefect.futures import PrefectFuture
+from prefect.futures import PrefectFutureList
 
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from flows.ml_training import train_all_models
-from tasks.fetch_data import fetch_box_metadata, fetch_store_sensor_chunk
-from tasks.persist_in_db import sync_box_and_sensors_in_db, update_final_box_status
-from utils.fetch_window import determine_fetch_window
+from tasks.fetch_data import fetch_box_metadata_conditional, fetch_store_sensor_chunk
+from tasks.persist_in_db import (
+    box_metadata_hash,
+    load_box_sync_states,
+    sync_box_and_sensors_in_db,
+    touch_box_sync_state,
+    update_final_box_status,
+    start_sensor_watermarks,
+    raise_sensor_watermarks
+)
+from utils.fetch_window import determine_sensor_fetch_windows
+from utils.chunk_planner import AdaptiveChunkPlanner, estimate_points_per_day
+from utils.continuous_aggregates import refresh_late_continuous_aggregates
+from utils.task_runners import (
+    dask_task_runner,
+    estimate_pending_window_days,
+    select_ingestion_task_runner,
+    thread_task_runner
+)
 from utils.config import settings
+from utils.ingestion_metrics import metrics
 
 def is_database_empty(backend_url: str = "http://backend:8000") -> bool:
     """
@@ -34,69 +52,208 @@ def is_database_empty(backend_url: str = "http://backend:8000") -> bool:
         return False
 
 
-@flow(
-        log_prints=True,
-        task_runner=DaskTaskRunner()
-      )
-async def data_ingestion_flow(
+async def ingest_box(
     box_id: str,
+    metadata: Dict[str, Any] | None,
+    *,
     initial_fetch_days: int = 365,
     fetch_chunk_days: int = 4,
-    initial: bool = False
-):
-
+    max_chunks_in_flight: int = 3,
+    adaptive_chunking: bool = True,
+    cached_state: Dict[str, Any] | None = None,
+    metadata_etag: str | None = None,
+    metadata_last_modified: str | None = None
+) -> bool:
+    """
+    Synchronisiert eine Box anhand ihrer Metadaten und lädt fehlende Messwerte aller Sensoren.
+    Läuft im Task Runner des aufrufenden Flows (data_ingestion_flow, dask_ingestion_subflow oder multi_box_ingestion_flow).
+    Mit cached_state (load_box_sync_states) wird der DB-Sync übersprungen, wenn sich die Metadaten
+    bis auf lastMeasurementAt nicht geändert haben. metadata=None bedeutet HTTP 304 (unverändert).
+    Gibt zurück, ob die Box neu angelegt und befüllt wurde.
+    """
     logger = get_run_logger()
 
-    # 1. Metadaten holen
-    metadata = fetch_box_metadata(box_id)
-    api_last_measurement_str = metadata.get('lastMeasurementAt') 
-
     # 2. Box & Sensoren in DB synchronisieren, DB-Status holen
-    db_box_state, is_new_box = sync_box_and_sensors_in_db(metadata, initial_fetch_days)
+    if metadata is None:
+        if cached_state is None:
+            raise ValueError(f"Keine Metadaten und kein gecachter Stand für Box {box_id}.")
+        # HTTP 304: auch lastMeasurementAt unverändert, offene Zeiträume laufen bis zum gespeicherten Wert
+        db_box_state, is_new_box = cached_state, False
+        db_last_measurement_at = cached_state.get("db_last_measurement_at")
+        api_last_measurement_str = db_last_measurement_at.isoformat() if db_last_measurement_at else None
+        logger.info(f"Box {box_id}: Metadaten unverändert (HTTP 304), überspringe Sync.")
+    elif cached_state is not None and cached_state.get("metadata_hash") == box_metadata_hash(metadata):
+        api_last_measurement_str = metadata.get('lastMeasurementAt')
+        db_box_state = touch_box_sync_state(cached_state, api_last_measurement_str, metadata_etag, metadata_last_modified)
+        # Im selben Lauf vorab synchronisierte Boxen (sync_boxes_and_sensors_in_db) können neu sein
+        is_new_box = db_box_state.get("is_newly_created", False)
+    else:
+        api_last_measurement_str = metadata.get('lastMeasurementAt')
+        db_box_state, is_new_box = sync_box_and_sensors_in_db(
+            metadata, initial_fetch_days, metadata_etag, metadata_last_modified
+        )
     print("Box ist neu erstellt:", is_new_box)
 
     is_newly_created = db_box_state.get('is_newly_created', False)
     logger.info(f"Box {box_id} {'neu erstellt' if is_newly_created else 'aktualisiert'} in der Datenbank.")
 
-    # 3. Abruf-Zeitfenster bestimmen
-    from_date, to_date = determine_fetch_window(db_box_state, api_last_measurement_str)
+    # 3. Abruf-Zeitfenster je Sensor bestimmen (aus den Sensor-Watermarks)
+    sensor_ids = db_box_state.get("sensor_ids", [])
 
-    if from_date is None or to_date is None or from_date >= to_date:
-        logger.info("Kein Datenabruf nötig, Daten sind aktuell.")
-        return 
+    if not sensor_ids:
+         logger.warning(f"Keine Sensor-IDs für Box {box_id} gefunden.")
+         return False
+
+    sensor_windows = determine_sensor_fetch_windows(db_box_state, api_last_measurement_str)
+
+    if not sensor_windows:
+        logger.info(f"Box {box_id}: Kein Datenabruf nötig, Daten sind aktuell.")
+        return False
+
+    to_date = max(window_end for _, window_end in sensor_windows.values())
 
     # 4. Daten für jeden Sensor holen (Potenziell parallel)
     all_fetch_results = []
-    sensor_ids = db_box_state.get("sensor_ids", [])
 
-    if not sensor_ids:
-         logger.warning(f"Keine Sensor-IDs für Box {box_id} gefunden.")
-         return
-
-    # --- Iteration über die Zeit in Chunks ---
-    current_chunk_start = from_date
-    while current_chunk_start < to_date:
-        current_chunk_end = min(current_chunk_start + timedelta(days=fetch_chunk_days), to_date)
-        logger.info(f"Bearbeite Zeit-Chunk: {current_chunk_start} -> {current_chunk_end}")
-
-        chunk_futures: List[PrefectFuture] = fetch_store_sensor_chunk.map(
-            sensor_id=sensor_ids,             
-            box_id=box_id,                  
-            chunk_from_date=current_chunk_start, 
-            chunk_to_date=current_chunk_end   
-        )
+    # --- Fenstergrößen je Sensor planen (adaptiv nach Datendichte oder fest fetch_chunk_days) ---
+    points_per_day = estimate_points_per_day(list(sensor_windows)) if adaptive_chunking else {}
+    planner = AdaptiveChunkPlanner(
+        sensor_windows,
+        points_per_day,
+        default_days=fetch_chunk_days,
+        adaptive=adaptive_chunking
+    )
+
+    # Watermarks ohne Wert (neue Box) auf den Fensterbeginn setzen, damit Chunks lückenlos anschließen
+    start_sensor_watermarks(sensor_windows)
+
+    # --- Sliding Window: bis zu max_chunks_in_flight Runden gleichzeitig ---
+    # Eine Runde enthält je Sensor mit offenem Zeitraum einen Chunk. Während Runde N noch schreibt,
+    # laufen die Requests für Runde N+1 bereits.
+    # Schlägt ein Chunk fehl, plant der Planner für diesen Sensor keine weiteren Chunks, die übrigen
+    # Sensoren laufen weiter. Das Sensor-Watermark wird nur lückenlos fortgeschrieben, der nächste
+    # Flow-Run lädt daher nur den fehlenden Zeitraum des betroffenen Sensors erneut.
+    # Schreibt Runde N+1 vor Runde N, bleibt das Watermark pro Chunk stehen und wird nach der Schleife
+    # auf den lückenlosen Stand des Planners gehoben.
+    max_chunks_in_flight = max(1, max_chunks_in_flight)
+    in_flight: Deque[Tuple[int, List[Tuple[str, datetime, datetime]], PrefectFutureList]] = deque()
+    round_number = 0
+
+    while in_flight or planner.has_remaining():
+        while planner.has_remaining() and len(in_flight) < max_chunks_in_flight:
+            planned = planner.next_round()
+            round_number += 1
+            logger.info(
+                f"Starte Runde {round_number} mit {len(planned)} Chunks: "
+                + ", ".join(f"{sid} {start} -> {end}" for sid, start, end in planned)
+            )
+            chunk_futures = fetch_store_sensor_chunk.map(
+                sensor_id=[sid for sid, _, _ in planned],
+                box_id=box_id,
+                chunk_from_date=[start for _, start, _ in planned],
+                chunk_to_date=[end for _, _, end in planned]
+            )
+            in_flight.append((round_number, planned, chunk_futures))
+
+        current_round, planned, chunk_futures = in_flight.popleft()
+        # Warten in einem Thread, damit parallel laufende Boxen (multi_box_ingestion_flow) den Event-Loop nutzen können
+        round_results = await asyncio.to_thread(chunk_futures.result, raise_on_failure=False)
+        chunk_results = [
+            res if isinstance(res, dict) else {
+                "sensor_id": sid, "chunk_from": start, "chunk_to": end, "success": False, "error": str(res)
+            }
+            for (sid, start, end), res in zip(planned, round_results)
+        ]
 
-        chunk_results = chunk_futures.result() 
         all_fetch_results.extend(chunk_results)
+        for res in chunk_results:
+            planner.observe(res)
+            if not res.get('success', False):
+                logger.error(
+                    f"Fehler in Runde {current_round} für Sensor {res.get('sensor_id')} "
+                    f"({res.get('chunk_from')} -> {res.get('chunk_to')}). Keine weiteren Chunks für diesen Sensor."
+                )
 
-        if not all(res.get('success', False) for res in chunk_results): 
-             logger.error(f"Fehler im Zeit-Chunk {current_chunk_start} -> {current_chunk_end}. Breche weitere Chunks ab.")
-             break 
+    # Watermarks auf den lückenlos abgeschlossenen Stand heben. Im Write-behind-Modus liegen die Daten
+    # erst nach dem Commit des Consumers vor, dort übernimmt der Consumer Watermarks und späte Refreshes.
+    if settings.INGEST_WRITE_MODE == "direct":
+        raise_sensor_watermarks(planner.completed_by_sensor())
 
-        current_chunk_start = current_chunk_end # Gehe zum nächsten Chunk
+        # Chunks vor dem Fenster der Refresh-Policies (Erstabruf, Nachholen nach Ausfall) selbst materialisieren
+        written_from = [
+            res["chunk_from"] for res in all_fetch_results
+            if res.get("success") and res.get("points_inserted", 0) > 0 and res.get("chunk_from") is not None
+        ]
+        if written_from:
+            refresh_late_continuous_aggregates(min(written_from))
 
     # 5. Finalen Box-Status (last_data_fetched) aktualisieren
-    update_final_box_status(box_id, to_date, all_fetch_results) 
+    update_final_box_status(box_id, to_date, all_fetch_results, fetched_through=planner.fetched_through()) 
+
+    # 6. Datenalter je Sensor als Metrik festhalten (blockierende DB-Abfrage im Thread)
+    await asyncio.to_thread(metrics.observe_data_lag, box_id, list(sensor_windows))
+    await asyncio.to_thread(metrics.flush)
+
+    logger.info(f"Ingestion für Box {box_id} abgeschlossen.") 
+
+    return is_new_box
+
+
+
+@flow(
+        name="data-ingestion-dask",
+        log_prints=True,
+        task_runner=dask_task_runner()
+      )
+async def dask_ingestion_subflow(box_id: str, metadata: Dict[str, Any] | None, ingest_options: Dict[str, Any]) -> bool:
+    """ Führt ingest_box in einem lokalen Dask-Cluster aus (große Zeitfenster, z.B. neue Box oder lange Lücke). """
+    return await ingest_box(box_id, metadata, **ingest_options)
+
+
+@flow(
+        log_prints=True,
+        task_runner=thread_task_runner()
+      )
+async def data_ingestion_flow(
+    box_id: str,
+    initial_fetch_days: int = 365,
+    fetch_chunk_days: int = 4,
+    initial: bool = False,
+    max_chunks_in_flight: int = 3,
+    adaptive_chunking: bool = True,
+    task_runner_mode: str = settings.INGESTION_TASK_RUNNER
+):
+
+    logger = get_run_logger()
+
+    # 1. Gespeicherten Sync-Stand laden und Metadaten bedingt holen (If-None-Match/If-Modified-Since)
+    cached_state = load_box_sync_states([box_id]).get(box_id)
+    response = await fetch_box_metadata_conditional(
+        box_id,
+        etag=(cached_state or {}).get("metadata_etag"),
+        last_modified=(cached_state or {}).get("metadata_last_modified")
+    )
+
+    # Task Runner nach offenem Zeitraum wählen: der 5-Minuten-Tick läuft im Thread-Pool dieses Flows,
+    # erst große Fenster (neue Box, lange Lücke) starten einen Dask-Cluster im Sub-Flow
+    pending_days = estimate_pending_window_days(cached_state, initial_fetch_days)
+    runner = select_ingestion_task_runner(task_runner_mode, pending_days)
+    logger.info(f"Box {box_id}: offener Zeitraum {pending_days:.2f} Tage, Task Runner: {runner}")
+
+    # 2.-5. Box synchronisieren (oder Fast Path) und Daten abrufen
+    ingest_options = dict(
+        initial_fetch_days=initial_fetch_days,
+        fetch_chunk_days=fetch_chunk_days,
+        max_chunks_in_flight=max_chunks_in_flight,
+        adaptive_chunking=adaptive_chunking,
+        cached_state=cached_state,
+        metadata_etag=response["etag"],
+        metadata_last_modified=response["last_modified"]
+    )
+    if runner == "dask":
+        is_new_box = await dask_ingestion_subflow(box_id, response["metadata"], ingest_options)
+    else:
+        is_new_box = await ingest_box(box_id, response["metadata"], **ingest_options)
 
     logger.info(f"Flow für Box {box_id} abgeschlossen.") 
 
@@ -0,0 +1,104 @@
+import os
+import sys
+import asyncio
+from typing import Any, Dict, List
+from prefect import flow, get_run_logger
+from prefect.artifacts import create_markdown_artifact
+from prefect_dask.task_runners import DaskTaskRunner
+
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flows.data_ingestion import ingest_box
+from flows.ml_training import train_all_models
+from tasks.fetch_data import fetch_boxes_metadata
+from tasks.persist_in_db import box_metadata_hash, load_box_sync_states, sync_boxes_and_sensors_in_db
+from utils.config import settings
+
+
+@flow(
+        log_prints=True,
+        task_runner=DaskTaskRunner(cluster_kwargs={"n_workers": settings.DASK_N_WORKERS})
+      )
+async def multi_box_ingestion_flow(
+    box_ids: List[str] | None = None,
+    bbox: str | None = None,
+    initial_fetch_days: int = 365,
+    fetch_chunk_days: int = 4,
+    max_chunks_in_flight: int = 2,
+    adaptive_chunking: bool = True,
+    max_boxes_in_flight: int = settings.MAX_BOXES_IN_FLIGHT
+):
+    """
+    Lädt Daten für viele Boxen in einem Flow-Run: ein Dask-Cluster, ein HTTP-Client-Pool pro Worker
+    und ein globales DB-Write-Limit (DB_WRITE_CONCURRENCY_LIMIT) werden von allen Boxen geteilt.
+    Die Boxen werden über box_ids oder eine Bounding Box ("lng_sw,lat_sw,lng_ne,lat_ne") ausgewählt.
+    """
+    logger = get_run_logger()
+
+    box_ids = box_ids or settings.MULTI_BOX_IDS or None
+    bbox = bbox or settings.MULTI_BOX_BBOX
+
+    # 1. Metadaten aller Boxen holen (per Bounding Box in einem Request)
+    boxes = await fetch_boxes_metadata(box_ids=box_ids, bbox=bbox)
+    if not boxes:
+        logger.warning("Keine Boxen für die Multi-Box-Ingestion gefunden.")
+        return
+
+    # Gespeicherter Sync-Stand aller Boxen in einer Abfrage: unveränderte Boxen überspringen den DB-Sync
+    cached_states = load_box_sync_states([metadata.get('_id') for metadata in boxes])
+
+    # Neue und geänderte Boxen gesammelt synchronisieren (ein Upsert für Boxen, Sensoren und Watermarks)
+    changed_boxes = [
+        metadata for metadata in boxes
+        if (cached_states.get(metadata.get('_id')) or {}).get("metadata_hash") != box_metadata_hash(metadata)
+    ]
+    if changed_boxes:
+        cached_states.update(sync_boxes_and_sensors_in_db(changed_boxes, initial_fetch_days))
+
+    # 2. Boxen mit begrenzter Parallelität verarbeiten. Innerhalb einer Box laufen bis zu
+    #    max_chunks_in_flight Runden gleichzeitig, insgesamt also höchstens
+    #    max_boxes_in_flight * max_chunks_in_flight Runden im gemeinsamen Dask-Cluster.
+    box_slots = asyncio.Semaphore(max(1, max_boxes_in_flight))
+
+    async def run_box(metadata: Dict[str, Any]) -> Dict[str, Any]:
+        box_id = metadata.get('_id')
+        async with box_slots:
+            try:
+                is_new_box = await ingest_box(
+                    box_id,
+                    metadata,
+                    initial_fetch_days=initial_fetch_days,
+                    fetch_chunk_days=fetch_chunk_days,
+                    max_chunks_in_flight=max_chunks_in_flight,
+                    adaptive_chunking=adaptive_chunking,
+                    cached_state=cached_states.get(box_id)
+                )
+                return {"box_id": box_id, "success": True, "is_new_box": is_new_box}
+            except Exception as e:
+                # Fehler einer Box brechen die übrigen Boxen nicht ab
+                logger.error(f"Ingestion für Box {box_id} fehlgeschlagen: {e}", exc_info=True)
+                return {"box_id": box_id, "success": False, "is_new_box": False, "error": str(e)}
+
+    box_results = await asyncio.gather(*(run_box(metadata) for metadata in boxes))
+
+    failed = [res for res in box_results if not res["success"]]
+    logger.info(f"Multi-Box-Ingestion abgeschlossen: {len(box_results) - len(failed)}/{len(box_results)} Boxen erfolgreich.")
+
+    await create_markdown_artifact(
+        key="multi-box-ingestion",
+        markdown="\n".join(
+            ["| Box | Status | Neu |", "|---|---|---|"]
+            + [
+                f"| {res['box_id']} | {'OK' if res['success'] else 'Fehler: ' + res.get('error', '')} | {'ja' if res['is_new_box'] else ''} |"
+                for res in box_results
+            ]
+        ),
+        description="Ergebnis der Multi-Box-Ingestion"
+    )
+
+    # 3. Modelle einmalig trainieren, falls neue Boxen befüllt wurden
+    if any(res["is_new_box"] for res in box_results):
+        logger.info("Neue Boxen befüllt, starte Modelltraining...")
+        training_results = await train_all_models()
+        logger.info(f"Modelltraining abgeschlossen. Ergebnisse: {training_results}")
@@ -0,0 +1,58 @@
+import os
+import sys
+from typing import Any, Dict
+from prefect import flow, get_run_logger
+
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.continuous_aggregates import refresh_continuous_aggregates
+from utils.retention import plan_retention, verify_rollup_coverage, drop_raw_chunks_before, drop_rejected_chunks_before
+from utils.config import settings
+
+
+@flow(log_prints=True)
+def sensor_data_retention_flow(
+    raw_retention_days: int = settings.SENSOR_DATA_RAW_RETENTION_DAYS,
+    rejected_retention_days: int = settings.SENSOR_DATA_REJECTED_RETENTION_DAYS
+) -> Dict[str, Any] | None:
+    """
+    Gestufte Aufbewahrung von sensor_data: Rohdaten älter als raw_retention_days werden auf die Rollups reduziert.
+    Vor dem Löschen wird der Zeitraum in alle Continuous Aggregates übernommen und geprüft, dass das Tages-Rollup
+    je Sensor genauso viele Messwerte zählt wie die Rohdaten. Erst dann wird der Aufbewahrungshorizont verschoben
+    und die Chunks von sensor_data und sensor_data_rollup_1m davor werden gelöscht.
+    Abfragen lesen Zeiträume vor dem Horizont danach aus sensor_data_rollup_1h und _1d.
+    Verworfene Messwerte (sensor_data_rejected) werden unabhängig davon nach rejected_retention_days gelöscht.
+    """
+    logger = get_run_logger()
+    result: Dict[str, Any] = {}
+
+    # 0. Verworfene Messwerte nach eigener Aufbewahrungsdauer
+    if rejected_retention_days > 0:
+        result["dropped_rejected_chunks"] = drop_rejected_chunks_before(rejected_retention_days)
+
+    if raw_retention_days <= 0:
+        logger.info("[Retention] SENSOR_DATA_RAW_RETENTION_DAYS ist 0, Rohdaten werden unbegrenzt behalten.")
+        return result or None
+
+    # 1. Zu löschenden Zeitraum bestimmen (Tagesgrenze, außerhalb der Refresh-Policies)
+    window = plan_retention(raw_retention_days)
+    if window is None:
+        return result or None
+    window_start, cutoff = window
+
+    # 2. Zeitraum vollständig materialisieren (nur invalidierte Bereiche werden neu berechnet)
+    refresh_continuous_aggregates(window_start, cutoff)
+
+    # 3. Abdeckung prüfen, bei Abweichungen nichts löschen
+    mismatches = verify_rollup_coverage(window_start, cutoff)
+    if mismatches:
+        raise RuntimeError(
+            f"[Retention] Tages-Rollup deckt {window_start} -> {cutoff} für {mismatches} Sensoren nicht vollständig ab, "
+            "es wurden keine Rohdaten gelöscht."
+        )
+
+    # 4. Horizont verschieben und Chunks löschen
+    dropped = drop_raw_chunks_before(cutoff)
+    result.update({"retained_from": cutoff, "dropped_chunks": dropped})
+    return result
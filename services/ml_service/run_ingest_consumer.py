@@ -0,0 +1,44 @@
+# run_ingest_consumer.py
+#
+# Write-behind-Consumer für den Ingest-Stream (INGEST_WRITE_MODE="redis_stream").
+# Läuft als eigener Prozess neben dem Prefect Worker, ein Consumer pro Gruppe genügt:
+#   uv run python run_ingest_consumer.py
+#   uv run python run_ingest_consumer.py --lag   # aktuellen Rückstand ausgeben
+
+import sys
+import json
+import logging
+import argparse
+
+from utils.config import settings
+from utils.db_utils import SessionLocal
+from utils.ingest_stream import IngestStreamConsumer, ingest_stream_lag
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Write-behind-Consumer für den Ingest-Stream")
+    parser.add_argument("--consumer", default=None, help="Name des Consumers in der Gruppe (Standard: Hostname)")
+    parser.add_argument("--lag", action="store_true", help="Nur den aktuellen Rückstand ausgeben")
+    args = parser.parse_args()
+
+    if args.lag:
+        print(json.dumps(ingest_stream_lag(), indent=2))
+        return
+
+    if SessionLocal is None:
+        print("Keine Datenbankverbindung konfiguriert, Consumer wird nicht gestartet.")
+        sys.exit(1)
+
+    consumer = IngestStreamConsumer(SessionLocal, consumer=args.consumer)
+    print(
+        f"Starte Ingest-Consumer '{consumer.consumer}' auf {settings.INGEST_STREAM_KEY} "
+        f"(Gruppe {settings.INGEST_STREAM_GROUP}, {settings.INGEST_STREAM_BATCH_ROWS} Messwerte / "
+        f"{settings.INGEST_STREAM_FLUSH_SECONDS} s)."
+    )
+    consumer.run()
+
+
+if __name__ == "__main__":
+    main()
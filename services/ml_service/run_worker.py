@@ -7,12 +7,14 @@ from pathlib import Path
 
 from prefect import get_client, deploy
 from prefect.server.schemas.actions import WorkPoolCreate
+from prefect.client.schemas.actions import GlobalConcurrencyLimitCreate
 from prefect.exceptions import ObjectNotFound
 from prefect.workers.process import ProcessWorker
 from prefect.filesystems import LocalFileSystem 
 from prefect.deployments.runner import RunnerDeployment
 
 from flows.data_ingestion import data_ingestion_flow as target_flow
+from utils.config import settings
 
 # --- Konfiguration --- TODO: hole die konfigurationen aus .env oder utils.config.settings()
 WORK_POOL_NAME = "timeseries"
@@ -24,7 +26,16 @@ APP_BASE_PATH = Path("/app/ml_service/")
 DEFAULT_BOX_ID = "5faeb5589b2df8001b980304"
 INITIAL_FETCH_DAYS = 365
 CHUNK_DAYS = 4
+MAX_CHUNKS_IN_FLIGHT = 3
+ADAPTIVE_CHUNKING = True
 INTERVAL_SECONDS = 300
+MULTI_BOX_DEPLOYMENT_NAME = "timeseries-multi-box-ingestion"
+MULTI_BOX_FLOW_FUNCTION_NAME = "multi_box_ingestion_flow"
+MULTI_BOX_CHUNKS_IN_FLIGHT = 2
+BACKFILL_DEPLOYMENT_NAME = "timeseries-backfill"
+BACKFILL_FLOW_FUNCTION_NAME = "backfill_flow"
+RETENTION_DEPLOYMENT_NAME = "sensor-data-retention"
+RETENTION_FLOW_FUNCTION_NAME = "sensor_data_retention_flow"
 
 
 async def create_or_get_work_pool(client, name: str):
@@ -52,18 +63,42 @@ async def create_or_get_work_pool(client, name: str):
 
 
 
+async def create_or_get_concurrency_limit(client, name: str, limit: int):
+    print(f"Prüfe Concurrency Limit '{name}'...")
+    try:
+        concurrency_limit = await client.read_global_concurrency_limit_by_name(name)
+        print(f"Concurrency Limit '{name}' existiert bereits (Limit: {concurrency_limit.limit}).")
+        return concurrency_limit
+    except ObjectNotFound:
+        print(f"Concurrency Limit '{name}' nicht gefunden. Erstelle mit Limit {limit}...")
+        try:
+            await client.create_global_concurrency_limit(
+                concurrency_limit=GlobalConcurrencyLimitCreate(name=name, limit=limit)
+            )
+            print(f"Concurrency Limit '{name}' erstellt.")
+        except Exception as e:
+            # Ohne Limit laufen die DB-Writes unbegrenzt weiter, der Worker kann trotzdem starten
+            print(f"WARNUNG: Konnte Concurrency Limit '{name}' nicht erstellen: {e}", file=sys.stderr)
+
+
 async def main():
     """Hauptfunktion zum Einrichten und Starten des Prefect Workers via API."""
     async with get_client() as client:
         # --- Work Pool sicherstellen ---
         await create_or_get_work_pool(client, WORK_POOL_NAME)
 
+        # --- Globales Limit für DB-Writes (geteilt von allen Ingestion-Flows) ---
+        if settings.DB_WRITE_CONCURRENCY_LIMIT:
+            await create_or_get_concurrency_limit(client, settings.DB_WRITE_CONCURRENCY_LIMIT, settings.DB_WRITE_CONCURRENCY_SLOTS)
+
         # --- Deployment erstellen/aktualisieren ---
         deployment_params = {
             "box_id": DEFAULT_BOX_ID,
             "initial_fetch_days": INITIAL_FETCH_DAYS,
             "fetch_chunk_days": CHUNK_DAYS,
             "initial": False,
+            "max_chunks_in_flight": MAX_CHUNKS_IN_FLIGHT,
+            "adaptive_chunking": ADAPTIVE_CHUNKING,
         }
         schedule_payload = [
             {
@@ -202,6 +237,106 @@ async def main():
 
         print(f"Deployment '{DEPLOYMENT_NAME}' (ID: {deployment}) erfolgreich erstellt.")
 
+        # --- Deployment Multi-Box-Ingestion (nur wenn Boxen konfiguriert sind) ---
+        if settings.MULTI_BOX_IDS or settings.MULTI_BOX_BBOX:
+            deployment_params = {
+                "box_ids": settings.MULTI_BOX_IDS or None,
+                "bbox": settings.MULTI_BOX_BBOX,
+                "initial_fetch_days": INITIAL_FETCH_DAYS,
+                "fetch_chunk_days": CHUNK_DAYS,
+                "max_chunks_in_flight": MULTI_BOX_CHUNKS_IN_FLIGHT,
+                "adaptive_chunking": ADAPTIVE_CHUNKING,
+                "max_boxes_in_flight": settings.MAX_BOXES_IN_FLIGHT,
+            }
+            multi_box_flow_id = await client.create_flow_from_name(MULTI_BOX_FLOW_FUNCTION_NAME)
+
+            multi_box_deployment = requests.post(
+                f"http://prefect:4200/api/deployments",
+                json={
+                    "name": MULTI_BOX_DEPLOYMENT_NAME,
+                    "flow_id": str(multi_box_flow_id),
+                    "work_pool_name": WORK_POOL_NAME,
+                    "entrypoint": f"./flows/multi_box_ingestion.py:{MULTI_BOX_FLOW_FUNCTION_NAME}",
+                    "path": str(APP_BASE_PATH),
+                    "parameter_openapi_schema": deployment_params,
+                    "parameters": deployment_params,
+                    "schedules": [{"schedule": {"interval": INTERVAL_SECONDS}}],
+                    "tags": ["ingestion", "opensensemap", "scheduled", "multi-box"],
+                    "description": f"Holt alle {INTERVAL_SECONDS // 60} Minuten Daten von OpenSenseMap für mehrere Boxen",
+                    "concurrency_options": {
+                        "collision_strategy": "CANCEL_NEW"
+                    },
+                },
+                headers={"Content-Type": "application/json"},
+            )
+
+            print(f"Deployment '{MULTI_BOX_DEPLOYMENT_NAME}' (Status: {multi_box_deployment.status_code}) erstellt.")
+
+        # --- Deployment Backfill (ohne Schedule, wird für neue Boxen manuell gestartet) ---
+        deployment_params = {
+            "box_id": DEFAULT_BOX_ID,
+            "backfill_days": INITIAL_FETCH_DAYS,
+            "partition_days": settings.BACKFILL_PARTITION_DAYS,
+            "pause_aggregate_policies": settings.BACKFILL_PAUSE_AGGREGATE_POLICIES,
+        }
+        backfill_flow_id = await client.create_flow_from_name(BACKFILL_FLOW_FUNCTION_NAME)
+
+        backfill_deployment = requests.post(
+            f"http://prefect:4200/api/deployments",
+            json={
+                "name": BACKFILL_DEPLOYMENT_NAME,
+                "flow_id": str(backfill_flow_id),
+                "work_pool_name": WORK_POOL_NAME,
+                "entrypoint": f"./flows/backfill.py:{BACKFILL_FLOW_FUNCTION_NAME}",
+                "path": str(APP_BASE_PATH),
+                "parameter_openapi_schema": deployment_params,
+                "parameters": deployment_params,
+                "tags": ["ingestion", "opensensemap", "backfill"],
+                "description": f"Paralleler Backfill der letzten {INITIAL_FETCH_DAYS} Tage für eine Box (fortsetzbar)",
+                # Policies werden clusterweit pausiert, parallele Läufe würden sie gegenseitig wieder aktivieren
+                "concurrency_limit": 1,
+                "concurrency_options": {
+                    "collision_strategy": "CANCEL_NEW"
+                },
+            },
+            headers={"Content-Type": "application/json"},
+        )
+
+        print(f"Deployment '{BACKFILL_DEPLOYMENT_NAME}' (Status: {backfill_deployment.status_code}) erstellt.")
+
+        # --- Deployment Retention (nur wenn eine Aufbewahrungsdauer konfiguriert ist) ---
+        if settings.SENSOR_DATA_RAW_RETENTION_DAYS > 0 or settings.SENSOR_DATA_REJECTED_RETENTION_DAYS > 0:
+            deployment_params = {
+                "raw_retention_days": settings.SENSOR_DATA_RAW_RETENTION_DAYS,
+                "rejected_retention_days": settings.SENSOR_DATA_REJECTED_RETENTION_DAYS,
+            }
+            retention_flow_id = await client.create_flow_from_name(RETENTION_FLOW_FUNCTION_NAME)
+
+            retention_deployment = requests.post(
+                f"http://prefect:4200/api/deployments",
+                json={
+                    "name": RETENTION_DEPLOYMENT_NAME,
+                    "flow_id": str(retention_flow_id),
+                    "work_pool_name": WORK_POOL_NAME,
+                    "entrypoint": f"./flows/retention.py:{RETENTION_FLOW_FUNCTION_NAME}",
+                    "path": str(APP_BASE_PATH),
+                    "parameter_openapi_schema": deployment_params,
+                    "parameters": deployment_params,
+                    "schedules": [{"schedule": {"cron": "30 3 * * *", "timezone": "Europe/Berlin"}}],
+                    "tags": ["maintenance", "retention"],
+                    "description": (
+                        f"Reduziert Rohdaten älter als {settings.SENSOR_DATA_RAW_RETENTION_DAYS} Tage auf die Rollups, "
+                        f"löscht verworfene Messwerte älter als {settings.SENSOR_DATA_REJECTED_RETENTION_DAYS} Tage (0 = unbegrenzt)"
+                    ),
+                    "concurrency_options": {
+                        "collision_strategy": "CANCEL_NEW"
+                    },
+                },
+                headers={"Content-Type": "application/json"},
+            )
+
+            print(f"Deployment '{RETENTION_DEPLOYMENT_NAME}' (Status: {retention_deployment.status_code}) erstellt.")
+
         # print(f"\nTriggering initial run for deployment '{response_data.get('id')}'...")
         # try:
         #     await client.create_flow_run_from_deployment(
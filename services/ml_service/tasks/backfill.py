@@ -0,0 +1,135 @@
+# tasks/backfill.py
+
+import asyncio
+from prefect import task, get_run_logger
+from prefect.tasks import exponential_backoff
+from typing import Any, Dict, List, Tuple
+from datetime import datetime, timedelta, timezone
+
+from utils.db_utils import get_db_session
+from utils.config import settings
+from tasks.fetch_data import fetch_store_sensor_chunk
+
+from shared.crud import crud_sensor
+
+
+def split_into_partitions(
+    windows: Dict[str, Tuple[datetime, datetime]],
+    partition_days: float
+) -> List[Tuple[str, datetime, datetime]]:
+    """ Zerlegt die Abruf-Fenster je Sensor in unabhängige Partitionen (sensor_id, von, bis). """
+    step = timedelta(days=partition_days)
+    partitions: List[Tuple[str, datetime, datetime]] = []
+    for sensor_id, (window_from, window_to) in windows.items():
+        partition_from = window_from
+        while partition_from < window_to:
+            partition_to = min(partition_from + step, window_to)
+            partitions.append((sensor_id, partition_from, partition_to))
+            partition_from = partition_to
+    return partitions
+
+
+@task(name="Plan Backfill Partitions", log_prints=True)
+def plan_backfill_partitions(
+    box_id: str,
+    sensor_windows: Dict[str, Tuple[datetime, datetime]],
+    partition_days: float = settings.BACKFILL_PARTITION_DAYS
+) -> List[Tuple[str, datetime, datetime]]:
+    """
+    Liefert die abzuarbeitenden Partitionen einer Box. Gibt es im Ledger noch offene Partitionen
+    (abgebrochener Lauf), werden genau diese fortgesetzt, sonst werden die Fenster neu partitioniert.
+    """
+    logger = get_run_logger()
+
+    with get_db_session() as db:
+        if db is None:
+            raise RuntimeError("DB Session nicht verfügbar für Backfill-Planung.")
+
+        open_partitions = crud_sensor.ingestion_backfill_partition.get_open_by_box_id(db, box_id=box_id)
+        if open_partitions:
+            partitions = [
+                (p.sensor_id, p.partition_from.astimezone(timezone.utc), p.partition_to.astimezone(timezone.utc))
+                for p in open_partitions
+            ]
+            logger.info(f"[Backfill {box_id}] Setze {len(partitions)} offene Partitionen aus dem Ledger fort.")
+            return partitions
+
+        partitions = split_into_partitions(sensor_windows, partition_days)
+        crud_sensor.ingestion_backfill_partition.create_multi(db, box_id=box_id, partitions=partitions)
+
+    logger.info(f"[Backfill {box_id}] {len(partitions)} Partitionen à {partition_days} Tage für {len(sensor_windows)} Sensoren geplant.")
+    return partitions
+
+
+def _set_partition_status(sensor_id: str, partition_from: datetime, partition_to: datetime, status: str, **kwargs) -> None:
+    with get_db_session() as db:
+        if db is None:
+            raise RuntimeError("DB Session nicht verfügbar für das Backfill-Ledger.")
+        crud_sensor.ingestion_backfill_partition.set_status(
+            db, sensor_id=sensor_id, partition_from=partition_from, partition_to=partition_to, status=status, **kwargs
+        )
+
+
+@task(
+    name="Backfill Partition",
+    retries=2,
+    retry_delay_seconds=exponential_backoff(backoff_factor=15),
+    retry_jitter_factor=0.5,
+    log_prints=True
+)
+async def backfill_partition(
+    sensor_id: str,
+    box_id: str,
+    partition_from: datetime,
+    partition_to: datetime
+) -> Dict[str, Any]:
+    """
+    Lädt eine Partition in einem Durchgang (volle API-Antworten werden von fetch_store_sensor_chunk
+    mit Folge-Requests ergänzt) und führt den Status im Ledger nach.
+    """
+    await asyncio.to_thread(_set_partition_status, sensor_id, partition_from, partition_to, "running")
+    try:
+        result = await fetch_store_sensor_chunk.fn(
+            sensor_id=sensor_id,
+            box_id=box_id,
+            chunk_from_date=partition_from,
+            chunk_to_date=partition_to,
+            # Direkt schreiben: das Ledger darf eine Partition erst nach dem Commit als "done" führen
+            write_mode="direct"
+        )
+        if not result.get("success"):
+            raise RuntimeError(f"Partition {sensor_id} {partition_from} -> {partition_to} nicht erfolgreich geladen.")
+    except Exception as e:
+        await asyncio.to_thread(_set_partition_status, sensor_id, partition_from, partition_to, "failed", error=str(e)[:1000])
+        raise
+
+    await asyncio.to_thread(
+        _set_partition_status, sensor_id, partition_from, partition_to, "done",
+        points_inserted=result.get("points_inserted", 0)
+    )
+    return result
+
+
+@task(name="Finalize Backfill Watermarks", log_prints=True)
+def finalize_backfill_watermarks(sensor_windows: Dict[str, Tuple[datetime, datetime]]) -> datetime | None:
+    """
+    Schreibt die Sensor-Watermarks auf das Ende der lückenlos abgeschlossenen Partitionen fort
+    (parallel abgeschlossene Partitionen schieben das Watermark einzeln nicht weiter) und gibt
+    den über alle Sensoren lückenlos abgerufenen Zeitpunkt zurück.
+    """
+    logger = get_run_logger()
+    from_dates = {sensor_id: window_from for sensor_id, (window_from, _) in sensor_windows.items()}
+
+    with get_db_session() as db:
+        if db is None:
+            raise RuntimeError("DB Session nicht verfügbar für Backfill-Watermarks.")
+        contiguous = crud_sensor.ingestion_backfill_partition.get_contiguous_done_by_sensor_ids(
+            db, sensor_ids=list(sensor_windows), from_dates=from_dates
+        )
+        for sensor_id, fetched_through in contiguous.items():
+            crud_sensor.sensor_ingestion_watermark.raise_to(db, sensor_id=sensor_id, fetched_through=fetched_through)
+
+    logger.info(f"[Backfill] Lückenlos abgerufen bis: {contiguous}")
+    if not sensor_windows:
+        return None
+    return min(contiguous.get(sensor_id, window_from) for sensor_id, window_from in from_dates.items()).astimezone(timezone.utc)
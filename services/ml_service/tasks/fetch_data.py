@@ -1,28 +1,40 @@
 # tasks/fetch_data.py
 
 import os
-import requests
-from typing import Dict, Any, List 
+import json
+import time
+import asyncio
+import httpx
+from typing import Dict, Any, List, Tuple
+from contextlib import nullcontext
 from prefect import task, get_run_logger
+from prefect.concurrency.sync import concurrency
+from prefect.tasks import exponential_backoff
+from prefect.runtime import task_run
 from datetime import datetime, timezone, timedelta 
 from sqlalchemy.exc import SQLAlchemyError 
 import pandas as pd
 
 from utils.db_utils import get_db_session
+from utils.http_client import get_osm_client
+from utils.json_stream import iter_json_array
+from utils.config import settings as ingest_settings
 
 from shared.crud import crud_sensor
-from shared.schemas import sensor as sensor_schema
-from utils.parse_datetime import parse_api_datetime
+from utils.measurement_parsing import ParsedMeasurements, parse_measurements
+from utils.ingest_stream import get_ingest_stream_producer
+from utils.ingestion_metrics import metrics
+from utils.plausibility import STUCK_LOOKBACK, PlausibilityFilter, RejectedMeasurements
 
-OPEN_SENSE_MAP_API_URL = "https://api.opensensemap.org"
 
 @task(
     name="Fetch OpenSenseMap Box Metadata", 
     retries=3,                             
-    retry_delay_seconds=10,               
+    retry_delay_seconds=exponential_backoff(backoff_factor=10),
+    retry_jitter_factor=0.5,
     log_prints=True                        
 )
-def fetch_box_metadata(box_id: str) -> Dict[str, Any]:
+async def fetch_box_metadata(box_id: str) -> Dict[str, Any]:
     """
     Holt Metadaten für eine spezifische Sensorbox von der OpenSenseMap API.
     """
@@ -32,154 +44,407 @@ def fetch_box_metadata(box_id: str) -> Dict[str, Any]:
         logger.error("Keine Box ID für den Metadatenabruf übergeben!")
         raise ValueError("box_id darf nicht leer sein.")
 
-    api_url = f"{OPEN_SENSE_MAP_API_URL}/boxes/{box_id}"
-    logger.info(f"Hole Metadaten für Box ID: {box_id} von API: {api_url}")
+    client = get_osm_client()
+    api_path = f"/boxes/{box_id}"
+    logger.info(f"Hole Metadaten für Box ID: {box_id} von API: {client.base_url}{api_path}")
 
     try:
-        response = requests.get(api_url, timeout=30) 
-
-        response.raise_for_status()
-
-        box_data = response.json()
+        box_data = await client.get_json(api_path)
         logger.info(f"Metadaten für Box '{box_data.get('name', box_id)}' erfolgreich geholt.")
         return box_data
 
     # --- Spezifischere Fehlerbehandlung für bessere Logs ---
-    except requests.exceptions.HTTPError as http_err:
+    except httpx.HTTPStatusError as http_err:
         logger.error(f"HTTP Fehler beim Abruf von Box {box_id}: Status {http_err.response.status_code}")
         try:
             logger.error(f"API Fehlerantwort (Auszug): {http_err.response.text[:500]}...")
         except Exception:
             pass 
         raise http_err from http_err
-    except requests.exceptions.ConnectionError as conn_err:
+    except httpx.ConnectError as conn_err:
          logger.error(f"Verbindungsfehler beim Abruf von Box {box_id}: {conn_err}")
          raise conn_err from conn_err
-    except requests.exceptions.Timeout as timeout_err:
+    except httpx.TimeoutException as timeout_err:
          logger.error(f"Timeout beim Abruf von Box {box_id}: {timeout_err}")
          raise timeout_err from timeout_err
-    except requests.exceptions.RequestException as req_err:
+    except httpx.RequestError as req_err:
         logger.error(f"Allgemeiner Request-Fehler beim Abruf von Box {box_id}: {req_err}")
         raise req_err from req_err
-    except requests.exceptions.JSONDecodeError as json_err:
+    except json.JSONDecodeError as json_err:
          logger.error(f"Fehler beim Parsen der JSON-Antwort für Box {box_id}: {json_err}")
-         try:
-              logger.error(f"Empfangener Text (Auszug): {response.text[:500]}...")
-         except NameError: 
-              pass
          raise ValueError(f"Ungültige JSON-Antwort von API für Box {box_id}") from json_err
 
 
+@task(
+    name="Fetch OpenSenseMap Box Metadata (conditional)",
+    retries=3,
+    retry_delay_seconds=exponential_backoff(backoff_factor=10),
+    retry_jitter_factor=0.5,
+    log_prints=True
+)
+async def fetch_box_metadata_conditional(
+    box_id: str,
+    etag: str | None = None,
+    last_modified: str | None = None
+) -> Dict[str, Any]:
+    """
+    Holt Metadaten einer Sensorbox mit If-None-Match/If-Modified-Since aus dem letzten Sync.
+    Rückgabe: {"not_modified", "metadata", "etag", "last_modified"}, bei HTTP 304 ist metadata None.
+    """
+    logger = get_run_logger()
+
+    if not box_id:
+        logger.error("Keine Box ID für den Metadatenabruf übergeben!")
+        raise ValueError("box_id darf nicht leer sein.")
+
+    client = get_osm_client()
+    api_path = f"/boxes/{box_id}"
+
+    try:
+        response = await client.get_json_conditional(api_path, etag=etag, last_modified=last_modified)
+    except httpx.HTTPStatusError as http_err:
+        logger.error(f"HTTP Fehler beim Abruf von Box {box_id}: Status {http_err.response.status_code}")
+        raise
+    except httpx.RequestError as req_err:
+        logger.error(f"Request-Fehler beim Abruf von Box {box_id}: {req_err}")
+        raise
+    except json.JSONDecodeError as json_err:
+        logger.error(f"Fehler beim Parsen der JSON-Antwort für Box {box_id}: {json_err}")
+        raise ValueError(f"Ungültige JSON-Antwort von API für Box {box_id}") from json_err
+
+    if response.not_modified:
+        logger.info(f"Metadaten für Box {box_id} unverändert (HTTP 304).")
+    else:
+        logger.info(f"Metadaten für Box '{response.data.get('name', box_id)}' erfolgreich geholt.")
+    return {
+        "not_modified": response.not_modified,
+        "metadata": response.data,
+        "etag": response.etag,
+        "last_modified": response.last_modified
+    }
+
+
+@task(
+    name="Fetch OpenSenseMap Boxes Metadata",
+    retries=3,
+    retry_delay_seconds=exponential_backoff(backoff_factor=10),
+    retry_jitter_factor=0.5,
+    log_prints=True
+)
+async def fetch_boxes_metadata(box_ids: List[str] | None = None, bbox: str | None = None) -> List[Dict[str, Any]]:
+    """
+    Holt Metadaten für mehrere Sensorboxen. Mit bbox ("lng_sw,lat_sw,lng_ne,lat_ne") werden alle Boxen
+    der Bounding Box in einem Request abgefragt (optional auf box_ids gefiltert), sonst werden die
+    box_ids einzeln und gleichzeitig über den gemeinsamen Client abgerufen.
+    Boxen, deren Abruf fehlschlägt, werden geloggt und übersprungen.
+    """
+    logger = get_run_logger()
+    client = get_osm_client()
+
+    if bbox:
+        logger.info(f"Hole Metadaten aller Boxen in Bounding Box {bbox} von API: {client.base_url}/boxes")
+        boxes = await client.get_json("/boxes", params={"bbox": bbox})
+        if not isinstance(boxes, list):
+            raise ValueError(f"Unerwartete Antwort für Bounding Box {bbox}: Liste erwartet.")
+        if box_ids:
+            wanted = set(box_ids)
+            boxes = [box for box in boxes if box.get('_id') in wanted]
+        logger.info(f"Metadaten für {len(boxes)} Boxen erhalten.")
+        return boxes
+
+    if not box_ids:
+        logger.error("Weder Box IDs noch Bounding Box für den Metadatenabruf übergeben!")
+        raise ValueError("box_ids oder bbox muss gesetzt sein.")
+
+    # Die API bietet keinen Sammelabruf per ID -> parallele Einzelabrufe, begrenzt durch die Host-Semaphore des Clients
+    responses = await asyncio.gather(
+        *(client.get_json(f"/boxes/{box_id}") for box_id in box_ids),
+        return_exceptions=True
+    )
+
+    boxes: List[Dict[str, Any]] = []
+    for box_id, response in zip(box_ids, responses):
+        if isinstance(response, Exception):
+            logger.error(f"Metadaten für Box {box_id} konnten nicht geholt werden: {response}")
+            continue
+        boxes.append(response)
+
+    logger.info(f"Metadaten für {len(boxes)}/{len(box_ids)} Boxen erhalten.")
+    return boxes
+
+
+def _format_api_datetime(dt: datetime) -> str:
+    """ Formatiert ein UTC-datetime für die OpenSenseMap API (ISO mit Millisekunden und 'Z'). """
+    return dt.isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+def _store_sensor_batch(
+    sensor_id: str,
+    parsed: ParsedMeasurements,
+    watermark: Tuple[datetime, datetime] | None = None,
+    write_mode: str = ingest_settings.INGEST_WRITE_MODE
+) -> int:
+    """
+    Schreibt einen Batch geparster Messwerte (blockierend, läuft in einem Worker-Thread).
+    Mit watermark=(von, bis) wird das Sensor-Watermark in derselben Transaktion fortgeschrieben.
+    Bei write_mode="redis_stream" wird der Batch samt Watermark nur an den Ingest-Stream
+    angehängt (utils/ingest_stream.py) und die Anzahl eingereihter Messwerte zurückgegeben.
+    """
+    logger = get_run_logger()
+    if write_mode == "redis_stream":
+        # Write-behind: der Consumer schreibt gesammelt, Daten und Watermark weiterhin in einer Transaktion
+        with metrics.timer("stream_append_seconds", sensor_id=sensor_id, rows=len(parsed)):
+            get_ingest_stream_producer().append(sensor_id, parsed.timestamps, parsed.values, watermark)
+        metrics.flush_if_due()
+        return len(parsed)
+
+    # Globales Limit für gleichzeitige DB-Writes über alle Boxen, Flows und Dask-Worker hinweg
+    write_slot = concurrency(ingest_settings.DB_WRITE_CONCURRENCY_LIMIT, occupy=1) \
+        if ingest_settings.DB_WRITE_CONCURRENCY_LIMIT else nullcontext()
+    slot_requested = time.perf_counter()
+    with write_slot, get_db_session() as db:
+        slot_acquired = time.perf_counter()
+        if db is None:
+            logger.error(f"[Chunk {sensor_id}] Konnte keine DB-Session zum Speichern erhalten.")
+            raise RuntimeError("DB Session nicht verfügbar zum Speichern.")
+
+        inserted = 0
+        if len(parsed):
+            # Nutze den spaltenbasierten COPY-Bulk-Insert. Bereits gespeicherte Messwerte
+            # (Retries, überlappende Fenster) werden über den natürlichen Schlüssel übersprungen.
+            # Commit erfolgt gemeinsam mit dem Watermark beim Verlassen der Session.
+            inserted = crud_sensor.sensor_data.create_multi_columnar(
+                db,
+                sensor_id=sensor_id,
+                measurement_timestamps=parsed.timestamps,
+                values=parsed.values,
+                on_conflict="nothing",
+                commit=False
+            )
+
+        if watermark is not None:
+            watermark_from, watermark_to = watermark
+            advanced = crud_sensor.sensor_ingestion_watermark.advance(
+                db, sensor_id=sensor_id, from_date=watermark_from, to_date=watermark_to
+            )
+            if not advanced:
+                logger.info(f"[Chunk {sensor_id}] Watermark nicht fortgeschrieben (Lücke vor {watermark_from} oder bereits weiter).")
+
+    # Wartezeit auf den Write-Slot getrennt von der eigentlichen Schreibdauer (inkl. Commit)
+    metrics.observe("db_write_slot_wait_seconds", slot_acquired - slot_requested, sensor_id=sensor_id)
+    metrics.observe("db_write_seconds", time.perf_counter() - slot_acquired, sensor_id=sensor_id, rows=len(parsed), inserted=inserted)
+    metrics.flush_if_due()
+    return inserted
+
+
+def _load_plausibility_filter(sensor_id: str) -> PlausibilityFilter | None:
+    """ Regel zur Einheit des Sensors und letzter gespeicherter Messwert als Anker (blockierend). """
+    with get_db_session() as db:
+        if db is None:
+            raise RuntimeError("DB Session nicht verfügbar für die Plausibilitätsprüfung.")
+        context = crud_sensor.sensor_data.get_plausibility_context(db, sensor_id=sensor_id, lookback=STUCK_LOOKBACK)
+    return PlausibilityFilter.from_context(context)
+
+
+def _store_rejected_batch(sensor_id: str, rejected: RejectedMeasurements) -> int:
+    """
+    Schreibt verworfene Messwerte nach sensor_data_rejected (blockierend, eigene Transaktion).
+    Bei Retries bereits vorhandene Einträge werden übersprungen.
+    """
+    with get_db_session() as db:
+        if db is None:
+            raise RuntimeError("DB Session nicht verfügbar zum Speichern verworfener Messwerte.")
+        return crud_sensor.sensor_data_rejected.create_multi_columnar(
+            db,
+            sensor_id=sensor_id,
+            measurement_timestamps=rejected.timestamps,
+            values=rejected.values,
+            reasons=rejected.reasons
+        )
+
+
 @task(
     name="Fetch and Store Sensor Chunk",
     retries=2,                 
-    retry_delay_seconds=15,     
+    retry_delay_seconds=exponential_backoff(backoff_factor=15),
+    retry_jitter_factor=0.5,
     log_prints=True
 )
-def fetch_store_sensor_chunk(
+async def fetch_store_sensor_chunk(
     sensor_id: str,
     box_id: str,
     chunk_from_date: datetime,
-    chunk_to_date: datetime
+    chunk_to_date: datetime,
+    write_mode: str | None = None
 ) -> Dict[str, Any]:
     """
     Holt, parst und speichert Messdaten für einen Sensor in einem Zeit-Chunk.
+    Antworten am API-Limit werden automatisch mit einem Folge-Request für den älteren Rest des Fensters ergänzt.
+    Die API-Antwort wird inkrementell dekodiert und in Batches von `INGEST_BATCH_SIZE`
+    Messwerten gespeichert, der Speicherbedarf bleibt damit unabhängig von der Chunk-Dichte.
+    write_mode (Standard INGEST_WRITE_MODE): "direct" schreibt selbst, "redis_stream" reiht die Batches
+    für den Write-behind-Consumer ein (points_inserted zählt dann die eingereihten Messwerte).
     """
     logger = get_run_logger()
+    chunk_started = time.perf_counter()
+    if task_run.run_count > 1:
+        metrics.observe("chunk_retries", task_run.run_count - 1, sensor_id=sensor_id, box_id=box_id)
     result = {
         "sensor_id": sensor_id,
         "chunk_from": chunk_from_date,
         "chunk_to": chunk_to_date,
         "success": False,
+        "points_received": 0,
         "points_fetched": 0,
+        "points_inserted": 0,
+        "points_invalid": 0,
+        "points_rejected": 0,
+        "truncated_requests": 0,
         "last_timestamp_in_chunk": None 
     }
 
-    # Stelle sicher, dass Datumsangaben Timezone-aware sind und formatiere für API
+    # Stelle sicher, dass Datumsangaben Timezone-aware sind
     try:
-        from_date_str = chunk_from_date.astimezone(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
-        to_date_str = chunk_to_date.astimezone(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+        chunk_from_utc = chunk_from_date.astimezone(timezone.utc)
+        chunk_to_utc = chunk_to_date.astimezone(timezone.utc)
     except AttributeError:
         logger.error(f"[Chunk {sensor_id}] Ungültige Datums-Objekte empfangen: From={chunk_from_date}, To={chunk_to_date}")
         return result 
 
-    api_url = f"{OPEN_SENSE_MAP_API_URL}/boxes/{box_id}/data/{sensor_id}"
-    params = {"from-date": from_date_str, "to-date": to_date_str, "format": "json"}
-    logger.info(f"[Chunk {sensor_id}] API Request: Von {from_date_str} Bis {to_date_str}")
+    client = get_osm_client()
+    api_path = f"/boxes/{box_id}/data/{sensor_id}"
+
+    # Frühester Zeitstempel des aktuellen Requests (für die Fortsetzung abgeschnittener Antworten)
+    request_earliest_ts: datetime | None = None
+
+    def parse_batch(batch: List[Dict[str, Any]]) -> ParsedMeasurements:
+        nonlocal request_earliest_ts
 
-    all_sensor_data_schemas: List[sensor_schema.SensorDataCreate] = []
-    batch_latest_ts: datetime | None = None
+        # === Schritt 2: Batch vektorisiert parsen und validieren ===
+        parsed = parse_measurements(batch)
+        if parsed.invalid_count:
+            result["points_invalid"] += parsed.invalid_count
+        if len(parsed):
+            batch_earliest_ts = parsed.earliest_timestamp()
+            if request_earliest_ts is None or batch_earliest_ts < request_earliest_ts:
+                request_earliest_ts = batch_earliest_ts
+        return parsed
+
+    # Plausibilitätsprüfung (utils/plausibility.py), Regel und Anker werden beim ersten Batch geladen
+    plausibility: PlausibilityFilter | None = None
+    plausibility_loaded = not ingest_settings.PLAUSIBILITY_FILTER_ENABLED
+
+    async def store(parsed: ParsedMeasurements, watermark: Tuple[datetime, datetime] | None = None) -> None:
+        nonlocal plausibility, plausibility_loaded
+        if not len(parsed) and watermark is None:
+            return
+
+        # === Schritt 3: Batch in DB speichern ===
+        try:
+            if len(parsed) and not plausibility_loaded:
+                plausibility = await asyncio.to_thread(_load_plausibility_filter, sensor_id)
+                plausibility_loaded = True
+            if len(parsed) and plausibility is not None:
+                # Vektorisiert über den ganzen Batch, verworfene Werte landen in der Seitentabelle
+                parsed, rejected = plausibility.apply(parsed)
+                if len(rejected):
+                    await asyncio.to_thread(_store_rejected_batch, sensor_id, rejected)
+                    result["points_rejected"] += len(rejected)
+                if not len(parsed) and watermark is None:
+                    return
+
+            # Blockierenden DB-Write aus dem Event-Loop auslagern, damit weitere Requests laufen können
+            inserted = await asyncio.to_thread(
+                _store_sensor_batch, sensor_id, parsed, watermark, write_mode or ingest_settings.INGEST_WRITE_MODE
+            )
+        except SQLAlchemyError as e_db:
+            logger.error(f"[Chunk {sensor_id}] DB Fehler beim Speichern von {len(parsed)} Punkten: {e_db}", exc_info=True)
+            raise 
+        except Exception as e_crud:
+            logger.error(f"[Chunk {sensor_id}] Unerwarteter Fehler in create_multi_columnar: {e_crud}", exc_info=True)
+            raise 
+
+        if not len(parsed):
+            return
+        batch_latest_ts = parsed.latest_timestamp()
+        result["points_fetched"] += len(parsed)
+        result["points_inserted"] += inserted
+        if result["last_timestamp_in_chunk"] is None or batch_latest_ts > result["last_timestamp_in_chunk"]:
+            result["last_timestamp_in_chunk"] = batch_latest_ts
 
     try:
-        # === Schritt 1: API-Aufruf ===
-        response = requests.get(api_url, params=params, timeout=60)
-        response.raise_for_status() 
-        sensor_measurements = response.json()
-        logger.info(f"[Chunk {sensor_id}] API Antwort: {len(sensor_measurements)} Punkte erhalten.")
-
-        # === Schritt 2: Daten parsen und validieren ===
-        if sensor_measurements:
-            for measurement in sensor_measurements:
-                try:
-                    ts = parse_api_datetime(measurement.get('createdAt'))
-                    val_str = measurement.get('value')
-
-                    if ts is None or val_str is None:
-                        logger.warning(f"[Chunk {sensor_id}] Überspringe Messwert wegen fehlendem Datum/Wert: {measurement}")
-                        continue
-
-                    # Konvertiere Wert zu float
-                    val = float(val_str)
-
-                    # Stelle sicher, dass Zeitstempel UTC ist
-                    ts_utc = ts.astimezone(timezone.utc)
-
-                    # Erstelle Pydantic Schema für DB-Einfügung
-                    all_sensor_data_schemas.append(sensor_schema.SensorDataCreate(
-                        sensor_id=sensor_id, 
-                        value=val,
-                        measurement_timestamp=ts_utc 
-                    ))
-
-                    # Merke dir den letzten Zeitstempel dieses Chunks
-                    if batch_latest_ts is None or ts_utc > batch_latest_ts:
-                        batch_latest_ts = ts_utc
-
-                except (ValueError, TypeError, KeyError) as e_meas:
-                    logger.warning(f"[Chunk {sensor_id}] Überspringe ungültigen Messwert: {measurement}. Fehler: {e_meas}")
-                    continue
-
-            # === Schritt 3: Daten in DB speichern (wenn vorhanden) ===
-            if all_sensor_data_schemas:
-                with get_db_session() as db:
-                    if db is None:
-                        logger.error(f"[Chunk {sensor_id}] Konnte keine DB-Session zum Speichern erhalten.")
-                        raise RuntimeError("DB Session nicht verfügbar zum Speichern.")
-
-                    try:
-                        # Nutze die Bulk-Insert Funktion
-                        crud_sensor.sensor_data.create_multi(db, objs_in=all_sensor_data_schemas)
-                        logger.info(f"[Chunk {sensor_id}] {len(all_sensor_data_schemas)} Datenpunkte erfolgreich in DB gespeichert.")
-                        result["points_fetched"] = len(all_sensor_data_schemas)
-                        result["last_timestamp_in_chunk"] = batch_latest_ts
-                        result["success"] = True
-                    except SQLAlchemyError as e_db:
-                        logger.error(f"[Chunk {sensor_id}] DB Fehler beim Speichern von {len(all_sensor_data_schemas)} Punkten: {e_db}", exc_info=True)
-                        raise 
-                    except Exception as e_crud:
-                         logger.error(f"[Chunk {sensor_id}] Unerwarteter Fehler in create_multi: {e_crud}", exc_info=True)
-                         raise 
-            else:
-                 logger.info(f"[Chunk {sensor_id}] Keine gültigen Messwerte in diesem Chunk gefunden/empfangen.")
-                 result["success"] = True
+        request_to_utc = chunk_to_utc
+        while True:
+            # === Schritt 1: API-Aufruf, Antwort wird gestreamt dekodiert ===
+            params = {
+                "from-date": _format_api_datetime(chunk_from_utc),
+                "to-date": _format_api_datetime(request_to_utc),
+                "format": "json"
+            }
+            logger.info(f"[Chunk {sensor_id}] API Request: Von {params['from-date']} Bis {params['to-date']}")
+
+            points_received = 0
+            request_earliest_ts = None
+            async with client.stream(api_path, params=params) as response:
+                batch: List[Dict[str, Any]] = []
+                async for measurement in iter_json_array(response.aiter_text()):
+                    points_received += 1
+                    batch.append(measurement)
+                    if len(batch) >= ingest_settings.INGEST_BATCH_SIZE:
+                        await store(parse_batch(batch))
+                        batch = []
+                # Der letzte Batch wird erst nach der Fortsetzungs-Entscheidung gespeichert
+                last_batch = parse_batch(batch)
+
+            result["points_received"] += points_received
+            logger.info(f"[Chunk {sensor_id}] API Antwort: {points_received} Punkte erhalten.")
+
+            # Die API liefert höchstens OSM_API_MAX_POINTS Messwerte (neueste zuerst). Bei einer vollen
+            # Antwort fehlt der ältere Teil des Fensters -> Rest [from, ältester erhaltener Punkt] nachladen.
+            continue_request = (
+                points_received >= ingest_settings.OSM_API_MAX_POINTS
+                and request_earliest_ts is not None
+            )
+            if continue_request and (request_earliest_ts <= chunk_from_utc or request_earliest_ts >= request_to_utc):
+                logger.warning(f"[Chunk {sensor_id}] Antwort am API-Limit, aber kein Fortschritt im Fenster möglich (ältester Punkt {request_earliest_ts}).")
+                continue_request = False
+
+            if not continue_request:
+                # Letzter Batch des Chunks: Daten und Sensor-Watermark in einer Transaktion
+                await store(last_batch, watermark=(chunk_from_utc, chunk_to_utc))
+                break
+
+            await store(last_batch)
+            logger.info(f"[Chunk {sensor_id}] Antwort am API-Limit ({points_received} Punkte), lade Rest bis {request_earliest_ts} nach.")
+            result["truncated_requests"] += 1
+            request_to_utc = request_earliest_ts
+
+        if result["points_invalid"]:
+            logger.warning(f"[Chunk {sensor_id}] {result['points_invalid']} Messwerte wegen fehlendem/ungültigem Datum oder Wert verworfen.")
+        if result["points_rejected"]:
+            logger.warning(f"[Chunk {sensor_id}] {result['points_rejected']} unplausible Messwerte nach sensor_data_rejected verschoben.")
+        if result["points_fetched"]:
+            logger.info(f"[Chunk {sensor_id}] {result['points_inserted']} neue Datenpunkte gespeichert ({result['points_fetched'] - result['points_inserted']} bereits vorhanden).")
+        else:
+            logger.info(f"[Chunk {sensor_id}] Keine gültigen Messwerte in diesem Chunk gefunden/empfangen.")
+        result["success"] = True
+
+        duration = time.perf_counter() - chunk_started
+        window_seconds = (chunk_to_utc - chunk_from_utc).total_seconds()
+        metrics.observe("chunk_duration_seconds", duration, sensor_id=sensor_id, box_id=box_id, window_seconds=window_seconds)
+        metrics.observe("chunk_points_fetched", result["points_fetched"], sensor_id=sensor_id, box_id=box_id)
+        metrics.observe("chunk_points_inserted", result["points_inserted"], sensor_id=sensor_id, box_id=box_id)
+        metrics.observe("chunk_points_rejected", result["points_rejected"], sensor_id=sensor_id, box_id=box_id)
+        if duration > 0:
+            metrics.observe("chunk_points_per_second", result["points_fetched"] / duration, sensor_id=sensor_id, box_id=box_id)
 
         # === Schritt 4: Fehlerbehandlung für API-Call / Allgemeine Fehler ===
-    except requests.exceptions.HTTPError as http_err:
+    except httpx.HTTPStatusError as http_err:
         logger.error(f"[Chunk {sensor_id}] HTTP Fehler: Status {http_err.response.status_code}")
         try: logger.error(f"API Fehlerantwort (Auszug): {http_err.response.text[:500]}...")
         except Exception: pass
         raise http_err
-    except requests.exceptions.RequestException as req_err:
+    except httpx.RequestError as req_err:
         logger.error(f"[Chunk {sensor_id}] Request Fehler: {req_err}")
         raise req_err 
     except ValueError as val_err: 
@@ -188,6 +453,11 @@ def fetch_store_sensor_chunk(
     except Exception as e_gen:
         logger.error(f"[Chunk {sensor_id}] Unerwarteter Fehler im Task: {e_gen}", exc_info=True)
         raise e_gen #
+    finally:
+        if not result["success"]:
+            metrics.observe("chunk_failures", 1, sensor_id=sensor_id, box_id=box_id, attempt=task_run.run_count)
+        # Synchroner DB-Write der gepufferten Metriken, nicht im Event-Loop
+        await asyncio.to_thread(metrics.flush)
 
     logger.info(f"[Chunk {sensor_id}] Task beendet mit Erfolg: {result['success']}")
     return result 
@@ -231,7 +501,8 @@ def fetch_sensor_data_for_ml(weeks: int = 16) -> pd.DataFrame:
     print(f"Parameter: {params}")
 
     try:
-        response = requests.get(endpoint_url, params=params) 
+        # Backend-Endpunkt statt OpenSenseMap: ohne Rate Limiter, ohne Timeout wie bisher
+        response = httpx.get(endpoint_url, params=params, timeout=None)
         response.raise_for_status() 
 
         response_json: Dict[str, Any] = response.json()
@@ -255,7 +526,7 @@ def fetch_sensor_data_for_ml(weeks: int = 16) -> pd.DataFrame:
         print(f"Aggregierte stündliche Daten erfolgreich geladen. {len(df)} Datenpunkte von {df.index.min()} bis {df.index.max()}.")
         return df
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"Fehler beim Abrufen der Daten von der API: {e}")
         raise  
     except Exception as e:
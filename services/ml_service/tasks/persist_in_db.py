@@ -3,8 +3,10 @@ from prefect import task,  get_run_logger
 from prefect import task, get_run_logger
 from sqlalchemy.orm import Session, attributes 
 from sqlalchemy.exc import SQLAlchemyError    
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 from datetime import datetime, timedelta, timezone
+import hashlib
+import json
 
 from utils.db_utils import get_db_session
 
@@ -13,13 +15,111 @@ from shared.schemas import sensor as sensor_schema
 from utils.parse_datetime import parse_api_datetime 
 
 
-@task(
-    name="Sync Box and Sensors in DB",
-    log_prints=True
-)
-def sync_box_and_sensors_in_db(box_metadata: Dict[str, Any], initial_fetch_days: int) -> Dict[str, Any]:
+# Felder, die sich mit jeder neuen Messung ändern und für den Sync irrelevant sind
+_VOLATILE_BOX_FIELDS = {"lastMeasurementAt", "updatedAt"}
+_VOLATILE_SENSOR_FIELDS = {"lastMeasurement"}
+
+
+def box_metadata_hash(box_metadata: Dict[str, Any]) -> str:
+    """
+    sha256 über die Box-Metadaten ohne die bei jeder Messung wechselnden Felder
+    (lastMeasurementAt, updatedAt, sensors[].lastMeasurement).
+    """
+    stable = {k: v for k, v in box_metadata.items() if k not in _VOLATILE_BOX_FIELDS}
+    if isinstance(stable.get('sensors'), list):
+        stable['sensors'] = [
+            {k: v for k, v in sensor.items() if k not in _VOLATILE_SENSOR_FIELDS} if isinstance(sensor, dict) else sensor
+            for sensor in stable['sensors']
+        ]
+    payload = json.dumps(stable, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _as_utc(dt: datetime | None) -> datetime | None:
+    return dt.astimezone(timezone.utc) if dt else None
+
+
+@task(name="Load Box Sync States", log_prints=True)
+def load_box_sync_states(box_ids: List[str]) -> Dict[str, Dict[str, Any]]:
     """
-    Synchronisiert die Sensorbox und ihre Sensoren mit der Datenbank.
+    Liest den zuletzt synchronisierten Stand mehrerer Boxen (Metadaten-Hash, HTTP-Validatoren, Watermarks)
+    mit zwei Abfragen, ohne die Sensor-Beziehung zu laden. Boxen, die noch nicht in der DB sind, fehlen im Ergebnis.
+    Das Ergebnis hat dasselbe Format wie der Rückgabewert von sync_box_and_sensors_in_db.
+    """
+    logger = get_run_logger()
+    with get_db_session() as db:
+        if db is None:
+            logger.warning("Konnte keine DB-Session für load_box_sync_states erhalten. Nutze vollständigen Sync.")
+            return {}
+        boxes = crud_sensor.sensor_box.get_multi_by_ids(db, box_ids=box_ids)
+        watermarks = crud_sensor.sensor_ingestion_watermark.get_by_box_ids(db, box_ids=[box.box_id for box in boxes])
+
+        states: Dict[str, Dict[str, Any]] = {}
+        for box in boxes:
+            sensor_watermarks = watermarks.get(box.box_id, {})
+            states[box.box_id] = {
+                "box_id": box.box_id,
+                "db_last_measurement_at": _as_utc(box.lastMeasurementAt),
+                "db_last_data_fetched": _as_utc(box.last_data_fetched),
+                "sensor_ids": list(sensor_watermarks),
+                "sensor_watermarks": {sensor_id: _as_utc(watermark) for sensor_id, watermark in sensor_watermarks.items()},
+                "metadata_hash": box.metadata_hash,
+                "metadata_etag": box.metadata_etag,
+                "metadata_last_modified": box.metadata_last_modified,
+            }
+    return states
+
+
+@task(name="Touch Box Sync State", log_prints=True)
+def touch_box_sync_state(
+    cached_state: Dict[str, Any],
+    api_last_measurement_str: str | None,
+    metadata_etag: str | None = None,
+    metadata_last_modified: str | None = None
+) -> Dict[str, Any]:
+    """
+    Fast Path bei unveränderten Metadaten: aktualisiert nur lastMeasurementAt und die HTTP-Validatoren
+    mit einem UPDATE und gibt den gecachten Stand zurück, statt Box und Sensoren erneut zu synchronisieren.
+    """
+    logger = get_run_logger()
+    box_id = cached_state["box_id"]
+    api_last_measurement = parse_api_datetime(api_last_measurement_str)
+
+    db_last_measurement_at = cached_state.get("db_last_measurement_at")
+    measurement_advanced = api_last_measurement is not None and (
+        db_last_measurement_at is None or api_last_measurement > db_last_measurement_at
+    )
+    validators_changed = (metadata_etag or None, metadata_last_modified or None) != (
+        cached_state.get("metadata_etag"), cached_state.get("metadata_last_modified")
+    )
+    if measurement_advanced or validators_changed:
+        with get_db_session() as db:
+            if db is None:
+                raise RuntimeError("DB Session nicht verfügbar für touch_box_sync_state.")
+            crud_sensor.sensor_box.touch_metadata(
+                db,
+                box_id=box_id,
+                last_measurement_at=api_last_measurement,
+                metadata_etag=metadata_etag,
+                metadata_last_modified=metadata_last_modified
+            )
+
+    logger.info(f"[DB Sync] Metadaten von Box {box_id} unverändert, überspringe Sync.")
+    state = dict(cached_state)
+    if measurement_advanced:
+        state["db_last_measurement_at"] = api_last_measurement
+    return state
+
+
+def _build_sync_payloads(
+    box_metadata: Dict[str, Any],
+    initial_fetch_days: int,
+    metadata_etag: str | None = None,
+    metadata_last_modified: str | None = None
+) -> Tuple[sensor_schema.SensorBoxCreate, List[sensor_schema.SensorCreate]]:
+    """
+    Validiert die API-Metadaten einer Box und baut die Payloads für den Bulk-Upsert von Box und Sensoren.
+    Wirft ValueError bei fehlenden Pflichtfeldern der Box, ungültige Sensoren werden übersprungen.
     """
     logger = get_run_logger()
     box_id = box_metadata.get('_id')
@@ -28,6 +128,127 @@ def sync_box_and_sensors_in_db(box_metadata: Dict[str, Any], initial_fetch_days:
         logger.error("Box ID fehlt in den übergebenen Metadaten!")
         raise ValueError("Box ID fehlt in den Metadaten für DB Sync.")
 
+    # Initiales last_data_fetched, wird nur beim Einfügen neuer Boxen übernommen
+    api_last_measurement = parse_api_datetime(box_metadata.get('lastMeasurementAt'))
+    calculated_last_fetched = None
+    if api_last_measurement:
+        calculated_last_fetched = api_last_measurement - timedelta(days=initial_fetch_days)
+    else:
+        logger.warning(f"[DB Sync] 'lastMeasurementAt' fehlt für Box '{box_id}'. Initiales 'last_data_fetched' ist None.")
+
+    try:
+        box_payload = sensor_schema.SensorBoxCreate(
+            box_id=box_metadata['_id'],
+            name=box_metadata['name'],
+            exposure=box_metadata.get('exposure'),
+            model=box_metadata.get('model'),
+            currentLocation=box_metadata.get('currentLocation'),
+            lastMeasurementAt=api_last_measurement,
+            last_data_fetched=calculated_last_fetched,
+            createdAt=parse_api_datetime(box_metadata.get('createdAt')) or datetime.now(timezone.utc),
+            updatedAt=parse_api_datetime(box_metadata.get('updatedAt')) or datetime.now(timezone.utc),
+            metadata_hash=box_metadata_hash(box_metadata),
+            metadata_etag=metadata_etag,
+            metadata_last_modified=metadata_last_modified
+        )
+    except KeyError as e:
+        logger.error(f"[DB Sync] Fehlendes Pflichtfeld '{e}' in API Metadaten für Box Erstellung.")
+        raise ValueError(f"Fehlendes Pflichtfeld '{e}' für Box {box_id}") from e
+    except Exception as e_val:
+        logger.error(f"[DB Sync] Validierungsfehler beim Erstellen des Box Payloads: {e_val}", exc_info=True)
+        raise ValueError(f"Payload Validierungsfehler für Box {box_id}") from e_val
+
+    sensor_payloads: List[sensor_schema.SensorCreate] = []
+    api_sensors = box_metadata.get('sensors', [])
+    if not isinstance(api_sensors, list):
+        logger.warning(f"[DB Sync] Keine gültige 'sensors'-Liste in API-Daten für Box '{box_id}' gefunden.")
+        api_sensors = []
+
+    for api_sensor in api_sensors:
+        api_sensor_id = api_sensor.get('_id')
+        if not api_sensor_id:
+            logger.warning(f"[DB Sync] Überspringe Sensor ohne '_id' in Metadaten: {api_sensor}")
+            continue
+        try:
+            sensor_payloads.append(sensor_schema.SensorCreate(
+                sensor_id=api_sensor_id,
+                title=api_sensor.get('title'),
+                unit=api_sensor.get('unit'),
+                sensor_type=api_sensor.get('sensorType'),
+                icon=api_sensor.get('icon'),
+                box_id=box_id # Verknüpfung zur Box
+            ))
+        except Exception as e_sensor:
+            logger.error(f"[DB Sync] Ungültige Metadaten für Sensor '{api_sensor_id}': {e_sensor}", exc_info=True)
+
+    return box_payload, sensor_payloads
+
+
+def _sync_boxes(
+    db: Session,
+    payloads: List[Tuple[sensor_schema.SensorBoxCreate, List[sensor_schema.SensorCreate]]]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Upsert von Boxen, Sensoren und fehlenden Watermarks mit je einem Statement (eine Transaktion für alle Boxen).
+    Gibt den DB-Status je Box zurück (Format wie load_box_sync_states, zusätzlich 'is_newly_created').
+    """
+    logger = get_run_logger()
+
+    # === Schritt 1: Boxen einfügen/aktualisieren (lastMeasurementAt nur vorwärts, last_data_fetched bleibt) ===
+    box_rows = crud_sensor.sensor_box.upsert_multi(db, objs_in=[box_payload for box_payload, _ in payloads])
+
+    # === Schritt 2: Sensoren aller Boxen einfügen/aktualisieren ===
+    sensor_rows = crud_sensor.sensor.upsert_multi(
+        db, objs_in=[sensor_payload for _, sensor_payloads in payloads for sensor_payload in sensor_payloads]
+    )
+    new_boxes = [box_id for box_id, row in box_rows.items() if row["inserted"]]
+    new_sensors = [sensor_id for sensor_id, inserted in sensor_rows.items() if inserted]
+    logger.info(
+        f"[DB Sync] {len(box_rows)} Boxen ({len(new_boxes)} neu) und {len(sensor_rows)} Sensoren ({len(new_sensors)} neu) synchronisiert."
+    )
+
+    # === Schritt 3: Watermarks pro Sensor sicherstellen (neue Sensoren starten beim Box-Watermark) ===
+    crud_sensor.sensor_ingestion_watermark.ensure_for_box_ids(db, box_ids=list(box_rows))
+    watermarks = crud_sensor.sensor_ingestion_watermark.get_by_box_ids(db, box_ids=list(box_rows))
+
+    # === Schritt 4: Rückgabewert vorbereiten ===
+    states: Dict[str, Dict[str, Any]] = {}
+    for box_payload, _ in payloads:
+        row = box_rows[box_payload.box_id]
+        sensor_watermarks = watermarks.get(box_payload.box_id, {})
+        states[box_payload.box_id] = {
+            "box_id": box_payload.box_id,
+            "is_newly_created": row["inserted"],
+            "db_last_measurement_at": _as_utc(row["lastMeasurementAt"]),
+            "db_last_data_fetched": _as_utc(row["last_data_fetched"]),
+            "sensor_ids": list(sensor_watermarks),
+            "sensor_watermarks": {sensor_id: _as_utc(watermark) for sensor_id, watermark in sensor_watermarks.items()},
+            "metadata_hash": box_payload.metadata_hash,
+            "metadata_etag": box_payload.metadata_etag,
+            "metadata_last_modified": box_payload.metadata_last_modified
+        }
+    return states
+
+
+@task(
+    name="Sync Box and Sensors in DB",
+    log_prints=True
+)
+def sync_box_and_sensors_in_db(
+    box_metadata: Dict[str, Any],
+    initial_fetch_days: int,
+    metadata_etag: str | None = None,
+    metadata_last_modified: str | None = None
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Synchronisiert die Sensorbox und ihre Sensoren mit der Datenbank (Bulk-Upsert in einer Transaktion).
+    Speichert den Metadaten-Hash und die HTTP-Validatoren für den Fast Path der folgenden Läufe.
+    Gibt den DB-Status der Box und zurück, ob sie neu angelegt wurde.
+    """
+    logger = get_run_logger()
+    payload = _build_sync_payloads(box_metadata, initial_fetch_days, metadata_etag, metadata_last_modified)
+    box_id = payload[0].box_id
+
     # Nutze den DB Session Context Manager
     with get_db_session() as db:
         if db is None:
@@ -35,123 +256,9 @@ def sync_box_and_sensors_in_db(box_metadata: Dict[str, Any], initial_fetch_days:
             raise RuntimeError("DB Session nicht verfügbar für Sync.")
 
         logger.info(f"[DB Sync] Starte Sync für Box: {box_id}")
-
         try:
-            # === Schritt 1: Box holen oder erstellen ===
-            db_sensor_box = crud_sensor.sensor_box.get(db, id=box_id)
-            is_new_box = False
-
-            if not db_sensor_box:
-                is_new_box = True
-                logger.info(f"[DB Sync] SensorBox '{box_id}' nicht gefunden. Erstelle...")
-
-                # Berechne initiales last_data_fetched nur für neue Boxen
-                api_last_measurement = parse_api_datetime(box_metadata.get('lastMeasurementAt'))
-                calculated_last_fetched = None
-                if api_last_measurement:
-                     calculated_last_fetched = api_last_measurement - timedelta(days=initial_fetch_days)
-                     logger.info(f"[DB Sync] Berechnetes initiales 'last_data_fetched': {calculated_last_fetched}")
-                else:
-                     logger.warning(f"[DB Sync] 'lastMeasurementAt' fehlt für initiale 'last_data_fetched'-Berechnung. Setze auf None.")
-
-                # Erstelle Box-Payload und validiere mit Pydantic Schema
-                try:
-                    box_create_payload = {
-                        "box_id": box_metadata['_id'],
-                        "name": box_metadata['name'], 
-                        "exposure": box_metadata.get('exposure'),
-                        "model": box_metadata.get('model'),
-                        "currentLocation": box_metadata.get('currentLocation'),
-                        "lastMeasurementAt": api_last_measurement, 
-                        "last_data_fetched": calculated_last_fetched, 
-                        "createdAt": parse_api_datetime(box_metadata.get('createdAt')) or datetime.now(timezone.utc),
-                        "updatedAt": parse_api_datetime(box_metadata.get('updatedAt')) or datetime.now(timezone.utc)
-                    }
-                    sensor_box_schema_create = sensor_schema.SensorBoxCreate(**box_create_payload)
-                except KeyError as e:
-                    logger.error(f"[DB Sync] Fehlendes Pflichtfeld '{e}' in API Metadaten für Box Erstellung.")
-                    raise ValueError(f"Fehlendes Pflichtfeld '{e}' für Box {box_id}") from e
-                except Exception as e_val: 
-                     logger.error(f"[DB Sync] Validierungsfehler beim Erstellen des Box Payloads: {e_val}", exc_info=True)
-                     raise ValueError(f"Payload Validierungsfehler für Box {box_id}") from e_val
-
-                # Erstelle Box-Objekt in der DB-Session
-                db_sensor_box = crud_sensor.sensor_box.create(db, obj_in=sensor_box_schema_create)
-                logger.info(f"[DB Sync] SensorBox '{box_id}' zur Session hinzugefügt.")
-                # Flush ist nötig, damit die Box (und ihre ID) in der Session bekannt ist,
-                # bevor wir versuchen, Sensoren damit zu verknüpfen.
-                db.flush()
-                db.refresh(db_sensor_box)
-
-            else:
-                logger.info(f"[DB Sync] SensorBox '{box_id}' bereits in DB gefunden.")
-
-            # === Schritt 2: Zugehörige Sensoren holen oder erstellen ===
-            if not db_sensor_box:
-                 logger.critical(f"[DB Sync] Interner Fehler: db_sensor_box ist None nach Get/Create für Box {box_id}.")
-                 raise RuntimeError(f"Konnte SensorBox Objekt für {box_id} nicht laden/erstellen.")
-
-            existing_sensor_ids = {s.sensor_id for s in db_sensor_box.sensors}
-            logger.info(f"[DB Sync] Aktuell {len(existing_sensor_ids)} Sensoren für Box {box_id} in DB bekannt.")
-
-            api_sensors = box_metadata.get('sensors', [])
-            sensors_created_count = 0
-            if isinstance(api_sensors, list):
-                logger.info(f"[DB Sync] Verarbeite {len(api_sensors)} Sensoren aus API-Metadaten...")
-                for api_sensor in api_sensors:
-                    api_sensor_id = api_sensor.get('_id')
-                    if not api_sensor_id:
-                        logger.warning(f"[DB Sync] Überspringe Sensor ohne '_id' in Metadaten: {api_sensor}")
-                        continue
-
-                    # Prüfen, ob der Sensor bereits existiert
-                    if api_sensor_id not in existing_sensor_ids:
-                         logger.info(f"[DB Sync] Erstelle Sensor '{api_sensor_id}' für Box '{box_id}'...")
-                         try:
-                             sensor_create_schema = sensor_schema.SensorCreate(
-                                 sensor_id=api_sensor_id,
-                                 title=api_sensor.get('title'),
-                                 unit=api_sensor.get('unit'),
-                                 sensor_type=api_sensor.get('sensorType'),
-                                 box_id=box_id # Verknüpfung zur Box
-                             )
-                             crud_sensor.sensor.create(db, obj_in=sensor_create_schema)
-                             sensors_created_count += 1
-                         except Exception as e_sensor:
-                             logger.error(f"[DB Sync] Fehler beim Erstellen von Sensor '{api_sensor_id}': {e_sensor}", exc_info=True)
-
-
-                if sensors_created_count > 0:
-                     logger.info(f"[DB Sync] {sensors_created_count} neue Sensoren zur Session hinzugefügt.")
-                     # Flush erneut, um neue Sensoren in der Session verfügbar zu machen
-                     db.flush()
-                     # Lade die 'sensors'-Beziehung neu, um die neuen Sensoren zu inkludieren
-                     db.refresh(db_sensor_box, attribute_names=['sensors'])
-            else:
-                 logger.warning(f"[DB Sync] Keine gültige 'sensors'-Liste in API-Daten für Box '{box_id}' gefunden.")
-
-            # === Schritt 3: lastMeasurementAt aktualisieren ===
-            api_last_measurement_at_dt = parse_api_datetime(box_metadata.get('lastMeasurementAt'))
-            if api_last_measurement_at_dt:
-                db_last_measurement_at_dt = db_sensor_box.lastMeasurementAt.astimezone(timezone.utc) if db_sensor_box.lastMeasurementAt else None
-                api_last_measurement_at_dt = api_last_measurement_at_dt.astimezone(timezone.utc)
-
-                if db_last_measurement_at_dt is None or api_last_measurement_at_dt > db_last_measurement_at_dt:
-                    logger.info(f"[DB Sync] Aktualisiere lastMeasurementAt für Box '{box_id}' von {db_last_measurement_at_dt} auf {api_last_measurement_at_dt}.")
-                    db_sensor_box.lastMeasurementAt = api_last_measurement_at_dt
-                else:
-                     logger.info(f"[DB Sync] DB.lastMeasurementAt ({db_last_measurement_at_dt}) ist aktuell.")
-
-            # === Schritt 4: Rückgabewert vorbereiten ===
-            final_sensor_ids = [s.sensor_id for s in db_sensor_box.sensors]
-            db_state_to_return = {
-                "box_id": db_sensor_box.box_id,
-                "db_last_measurement_at": db_sensor_box.lastMeasurementAt.astimezone(timezone.utc) if db_sensor_box.lastMeasurementAt else None,
-                "db_last_data_fetched": db_sensor_box.last_data_fetched.astimezone(timezone.utc) if db_sensor_box.last_data_fetched else None,
-                "sensor_ids": final_sensor_ids
-            }
+            db_state_to_return = _sync_boxes(db, [payload])[box_id]
             logger.info(f"[DB Sync] Vorbereiteter Rückgabestatus: {db_state_to_return}")
-
         except SQLAlchemyError as e_db:
             logger.error(f"[DB Sync] Datenbankfehler während Sync für Box {box_id}: {e_db}", exc_info=True)
             raise 
@@ -160,7 +267,42 @@ def sync_box_and_sensors_in_db(box_metadata: Dict[str, Any], initial_fetch_days:
             raise 
 
     logger.info(f"[DB Sync] Sync-Task für Box {box_id} abgeschlossen.")
-    return db_state_to_return, is_new_box
+    return db_state_to_return, db_state_to_return["is_newly_created"]
+
+
+@task(
+    name="Sync Boxes and Sensors in DB",
+    log_prints=True
+)
+def sync_boxes_and_sensors_in_db(boxes_metadata: List[Dict[str, Any]], initial_fetch_days: int) -> Dict[str, Dict[str, Any]]:
+    """
+    Synchronisiert viele Boxen samt Sensoren mit je einem Upsert-Statement für Boxen, Sensoren und Watermarks.
+    Boxen mit ungültigen Metadaten werden geloggt und übersprungen. Gibt den DB-Status je box_id zurück
+    ('is_newly_created' kennzeichnet neu angelegte Boxen).
+    """
+    logger = get_run_logger()
+
+    payloads = []
+    for box_metadata in boxes_metadata:
+        try:
+            payloads.append(_build_sync_payloads(box_metadata, initial_fetch_days))
+        except ValueError as e:
+            logger.error(f"[DB Sync] Überspringe Box {box_metadata.get('_id')}: {e}")
+    if not payloads:
+        return {}
+
+    with get_db_session() as db:
+        if db is None:
+            logger.error("Konnte keine DB-Session für sync_boxes_and_sensors_in_db erhalten.")
+            raise RuntimeError("DB Session nicht verfügbar für Sync.")
+        try:
+            states = _sync_boxes(db, payloads)
+        except SQLAlchemyError as e_db:
+            logger.error(f"[DB Sync] Datenbankfehler während Sync von {len(payloads)} Boxen: {e_db}", exc_info=True)
+            raise
+
+    logger.info(f"[DB Sync] Sync-Task für {len(states)} Boxen abgeschlossen.")
+    return states
 
 
 
@@ -171,11 +313,14 @@ def sync_box_and_sensors_in_db(box_metadata: Dict[str, Any], initial_fetch_days:
 def update_final_box_status(
     box_id: str,
     overall_to_date: datetime, 
-    fetch_results: List[Dict[str, Any]] 
+    fetch_results: List[Dict[str, Any]],
+    fetched_through: datetime | None = None
 ) -> None:
     """
     Aktualisiert den 'last_data_fetched'-Zeitstempel für die SensorBox in der DB,
     basierend auf den Ergebnissen der einzelnen Fetch-Chunks.
+    Ist fetched_through gesetzt (alle Sensoren lückenlos abgerufen bis), wird dieser Wert bei Fehlern
+    statt des spätesten erfolgreichen Zeitstempels verwendet.
     """
     logger = get_run_logger()
 
@@ -221,7 +366,11 @@ def update_final_box_status(
                 update_ts = overall_to_date.astimezone(timezone.utc)
                 logger.info(f"[Final Status {box_id}] Setze 'last_data_fetched' auf Ziel-Enddatum: {update_ts}")
             else:
-                if latest_successful_ts:
+                if fetched_through is not None:
+                     start_point = previous_last_fetched if previous_last_fetched else datetime.min.replace(tzinfo=timezone.utc)
+                     update_ts = max(start_point, fetched_through.astimezone(timezone.utc))
+                     logger.warning(f"[Final Status {box_id}] Fehler aufgetreten. Setze 'last_data_fetched' auf max(alt, lückenlos abgerufen bis): {update_ts}")
+                elif latest_successful_ts:
                      start_point = previous_last_fetched if previous_last_fetched else datetime.min.replace(tzinfo=timezone.utc)
                      update_ts = max(start_point, latest_successful_ts)
                      logger.warning(f"[Final Status {box_id}] Fehler aufgetreten. Setze 'last_data_fetched' auf max(alt, letzter Erfolg): {update_ts}")
@@ -245,3 +394,40 @@ def update_final_box_status(
             raise 
 
     logger.info(f"[Final Status {box_id}] Update-Task abgeschlossen.")
+
+
+@task(name="Start Sensor Watermarks", log_prints=True)
+def start_sensor_watermarks(sensor_windows: Dict[str, Tuple[datetime, datetime]]) -> int:
+    """
+    Setzt Sensor-Watermarks ohne Wert auf den Beginn ihres Abruf-Fensters, bevor Chunks geschrieben werden.
+    Nur so kann der erste Chunk eines neuen Sensors das Watermark lückenlos fortschreiben.
+    """
+    logger = get_run_logger()
+    with get_db_session() as db:
+        if db is None:
+            raise RuntimeError("DB Session nicht verfügbar für Sensor-Watermarks.")
+        started = crud_sensor.sensor_ingestion_watermark.start_at(
+            db, from_dates={sensor_id: window_from for sensor_id, (window_from, _) in sensor_windows.items()}
+        )
+    if started:
+        logger.info(f"[Watermarks] {started} Sensor-Watermarks auf den Fensterbeginn gesetzt.")
+    return started
+
+
+@task(name="Raise Sensor Watermarks", log_prints=True)
+def raise_sensor_watermarks(fetched_through: Dict[str, datetime]) -> None:
+    """
+    Schreibt die Sensor-Watermarks nach allen Runden auf den lückenlos abgeschlossenen Stand des Planners fort.
+    Chunks, deren Write vor dem des vorherigen Chunks fertig wurde, konnten das Watermark einzeln nicht
+    fortschreiben (advance schließt nur lückenlos an). Watermarks werden dabei nie zurückgesetzt.
+    """
+    logger = get_run_logger()
+    with get_db_session() as db:
+        if db is None:
+            raise RuntimeError("DB Session nicht verfügbar für Sensor-Watermarks.")
+        raised = [
+            sensor_id for sensor_id, through in fetched_through.items()
+            if crud_sensor.sensor_ingestion_watermark.raise_to(db, sensor_id=sensor_id, fetched_through=through)
+        ]
+    if raised:
+        logger.info(f"[Watermarks] Nachträglich fortgeschrieben: {', '.join(raised)}")
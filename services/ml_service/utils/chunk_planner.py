@@ -0,0 +1,132 @@
+# utils/chunk_planner.py
+
+from prefect import task, get_run_logger
+from typing import Any, Dict, List, Set, Tuple
+from datetime import datetime, timedelta, timezone
+
+from utils.config import settings
+from utils.db_utils import get_db_session
+
+from shared.crud import crud_sensor
+
+
+@task(name="Estimate Points per Day", log_prints=True)
+def estimate_points_per_day(sensor_ids: List[str], lookback_days: int = settings.FETCH_DENSITY_LOOKBACK_DAYS) -> Dict[str, float]:
+    """
+    Schätzt die Datendichte (Messwerte pro Tag) je Sensor aus den bereits gespeicherten Daten der letzten lookback_days.
+    Sensoren ohne Daten (z.B. neue Boxen) fehlen im Ergebnis.
+    """
+    logger = get_run_logger()
+    from_date = datetime.now(timezone.utc) - timedelta(days=lookback_days)
+
+    with get_db_session() as db:
+        if db is None:
+            logger.warning("Konnte keine DB-Session für estimate_points_per_day erhalten. Nutze Standard-Chunkgröße.")
+            return {}
+        points_per_day = crud_sensor.sensor_data.get_points_per_day_by_sensor_ids(db, sensor_ids=sensor_ids, from_date=from_date)
+
+    logger.info(f"[Chunk Planner] Geschätzte Punkte pro Tag: {points_per_day}")
+    return points_per_day
+
+
+class AdaptiveChunkPlanner:
+    """
+    Plant die Abruf-Fenster pro Sensor anhand der Datendichte: Die Fenstergröße wird so gewählt, dass ein Request
+    etwa target_points Messwerte liefert (begrenzt auf [min_days, max_days]). Dünn besetzte Sensoren werden so in
+    wenigen großen Fenstern abgerufen, dichte Sensoren in kleinen Fenstern unterhalb des API-Limits.
+
+    Jeder Sensor hat ein eigenes Zeitfenster (ranges, aus den Sensor-Watermarks). Die Schätzung wird nach jedem
+    Chunk-Ergebnis (`observe`) nachgeführt. Ohne Schätzung (bzw. mit adaptive=False) wird default_days verwendet.
+    Nach einem fehlgeschlagenen Chunk werden für diesen Sensor keine weiteren Chunks geplant.
+    """
+
+    def __init__(
+        self,
+        ranges: Dict[str, Tuple[datetime, datetime]],
+        points_per_day: Dict[str, float] | None = None,
+        *,
+        default_days: float,
+        adaptive: bool = True,
+        target_points: int = settings.FETCH_TARGET_POINTS_PER_REQUEST,
+        min_days: float = settings.FETCH_MIN_CHUNK_DAYS,
+        max_days: float = settings.FETCH_MAX_CHUNK_DAYS
+    ):
+        self.ranges = dict(ranges)
+        self.default_days = default_days
+        self.adaptive = adaptive
+        self.target_points = target_points
+        self.min_days = min_days
+        self.max_days = max(min_days, max_days)
+
+        self._points_per_day: Dict[str, float] = dict(points_per_day or {})
+        # Nächster noch nicht geplanter Startzeitpunkt je Sensor
+        self._cursor: Dict[str, datetime] = {sensor_id: start for sensor_id, (start, _) in self.ranges.items()}
+        # Lückenlos erfolgreich abgerufen bis (je Sensor)
+        self._completed: Dict[str, datetime] = {sensor_id: start for sensor_id, (start, _) in self.ranges.items()}
+        # Sensoren mit fehlgeschlagenem Chunk (werden bis zum nächsten Flow-Run nicht weiter geplant)
+        self.failed_sensor_ids: Set[str] = set()
+
+    def window_days(self, sensor_id: str) -> float:
+        """ Fenstergröße in Tagen für den nächsten Chunk des Sensors. """
+        if not self.adaptive:
+            return self.default_days
+        points_per_day = self._points_per_day.get(sensor_id)
+        if points_per_day is None:
+            return min(max(self.default_days, self.min_days), self.max_days)
+        if points_per_day <= 0:
+            return self.max_days
+        return min(max(self.target_points / points_per_day, self.min_days), self.max_days)
+
+    def _is_open(self, sensor_id: str) -> bool:
+        return sensor_id not in self.failed_sensor_ids and self._cursor[sensor_id] < self.ranges[sensor_id][1]
+
+    def has_remaining(self) -> bool:
+        return any(self._is_open(sensor_id) for sensor_id in self._cursor)
+
+    def next_round(self) -> List[Tuple[str, datetime, datetime]]:
+        """
+        Plant für jeden Sensor mit offenem Zeitraum den nächsten Chunk und gibt (sensor_id, von, bis) zurück.
+        """
+        planned: List[Tuple[str, datetime, datetime]] = []
+        for sensor_id, cursor in self._cursor.items():
+            if not self._is_open(sensor_id):
+                continue
+            chunk_end = min(cursor + timedelta(days=self.window_days(sensor_id)), self.ranges[sensor_id][1])
+            planned.append((sensor_id, cursor, chunk_end))
+            self._cursor[sensor_id] = chunk_end
+        return planned
+
+    def observe(self, result: Dict[str, Any]) -> None:
+        """
+        Verarbeitet ein Chunk-Ergebnis von fetch_store_sensor_chunk: aktualisiert die Dichteschätzung
+        und den lückenlos abgerufenen Zeitraum des Sensors. Ein fehlgeschlagener Chunk beendet die Planung des Sensors.
+        """
+        sensor_id = result.get("sensor_id")
+        chunk_from = result.get("chunk_from")
+        chunk_to = result.get("chunk_to")
+        if sensor_id not in self._cursor:
+            return
+        if not result.get("success"):
+            self.failed_sensor_ids.add(sensor_id)
+            return
+        if chunk_from is None or chunk_to is None:
+            return
+
+        if self._completed[sensor_id] == chunk_from:
+            self._completed[sensor_id] = chunk_to
+
+        covered_days = (chunk_to - chunk_from).total_seconds() / 86400
+        if covered_days <= 0:
+            return
+        observed = result.get("points_received", 0) / covered_days
+        previous = self._points_per_day.get(sensor_id)
+        # Glättung, damit einzelne Ausfälle/Lücken die Fenstergröße nicht sprunghaft verändern
+        self._points_per_day[sensor_id] = observed if previous is None else (previous + observed) / 2
+
+    def completed_by_sensor(self) -> Dict[str, datetime]:
+        """ Lückenlos erfolgreich abgerufen bis, je Sensor (Ende des letzten in Reihenfolge abgeschlossenen Chunks). """
+        return dict(self._completed)
+
+    def fetched_through(self) -> datetime | None:
+        """ Zeitpunkt, bis zu dem alle geplanten Sensoren lückenlos abgerufen wurden (None ohne Sensoren). """
+        return min(self._completed.values(), default=None)
@@ -0,0 +1,88 @@
+# utils/compression.py
+
+from prefect import task, get_run_logger
+from typing import List
+from datetime import datetime
+from sqlalchemy import text
+
+from utils.db_utils import get_db_session, get_engine_instance
+
+# Kompressions-Policy auf sensor_data (siehe init_scripts/migration_007_sensor_data_compression.sql und migration_008)
+_COMPRESSION_POLICY_JOBS_SQL = """
+SELECT j.job_id
+FROM timescaledb_information.jobs j
+WHERE j.proc_name = 'policy_compression'
+  AND j.hypertable_name = 'sensor_data'
+"""
+
+# Chunks im Fenster, die die Policy bereits komprimieren würde (älter als compress_after)
+_ELIGIBLE_CHUNKS_SQL = """
+SELECT format('%I.%I', c.chunk_schema, c.chunk_name) AS chunk
+FROM timescaledb_information.chunks c
+JOIN timescaledb_information.jobs j
+  ON j.hypertable_schema = c.hypertable_schema
+ AND j.hypertable_name = c.hypertable_name
+ AND j.proc_name = 'policy_compression'
+WHERE c.hypertable_name = 'sensor_data'
+  AND c.range_end > :window_start
+  AND c.range_start < :window_end
+  AND c.range_end <= now() - (j.config ->> 'compress_after')::interval
+ORDER BY c.range_start
+"""
+
+
+def _set_compression_policy_scheduled(scheduled: bool) -> List[int]:
+    with get_db_session() as db:
+        if db is None:
+            raise RuntimeError("DB Session nicht verfügbar für die Kompressions-Policy.")
+        job_ids = [row.job_id for row in db.execute(text(_COMPRESSION_POLICY_JOBS_SQL))]
+        for job_id in job_ids:
+            db.execute(text("SELECT alter_job(:job_id, scheduled => :scheduled)"), {"job_id": job_id, "scheduled": scheduled})
+    return job_ids
+
+
+@task(name="Pause Compression Policy", log_prints=True)
+def pause_compression_policy() -> List[int]:
+    """
+    Deaktiviert die Kompressions-Policy von sensor_data, damit sie während eines Backfills nicht
+    wiederholt Chunks komprimiert, in die noch geschrieben wird.
+    """
+    logger = get_run_logger()
+    job_ids = _set_compression_policy_scheduled(False)
+    logger.info(f"[Kompression] Policy pausiert: {job_ids}")
+    return job_ids
+
+
+@task(name="Resume Compression Policy", log_prints=True)
+def resume_compression_policy() -> List[int]:
+    """
+    Aktiviert die Kompressions-Policy von sensor_data wieder.
+    """
+    logger = get_run_logger()
+    job_ids = _set_compression_policy_scheduled(True)
+    logger.info(f"[Kompression] Policy wieder aktiviert: {job_ids}")
+    return job_ids
+
+
+@task(name="Compress Backfilled Chunks", log_prints=True)
+def compress_chunks_in_window(window_start: datetime, window_end: datetime) -> int:
+    """
+    Komprimiert alle Chunks in [window_start, window_end), die älter als compress_after der Policy sind,
+    einmalig direkt nach einem Backfill. Verspätet geschriebene Daten liegen sonst bis zum nächsten
+    Policy-Lauf unkomprimiert neben den komprimierten Batches und verlangsamen Bereichsabfragen.
+    Jeder Chunk wird in einer eigenen Transaktion komprimiert, damit Sperren kurz bleiben.
+    """
+    logger = get_run_logger()
+    engine = get_engine_instance()
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        chunks = [
+            row.chunk for row in connection.execute(
+                text(_ELIGIBLE_CHUNKS_SQL), {"window_start": window_start, "window_end": window_end}
+            )
+        ]
+        for chunk in chunks:
+            connection.execute(text("SELECT compress_chunk(CAST(:chunk AS regclass), if_not_compressed => TRUE)"), {"chunk": chunk})
+
+    logger.info(f"[Kompression] {len(chunks)} Chunks für {window_start} -> {window_end} komprimiert.")
+    return len(chunks)
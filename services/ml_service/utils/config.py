@@ -1,3 +1,4 @@
+from typing import List
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from urllib.parse import quote_plus 
 
@@ -14,11 +15,83 @@ class Settings(BaseSettings):
     INITIAL_TIME_WINDOW_IN_DAYS: int = 365
     FETCH_TIME_WINDOW_DAYS: int = 2
 
+    # OpenSenseMap HTTP-Client (utils/http_client.py)
+    OSM_API_URL: str = "https://api.opensensemap.org"
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = 16
+    HTTP_TIMEOUT_SECONDS: float = 60.0
+    HTTP2_ENABLED: bool = True
+    HTTP_MAX_RETRIES: int = 5                   # Wiederholungen bei 429/5xx/Verbindungsfehlern im Client
+    HTTP_BACKOFF_BASE_SECONDS: float = 1.0
+    HTTP_BACKOFF_MAX_SECONDS: float = 60.0
+    HTTP_RETRY_AFTER_MAX_SECONDS: float = 300.0 # Obergrenze für einen von der API gesendeten Retry-After
+
+    # Worker-übergreifender Rate Limiter (utils/rate_limit.py), 0 = deaktiviert
+    REDIS_HOST: str = "redis"
+    REDIS_PORT: int = 6379
+    REDIS_URL: str | None = None
+    OSM_RATE_LIMIT_KEY: str = "osm:rate_limit"
+    OSM_RATE_LIMIT_PER_SECOND: float = 10.0
+    OSM_RATE_LIMIT_BURST: int = 20
+
+    # Record/Replay der OpenSenseMap-Antworten (utils/http_replay.py): "off", "record" oder "replay"
+    HTTP_REPLAY_MODE: str = "off"
+    HTTP_REPLAY_DIR: str = "./http_recordings"
+
+    # Maximale Anzahl Messwerte, die pro Chunk gepuffert werden, bevor in die DB geschrieben wird
+    INGEST_BATCH_SIZE: int = 5000
+    PLAUSIBILITY_FILTER_ENABLED: bool = True    # Unplausible Messwerte vor dem Insert nach sensor_data_rejected verschieben (utils/plausibility.py)
+
+    # Adaptive Chunk-Planung (utils/chunk_planner.py)
+    OSM_API_MAX_POINTS: int = 10000             # Maximale Anzahl Messwerte pro API-Antwort
+    FETCH_TARGET_POINTS_PER_REQUEST: int = 8000 # Ziel-Punkte pro Request, mit Abstand zum API-Limit
+    FETCH_MIN_CHUNK_DAYS: float = 0.25
+    FETCH_MAX_CHUNK_DAYS: float = 60.0
+    FETCH_DENSITY_LOOKBACK_DAYS: int = 14       # Zeitraum für die Punkte-pro-Tag-Schätzung aus der DB
+
+    # Multi-Box-Ingestion (flows/multi_box_ingestion.py)
+    MULTI_BOX_IDS: List[str] = []               # JSON-Liste von Box-IDs, z.B. '["5fae...", "6012..."]'
+    MULTI_BOX_BBOX: str | None = None           # Bounding Box "lng_sw,lat_sw,lng_ne,lat_ne"
+    MAX_BOXES_IN_FLIGHT: int = 4
+    DASK_N_WORKERS: int = 2
+    # Globales Prefect Concurrency Limit für DB-Writes über alle Flows/Worker hinweg (leer = deaktiviert)
+    DB_WRITE_CONCURRENCY_LIMIT: str = "opensensemap-db-writes"
+    DB_WRITE_CONCURRENCY_SLOTS: int = 8
+
+    # Paralleler Backfill (flows/backfill.py)
+    BACKFILL_PARTITION_DAYS: float = 30.0       # Zeitfenster einer Partition (je Sensor)
+    BACKFILL_DASK_N_WORKERS: int = 4
+    BACKFILL_PAUSE_AGGREGATE_POLICIES: bool = True # Refresh-Policies der Continuous Aggregates während des Backfills pausieren
+    BACKFILL_MANAGE_COMPRESSION: bool = True    # Kompressions-Policy während des Backfills pausieren, danach betroffene Chunks komprimieren
+
+    # Gestufte Aufbewahrung von sensor_data (flows/retention.py, utils/retention.py)
+    SENSOR_DATA_RAW_RETENTION_DAYS: int = 0     # Rohdaten (und Minuten-Rollup) so viele Tage behalten, davor nur Stunden-/Tages-Rollups, 0 = unbegrenzt
+    SENSOR_DATA_REJECTED_RETENTION_DAYS: int = 0 # Verworfene Messwerte (sensor_data_rejected) so viele Tage behalten, 0 = unbegrenzt
+
+    # Task-Runner-Auswahl der Einzelbox-Ingestion (utils/task_runners.py)
+    INGESTION_TASK_RUNNER: str = "auto"         # "auto", "thread" oder "dask"
+    INGESTION_DASK_THRESHOLD_DAYS: float = 2.0  # Ab diesem offenen Zeitraum startet "auto" einen Dask-Cluster
+    THREAD_RUNNER_MAX_WORKERS: int = 8
+
+    # Write-behind über Redis Streams (utils/ingest_stream.py, run_ingest_consumer.py)
+    INGEST_WRITE_MODE: str = "direct"           # "direct" (Task schreibt selbst) oder "redis_stream"
+    INGEST_STREAM_KEY: str = "opensensemap:ingest"
+    INGEST_STREAM_GROUP: str = "ingest-writers"
+    INGEST_STREAM_BATCH_ROWS: int = 50000       # Commit, sobald so viele Messwerte gepuffert sind ...
+    INGEST_STREAM_FLUSH_SECONDS: float = 2.0    # ... oder der älteste gepufferte Batch so alt ist
+    INGEST_STREAM_CLAIM_IDLE_SECONDS: float = 60.0 # Unbestätigte Einträge abgestürzter Consumer danach übernehmen
+
+    # Ingestion-Metriken in der Tabelle ingestion_metrics (utils/ingestion_metrics.py)
+    INGESTION_METRICS_ENABLED: bool = True
+    INGESTION_METRICS_FLUSH_ROWS: int = 1000    # Zwischendurch schreiben, sobald so viele Beobachtungen gepuffert sind
+    INGESTION_METRICS_MAX_BUFFERED_ROWS: int = 100000 # Obergrenze, falls die DB nicht erreichbar ist
+
     def __init__(self, **values):
         super().__init__(**values)
         safe_password = quote_plus(self.DB_PASSWORD)
         if not self.DATABASE_URL:
             self.DATABASE_URL = f"postgresql+psycopg2://{self.DB_USER}:{safe_password}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+        if not self.REDIS_URL:
+            self.REDIS_URL = f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}/0"
         if not self.MAINTENANCE_DATABASE_URL:
             self.MAINTENANCE_DATABASE_URL = f"postgresql+psycopg2://{self.DB_USER}:{safe_password}@{self.DB_HOST}:{self.DB_PORT}/postgres"
 
@@ -0,0 +1,111 @@
+# utils/continuous_aggregates.py
+
+from prefect import task, get_run_logger
+from typing import List
+from datetime import datetime
+from sqlalchemy import text
+
+from utils.db_utils import get_db_session, get_engine_instance
+
+from shared.crud import crud_sensor
+
+# CONTINUOUS_AGGREGATES und der Refresh liegen in shared/crud (CRUDContinuousAggregate), damit auch die
+# Push-Ingestion des Backends zurückdatierte Messwerte materialisieren kann
+from shared.crud.crud_sensor import CONTINUOUS_AGGREGATES, REFRESH_POLICY_OFFSETS_SQL  # noqa: F401
+
+_REFRESH_POLICY_JOBS_SQL = """
+SELECT j.job_id
+FROM timescaledb_information.jobs j
+JOIN timescaledb_information.continuous_aggregates ca
+  ON ca.materialization_hypertable_schema = j.hypertable_schema
+ AND ca.materialization_hypertable_name = j.hypertable_name
+WHERE j.proc_name = 'policy_refresh_continuous_aggregate'
+  AND ca.view_name = ANY(:view_names)
+"""
+
+
+def _set_refresh_policies_scheduled(scheduled: bool) -> List[int]:
+    with get_db_session() as db:
+        if db is None:
+            raise RuntimeError("DB Session nicht verfügbar für Continuous-Aggregate-Policies.")
+        # Über die View-Namen, da hierarchische Rollups auf einem Aggregat statt direkt auf sensor_data liegen
+        view_names = [view_name for view_name, _ in CONTINUOUS_AGGREGATES]
+        job_ids = [row.job_id for row in db.execute(text(_REFRESH_POLICY_JOBS_SQL), {"view_names": view_names})]
+        for job_id in job_ids:
+            db.execute(text("SELECT alter_job(:job_id, scheduled => :scheduled)"), {"job_id": job_id, "scheduled": scheduled})
+    return job_ids
+
+
+@task(name="Pause Continuous Aggregate Policies", log_prints=True)
+def pause_continuous_aggregate_policies() -> List[int]:
+    """
+    Deaktiviert die Refresh-Policies aller Continuous Aggregates auf sensor_data (alter_job, scheduled => false),
+    damit sie während eines Backfills nicht wiederholt dieselben, noch wachsenden Zeiträume materialisieren.
+    """
+    logger = get_run_logger()
+    job_ids = _set_refresh_policies_scheduled(False)
+    logger.info(f"[Continuous Aggregates] {len(job_ids)} Refresh-Policies pausiert: {job_ids}")
+    return job_ids
+
+
+@task(name="Resume Continuous Aggregate Policies", log_prints=True)
+def resume_continuous_aggregate_policies() -> List[int]:
+    """
+    Aktiviert die Refresh-Policies aller Continuous Aggregates auf sensor_data wieder.
+    """
+    logger = get_run_logger()
+    job_ids = _set_refresh_policies_scheduled(True)
+    logger.info(f"[Continuous Aggregates] {len(job_ids)} Refresh-Policies wieder aktiviert: {job_ids}")
+    return job_ids
+
+
+def _refresh_window(window_start: datetime, window_end: datetime, logger) -> None:
+    """ Refresh eines festen Fensters über CRUDContinuousAggregate.refresh, mit dem aktuellen Aufbewahrungshorizont. """
+    with get_db_session() as db:
+        if db is None:
+            raise RuntimeError("DB Session nicht verfügbar für den Aufbewahrungshorizont.")
+        retained_from = crud_sensor.sensor_data_retention.get_retained_from(db)
+
+    refreshed = crud_sensor.continuous_aggregate.refresh(
+        get_engine_instance(), window_start=window_start, window_end=window_end, retained_from=retained_from
+    )
+    logger.info(
+        f"[Continuous Aggregates] {window_start} -> {window_end} aktualisiert: {refreshed} "
+        f"(Aufbewahrungshorizont {retained_from})"
+    )
+
+
+def refresh_late_writes(earliest_written: datetime, logger) -> bool:
+    """
+    Materialisiert nachträglich geschriebene Messwerte vor dem Fenster der Refresh-Policies
+    (CRUDContinuousAggregate.refresh_late_writes). Gibt zurück, ob ein Refresh nötig war.
+    """
+    with get_db_session() as db:
+        if db is None:
+            raise RuntimeError("DB Session nicht verfügbar für Continuous-Aggregate-Policies.")
+        horizon = crud_sensor.continuous_aggregate.refresh_late_writes(db, get_engine_instance(), earliest_written=earliest_written)
+    if horizon is None:
+        return False
+    logger.info(f"[Continuous Aggregates] Messwerte ab {earliest_written} vor dem Policy-Fenster bis {horizon} materialisiert.")
+    return True
+
+
+@task(name="Refresh Continuous Aggregates", log_prints=True)
+def refresh_continuous_aggregates(window_start: datetime, window_end: datetime) -> None:
+    """
+    Materialisiert alle Continuous Aggregates einmalig für [window_start, window_end).
+    Das Fenster wird je Aggregat um eine Bucket-Größe erweitert, da TimescaleDB nur vollständig
+    enthaltene Buckets aktualisiert. refresh_continuous_aggregate darf nicht in einer Transaktion laufen.
+    Das Fenster beginnt nie vor dem Aufbewahrungshorizont der Rohdaten (flows/retention.py): ein Refresh
+    über gelöschte Chunks würde die dort nur noch in den Aggregaten liegenden Werte entfernen.
+    """
+    _refresh_window(window_start, window_end, get_run_logger())
+
+
+@task(name="Refresh Late Continuous Aggregates", log_prints=True)
+def refresh_late_continuous_aggregates(earliest_written: datetime) -> bool:
+    """
+    Prefect-Task um refresh_late_writes für ingest_box: Aktualisiert die Aggregate ab dem ältesten geschriebenen
+    Chunk bis zum Fenster der Refresh-Policies, falls der Chunk davor liegt.
+    """
+    return refresh_late_writes(earliest_written, get_run_logger())
@@ -6,6 +6,21 @@ from datetime import datetime, timezone
 
 from utils.parse_datetime import parse_api_datetime
 
+def _determine_to_date(box_id: str, api_last_measurement_str: str | None) -> datetime:
+    """ Ende des Abruffensters: letzte Messung laut API, höchstens jetzt (UTC). """
+    logger = get_run_logger()
+    now_utc = datetime.now(timezone.utc)
+    api_last_measurement_dt = parse_api_datetime(api_last_measurement_str)
+    logger.info(f"[Fetch Window {box_id}] API Last Measurement: {api_last_measurement_dt}")
+
+    target_to_date = api_last_measurement_dt if api_last_measurement_dt else now_utc
+    actual_to_date = min(target_to_date, now_utc)
+
+    actual_to_date = actual_to_date.astimezone(timezone.utc)
+    logger.info(f"[Fetch Window {box_id}] Ziel-Enddatum (To Date): {actual_to_date}")
+    return actual_to_date
+
+
 @task(name="Determine Fetch Time Window", log_prints=True)
 def determine_fetch_window(
     db_box_state: Dict[str, Any],
@@ -19,15 +34,7 @@ def determine_fetch_window(
     box_id = db_box_state.get("box_id", "UNKNOWN") 
 
     # --- 1. End-Datum bestimmen (to_date) ---
-    now_utc = datetime.now(timezone.utc)
-    api_last_measurement_dt = parse_api_datetime(api_last_measurement_str)
-    logger.info(f"[Fetch Window {box_id}] API Last Measurement: {api_last_measurement_dt}")
-
-    target_to_date = api_last_measurement_dt if api_last_measurement_dt else now_utc
-    actual_to_date = min(target_to_date, now_utc)
-
-    actual_to_date = actual_to_date.astimezone(timezone.utc)
-    logger.info(f"[Fetch Window {box_id}] Ziel-Enddatum (To Date): {actual_to_date}")
+    actual_to_date = _determine_to_date(box_id, api_last_measurement_str)
 
     # --- 2. Start-Datum bestimmen (from_date) ---
     db_last_data_fetched = db_box_state.get("db_last_data_fetched")
@@ -48,4 +55,40 @@ def determine_fetch_window(
         return None, None 
 
     logger.info(f"[Fetch Window {box_id}] Abruf nötig. Fenster: VON '{actual_from_date}' BIS '{actual_to_date}'")
-    return actual_from_date, actual_to_date
\ No newline at end of file
+    return actual_from_date, actual_to_date
+
+
+@task(name="Determine Sensor Fetch Time Windows", log_prints=True)
+def determine_sensor_fetch_windows(
+    db_box_state: Dict[str, Any],
+    api_last_measurement_str: str | None
+) -> Dict[str, Tuple[datetime, datetime]]:
+    """
+    Bestimmt ein eigenes Abruf-Zeitfenster (von, bis) je Sensor anhand seines Watermarks
+    (`sensor_watermarks`), sodass nach einem Teilausfall nur fehlende Zeiträume erneut geladen werden.
+    Sensoren ohne Watermark verwenden den Box-Wert `db_last_data_fetched`. Aktuelle Sensoren fehlen im Ergebnis.
+    """
+    logger = get_run_logger()
+    box_id = db_box_state.get("box_id", "UNKNOWN")
+
+    actual_to_date = _determine_to_date(box_id, api_last_measurement_str)
+
+    box_last_data_fetched = db_box_state.get("db_last_data_fetched")
+    sensor_watermarks = db_box_state.get("sensor_watermarks", {})
+
+    windows: Dict[str, Tuple[datetime, datetime]] = {}
+    for sensor_id in db_box_state.get("sensor_ids", []):
+        from_date = sensor_watermarks.get(sensor_id) or box_last_data_fetched
+        if from_date is None:
+            logger.warning(f"[Fetch Window {box_id}] Kein Startzeitpunkt für Sensor {sensor_id} bekannt. Überspringe.")
+            continue
+        from_date = from_date.astimezone(timezone.utc)
+        if from_date >= actual_to_date:
+            continue
+        windows[sensor_id] = (from_date, actual_to_date)
+
+    logger.info(
+        f"[Fetch Window {box_id}] {len(windows)} Sensoren mit Abrufbedarf: "
+        + ", ".join(f"{sensor_id} ab {from_date}" for sensor_id, (from_date, _) in windows.items())
+    )
+    return windows
@@ -0,0 +1,262 @@
+# utils/http_client.py
+
+import time
+import asyncio
+import logging
+import weakref
+from typing import Any, AsyncIterator, Dict, NamedTuple
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+import httpx
+
+from .config import settings
+from .rate_limit import SharedRateLimiter, backoff_delay, parse_retry_after
+from .http_replay import REPLAY_MODES, RecordReplayTransport
+from .ingestion_metrics import metrics, osm_request_labels
+
+try:
+    import h2  # noqa: F401 -- nur Verfügbarkeitsprüfung für HTTP/2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Statuscodes, die nach Backoff wiederholt werden (429 und 503 mit Retry-After)
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class ConditionalResponse(NamedTuple):
+    """ Ergebnis eines bedingten GET: bei not_modified (HTTP 304) ist data None. """
+    not_modified: bool
+    data: Any
+    etag: str | None
+    last_modified: str | None
+
+
+class OpenSenseMapClient:
+    """
+    Gemeinsamer async HTTP-Client für die OpenSenseMap API.
+    Hält Keep-Alive-Verbindungen im Pool (HTTP/2 falls verfügbar) und begrenzt
+    die Anzahl gleichzeitiger Requests pro Host über eine Semaphore.
+    Jeder Request holt vorher ein Token vom worker-übergreifenden Rate Limiter. Bei 429/5xx und
+    Verbindungsfehlern wird mit exponentiellem Backoff (Jitter) wiederholt, ein Retry-After der API
+    pausiert den Rate Limiter für alle Worker.
+    """
+
+    def __init__(
+        self,
+        base_url: str = settings.OSM_API_URL,
+        max_connections_per_host: int = settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+        timeout_seconds: float = settings.HTTP_TIMEOUT_SECONDS,
+        http2: bool = settings.HTTP2_ENABLED,
+        rate_limiter: SharedRateLimiter | None = None,
+        max_retries: int = settings.HTTP_MAX_RETRIES,
+        replay_mode: str = settings.HTTP_REPLAY_MODE,
+        replay_dir: str = settings.HTTP_REPLAY_DIR
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.max_connections_per_host = max_connections_per_host
+        self.rate_limiter = rate_limiter if rate_limiter is not None else SharedRateLimiter()
+        self.max_retries = max_retries
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        if replay_mode not in REPLAY_MODES:
+            raise ValueError(f"Ungültiger HTTP_REPLAY_MODE '{replay_mode}', erwartet einen von {REPLAY_MODES}.")
+        # Transport explizit erstellen: ein eigener Transport ersetzt http2/limits des AsyncClient
+        transport: httpx.AsyncBaseTransport = httpx.AsyncHTTPTransport(
+            http2=http2 and HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=max_connections_per_host,
+                max_keepalive_connections=max_connections_per_host
+            )
+        )
+        if replay_mode != "off":
+            transport = RecordReplayTransport(replay_dir, mode=replay_mode, transport=transport)
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            transport=transport,
+            timeout=httpx.Timeout(timeout_seconds),
+            headers={"Accept": "application/json"}
+        )
+
+    @property
+    def is_closed(self) -> bool:
+        return self._client.is_closed
+
+    def _semaphore_for(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc or urlsplit(self.base_url).netloc
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_connections_per_host)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    async def _retry_delay(self, attempt: int, response: httpx.Response | None = None) -> float | None:
+        """
+        Wartezeit vor dem nächsten Versuch oder None, wenn nicht (mehr) wiederholt wird.
+        Ein Retry-After der API wird für alle Worker über den Rate Limiter durchgesetzt.
+        """
+        if attempt >= self.max_retries:
+            return None
+        if response is not None:
+            if response.status_code not in RETRYABLE_STATUS_CODES:
+                return None
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                retry_after = min(retry_after, settings.HTTP_RETRY_AFTER_MAX_SECONDS)
+                await self.rate_limiter.pause(retry_after)
+                return retry_after
+        return backoff_delay(attempt)
+
+    @staticmethod
+    def _observe_request(url: str, started: float, status: int | str, attempt: int) -> None:
+        """ Latenz eines einzelnen Versuchs (bis zu den Response-Headern bzw. zum Fehler). """
+        metrics.observe(
+            "osm_request_seconds",
+            time.perf_counter() - started,
+            status=status,
+            attempt=attempt,
+            **osm_request_labels(url)
+        )
+
+    async def _get(self, url: str, params: Dict[str, Any] | None = None, headers: Dict[str, str] | None = None) -> httpx.Response:
+        """
+        GET-Request mit Wiederholungen. Wirft httpx.HTTPStatusError bei 4xx/5xx (nach Ausschöpfen der Wiederholungen).
+        """
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire()
+            started = time.perf_counter()
+            try:
+                async with self._semaphore_for(url):
+                    response = await self._client.get(url, params=params, headers=headers)
+            except httpx.TransportError as e:
+                self._observe_request(url, started, type(e).__name__, attempt)
+                delay = await self._retry_delay(attempt)
+                if delay is None:
+                    raise
+                logger.warning(f"Verbindungsfehler bei {url} ({e}), Versuch {attempt + 1}/{self.max_retries}, warte {delay:.1f}s.")
+            else:
+                self._observe_request(url, started, response.status_code, attempt)
+                if not response.is_error:
+                    return response
+                delay = await self._retry_delay(attempt, response)
+                if delay is None:
+                    response.raise_for_status()
+                logger.warning(f"HTTP {response.status_code} bei {url}, Versuch {attempt + 1}/{self.max_retries}, warte {delay:.1f}s.")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def get_json(self, url: str, params: Dict[str, Any] | None = None) -> Any:
+        """
+        GET-Request mit Statusprüfung, gibt die dekodierte JSON-Antwort zurück.
+        Wirft httpx.HTTPStatusError bei 4xx/5xx (nach Ausschöpfen der Wiederholungen).
+        """
+        response = await self._get(url, params=params)
+        return response.json()
+
+    async def get_json_conditional(
+        self,
+        url: str,
+        params: Dict[str, Any] | None = None,
+        *,
+        etag: str | None = None,
+        last_modified: str | None = None
+    ) -> ConditionalResponse:
+        """
+        Bedingter GET mit If-None-Match/If-Modified-Since. Bei HTTP 304 wird kein Body übertragen.
+        Liefert zusätzlich die Validatoren der Antwort für den nächsten Request.
+        """
+        headers: Dict[str, str] = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        response = await self._get(url, params=params, headers=headers or None)
+        if response.status_code == 304:
+            return ConditionalResponse(True, None, etag, last_modified)
+        return ConditionalResponse(
+            False,
+            response.json(),
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified")
+        )
+
+    @asynccontextmanager
+    async def stream(self, url: str, params: Dict[str, Any] | None = None) -> AsyncIterator[httpx.Response]:
+        """
+        Öffnet einen GET-Request als Stream. Der Host-Slot bleibt belegt, bis der Body gelesen ist.
+        Wiederholt wird bei denselben Fehlern wie _get (429/5xx, httpx.TransportError), aber nur bis die
+        Response-Header vorliegen. Abbrüche mitten im Body (z.B. ReadError) werden an den Aufrufer
+        weitergegeben, da bereits verarbeitete Batches sonst doppelt geliefert würden.
+        Wirft httpx.HTTPStatusError bei 4xx/5xx (der Fehler-Body ist dann bereits gelesen).
+        """
+        attempt = 0
+        yielded = False
+        while True:
+            await self.rate_limiter.acquire()
+            delay: float | None = None
+            started = time.perf_counter()
+            try:
+                async with self._semaphore_for(url):
+                    async with self._client.stream("GET", url, params=params) as response:
+                        self._observe_request(url, started, response.status_code, attempt)
+                        if response.is_error:
+                            await response.aread()
+                            delay = await self._retry_delay(attempt, response)
+                            if delay is None:
+                                response.raise_for_status()
+                            logger.warning(f"HTTP {response.status_code} bei {url}, Versuch {attempt + 1}/{self.max_retries}, warte {delay:.1f}s.")
+                        else:
+                            yielded = True
+                            yield response
+                            return
+            except httpx.TransportError as e:
+                # Fehler aus dem Block des Aufrufers (Body-Lesen) nicht wiederholen
+                if not yielded:
+                    self._observe_request(url, started, type(e).__name__, attempt)
+                delay = None if yielded else await self._retry_delay(attempt)
+                if delay is None:
+                    raise
+                logger.warning(f"Verbindungsfehler bei {url} ({e}), Versuch {attempt + 1}/{self.max_retries}, warte {delay:.1f}s.")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+        await self.rate_limiter.aclose()
+
+
+# Ein Client pro Event-Loop: httpx-Verbindungen und asyncio-Semaphoren sind an den Loop gebunden,
+# Prefect/Dask können Tasks in unterschiedlichen Loops ausführen.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, OpenSenseMapClient]" = weakref.WeakKeyDictionary()
+_shutdown_hooks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncIterator[None]]" = weakref.WeakKeyDictionary()
+
+
+async def _close_on_loop_shutdown(client: OpenSenseMapClient) -> AsyncIterator[None]:
+    """
+    Async-Generator, der bis zum Ende des Event-Loops beim ersten yield wartet. loop.shutdown_asyncgens()
+    (asyncio.run, Prefect beim Beenden eines Loops) schließt ihn und damit den Client noch im eigenen Loop.
+    """
+    try:
+        yield
+    finally:
+        if not client.is_closed:
+            await client.aclose()
+
+
+def get_osm_client() -> OpenSenseMapClient:
+    """
+    Liefert den gemeinsamen OpenSenseMap-Client des aktuellen Event-Loops (wird bei Bedarf erstellt).
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = OpenSenseMapClient()
+        _clients[loop] = client
+        # Erster Schritt registriert den Generator beim Loop, der ihn beim Shutdown schließt
+        hook = _close_on_loop_shutdown(client)
+        _shutdown_hooks[loop] = hook
+        loop.create_task(hook.__anext__())
+    return client
@@ -0,0 +1,136 @@
+# utils/http_replay.py
+
+import os
+import json
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, Tuple
+from urllib.parse import urlencode
+
+import httpx
+
+REPLAY_MODES = ("off", "record", "replay")
+
+# Header, die nach dem Dekodieren des Bodys nicht mehr zur gespeicherten Antwort passen
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+_READ_CHUNK_SIZE = 64 * 1024
+
+
+class ReplayMissError(httpx.RequestError):
+    """ Request ist im Replay-Modus nicht aufgezeichnet (wird vom Client nicht wiederholt). """
+
+
+def request_key(method: str, url: httpx.URL) -> str:
+    """
+    Inhaltsadresse eines Requests: sha256 über Methode, Pfad und sortierte Query-Parameter
+    (unabhängig von Host und Parameter-Reihenfolge).
+    """
+    query = urlencode(sorted(url.params.multi_items()))
+    return hashlib.sha256(f"{method.upper()} {url.path}?{query}".encode("utf-8")).hexdigest()
+
+
+class RecordingStore:
+    """
+    Verzeichnis mit aufgezeichneten Antworten: `<key[:2]>/<key>.json` (Status, Header, Request)
+    und `<key[:2]>/<key>.body` (dekodierter Body).
+    """
+
+    def __init__(self, directory: str | os.PathLike):
+        self.directory = Path(directory)
+
+    def _paths(self, key: str) -> Tuple[Path, Path]:
+        folder = self.directory / key[:2]
+        return folder / f"{key}.json", folder / f"{key}.body"
+
+    def has(self, key: str) -> bool:
+        meta_path, body_path = self._paths(key)
+        return meta_path.exists() and body_path.exists()
+
+    def load_meta(self, key: str) -> Dict[str, Any]:
+        meta_path, _ = self._paths(key)
+        return json.loads(meta_path.read_text(encoding="utf-8"))
+
+    def body_path(self, key: str) -> Path:
+        return self._paths(key)[1]
+
+    def save(self, key: str, meta: Dict[str, Any], body: bytes) -> None:
+        meta_path, body_path = self._paths(key)
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        # Body zuerst und jeweils atomar schreiben, damit parallele Worker keine halben Einträge lesen
+        for path, data in ((body_path, body), (meta_path, json.dumps(meta, indent=2).encode("utf-8"))):
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+    def iter_entries(self) -> Iterator[Tuple[Dict[str, Any], Path]]:
+        """ Alle Einträge als (Metadaten, Body-Pfad), z.B. für den lokalen API-Ersatz. """
+        for meta_path in sorted(self.directory.glob("*/*.json")):
+            body_path = meta_path.with_suffix(".body")
+            if body_path.exists():
+                yield json.loads(meta_path.read_text(encoding="utf-8")), body_path
+
+
+async def _aiter_file(path: Path) -> AsyncIterator[bytes]:
+    with path.open("rb") as f:
+        while chunk := f.read(_READ_CHUNK_SIZE):
+            yield chunk
+
+
+class RecordReplayTransport(httpx.AsyncBaseTransport):
+    """
+    httpx-Transport, der Antworten inhaltsadressiert auf Platte aufzeichnet (mode="record")
+    oder ausschließlich von dort abspielt (mode="replay"). Im Record-Modus werden bereits
+    aufgezeichnete Requests ebenfalls von Platte beantwortet, nur fehlende gehen ans Netz.
+    """
+
+    def __init__(self, directory: str | os.PathLike, mode: str = "replay", transport: httpx.AsyncBaseTransport | None = None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Ungültiger Modus '{mode}', erwartet 'record' oder 'replay'.")
+        if mode == "record" and transport is None:
+            raise ValueError("Für mode='record' wird ein Transport für echte Requests benötigt.")
+        self.store = RecordingStore(directory)
+        self.mode = mode
+        self._transport = transport
+
+    def _replay(self, key: str, request: httpx.Request) -> httpx.Response:
+        meta = self.store.load_meta(key)
+        return httpx.Response(
+            status_code=meta["status_code"],
+            headers=meta["headers"],
+            content=_aiter_file(self.store.body_path(key)),
+            request=request
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = request_key(request.method, request.url)
+        if self.store.has(key):
+            return self._replay(key, request)
+        if self.mode == "replay":
+            raise ReplayMissError(f"Keine Aufzeichnung für {request.method} {request.url} (Key {key}).", request=request)
+
+        response = await self._transport.handle_async_request(request)
+        try:
+            # aread() dekodiert Content-Encoding (gzip etc.), gespeichert wird der dekodierte Body
+            body = await response.aread()
+        finally:
+            await response.aclose()
+
+        # Nur erfolgreiche Antworten aufzeichnen, Fehler sollen beim nächsten Lauf erneut angefragt werden.
+        # 304 hängt von den Request-Headern ab, die nicht Teil des Keys sind.
+        if 200 <= response.status_code < 300:
+            self.store.save(key, {
+                "method": request.method,
+                "path": request.url.path,
+                "params": dict(request.url.params.multi_items()),
+                "status_code": response.status_code,
+                "headers": {k: v for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS}
+            }, body)
+
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS}
+        return httpx.Response(status_code=response.status_code, headers=headers, content=body, request=request)
+
+    async def aclose(self) -> None:
+        if self._transport is not None:
+            await self._transport.aclose()
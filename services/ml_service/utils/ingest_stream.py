@@ -0,0 +1,348 @@
+# utils/ingest_stream.py
+
+import time
+import socket
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+import numpy as np
+from redis import Redis
+from redis.exceptions import RedisError, ResponseError
+
+from .config import settings
+from .ingestion_metrics import metrics
+from .continuous_aggregates import refresh_late_writes
+
+from shared.crud import crud_sensor
+
+logger = logging.getLogger(__name__)
+
+INGEST_WRITE_MODES = ("direct", "redis_stream")
+
+
+class StreamEntry(NamedTuple):
+    """ Ein dekodierter Batch aus dem Ingest-Stream. """
+    entry_id: str
+    sensor_id: str
+    timestamps: np.ndarray              # datetime64[ns], UTC
+    values: np.ndarray                  # float64
+    watermark: Tuple[datetime, datetime] | None
+    enqueued_at_ms: int
+
+
+def _redis() -> Redis:
+    return Redis.from_url(settings.REDIS_URL)
+
+
+def encode_entry(
+    sensor_id: str,
+    timestamps: np.ndarray,
+    values: np.ndarray,
+    watermark: Tuple[datetime, datetime] | None = None
+) -> Dict[str, Any]:
+    """ Batch -> Stream-Felder. Zeitstempel (int64 ns) und Werte (float64) als Rohbytes, kein JSON pro Punkt. """
+    fields: Dict[str, Any] = {
+        "sensor_id": sensor_id,
+        "ts": np.asarray(timestamps, dtype="datetime64[ns]").view("int64").tobytes(),
+        "values": np.asarray(values, dtype="float64").tobytes(),
+        "enqueued_at_ms": int(time.time() * 1000)
+    }
+    if watermark is not None:
+        fields["watermark_from"] = watermark[0].astimezone(timezone.utc).isoformat()
+        fields["watermark_to"] = watermark[1].astimezone(timezone.utc).isoformat()
+    return fields
+
+
+def decode_entry(entry_id: bytes | str, fields: Dict[bytes, bytes]) -> StreamEntry:
+    """ Stream-Felder -> StreamEntry. Wirft ValueError/KeyError bei beschädigten Einträgen. """
+    timestamps = np.frombuffer(fields[b"ts"], dtype="int64").view("datetime64[ns]")
+    values = np.frombuffer(fields[b"values"], dtype="float64")
+    if len(timestamps) != len(values):
+        raise ValueError(f"Spaltenlängen passen nicht: {len(timestamps)} Zeitstempel, {len(values)} Werte.")
+    watermark = None
+    if b"watermark_from" in fields:
+        watermark = (
+            datetime.fromisoformat(fields[b"watermark_from"].decode()),
+            datetime.fromisoformat(fields[b"watermark_to"].decode())
+        )
+    return StreamEntry(
+        entry_id=entry_id.decode() if isinstance(entry_id, bytes) else entry_id,
+        sensor_id=fields[b"sensor_id"].decode(),
+        timestamps=timestamps,
+        values=values,
+        watermark=watermark,
+        enqueued_at_ms=int(fields[b"enqueued_at_ms"])
+    )
+
+
+class IngestStreamProducer:
+    """ Hängt geparste Batches an den Ingest-Stream an (blockierend, wird aus Worker-Threads aufgerufen). """
+
+    def __init__(self, stream_key: str = settings.INGEST_STREAM_KEY):
+        self.stream_key = stream_key
+        self._redis = _redis()
+
+    def append(
+        self,
+        sensor_id: str,
+        timestamps: np.ndarray,
+        values: np.ndarray,
+        watermark: Tuple[datetime, datetime] | None = None
+    ) -> str:
+        """ XADD eines Batches, gibt die Entry-ID zurück. Redis-Fehler werden an den Task weitergereicht (Retry). """
+        entry_id = self._redis.xadd(self.stream_key, encode_entry(sensor_id, timestamps, values, watermark))
+        return entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+
+
+_producer: IngestStreamProducer | None = None
+
+
+def get_ingest_stream_producer() -> IngestStreamProducer:
+    """ Ein Producer (und damit ein Redis-Connection-Pool) pro Prozess. """
+    global _producer
+    if _producer is None:
+        _producer = IngestStreamProducer()
+    return _producer
+
+
+class IngestStreamConsumer:
+    """
+    Write-behind-Consumer: liest Batches aus dem Ingest-Stream (Consumer Group) und schreibt sie
+    gesammelt in einer Transaktion nach sensor_data, sobald INGEST_STREAM_BATCH_ROWS Messwerte
+    oder INGEST_STREAM_FLUSH_SECONDS erreicht sind. Sensor-Watermarks werden in derselben
+    Transaktion fortgeschrieben. XACK erst nach dem Commit (at-least-once), Wiederholungen sind
+    durch ON CONFLICT DO NOTHING und das monotone Watermark idempotent.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        stream_key: str = settings.INGEST_STREAM_KEY,
+        group: str = settings.INGEST_STREAM_GROUP,
+        consumer: str | None = None,
+        batch_rows: int = settings.INGEST_STREAM_BATCH_ROWS,
+        flush_seconds: float = settings.INGEST_STREAM_FLUSH_SECONDS,
+        claim_idle_seconds: float = settings.INGEST_STREAM_CLAIM_IDLE_SECONDS
+    ):
+        self.session_factory = session_factory
+        self.stream_key = stream_key
+        self.group = group
+        self.consumer = consumer or socket.gethostname()
+        self.batch_rows = batch_rows
+        self.flush_seconds = flush_seconds
+        self.claim_idle_ms = int(claim_idle_seconds * 1000)
+        self.stats_key = f"{stream_key}:stats"
+        self.dead_letter_key = f"{stream_key}:dead"
+        self._redis = _redis()
+        self._buffer: List[StreamEntry] = []
+        self._buffer_rows = 0
+        self._buffer_since: float | None = None
+        # Watermark-Fenster, die beim Schreiben noch nicht lückenlos anschlossen (sensor_id -> {von: bis}).
+        # Gleichzeitig laufende Chunks eines Sensors können in beliebiger Reihenfolge im Stream landen.
+        self._pending_watermarks: Dict[str, Dict[datetime, datetime]] = {}
+        # Ältester committeter Messwert, dessen Continuous-Aggregate-Refresh noch aussteht
+        self._late_since: datetime | None = None
+
+    def ensure_group(self) -> None:
+        try:
+            self._redis.xgroup_create(self.stream_key, self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def _add(self, entries: List[Tuple[bytes, Dict[bytes, bytes]]]) -> None:
+        for entry_id, fields in entries:
+            if not fields: # Eintrag wurde zwischenzeitlich gelöscht
+                self._ack([entry_id.decode() if isinstance(entry_id, bytes) else entry_id])
+                continue
+            try:
+                entry = decode_entry(entry_id, fields)
+            except (KeyError, ValueError) as e:
+                # Beschädigte Einträge blockieren den Stream nicht: in den Dead-Letter-Stream verschieben
+                logger.error(f"Ingest-Stream: Eintrag {entry_id} nicht lesbar ({e}), verschiebe nach {self.dead_letter_key}.")
+                self._redis.xadd(self.dead_letter_key, fields)
+                self._ack([entry_id.decode() if isinstance(entry_id, bytes) else entry_id])
+                continue
+            if self._buffer_since is None:
+                self._buffer_since = time.monotonic()
+            self._buffer.append(entry)
+            self._buffer_rows += len(entry.values)
+
+    def _ack(self, entry_ids: List[str]) -> None:
+        if entry_ids:
+            pipe = self._redis.pipeline()
+            pipe.xack(self.stream_key, self.group, *entry_ids)
+            pipe.xdel(self.stream_key, *entry_ids)
+            pipe.execute()
+
+    def _due(self) -> bool:
+        if not self._buffer:
+            return False
+        return self._buffer_rows >= self.batch_rows or time.monotonic() - self._buffer_since >= self.flush_seconds
+
+    def _write(self, entries: List[StreamEntry]) -> int:
+        """ Alle Batches in einer Transaktion: ein COPY für die Messwerte, danach die Watermarks in Stream-Reihenfolge. """
+        db = self.session_factory()
+        try:
+            inserted = crud_sensor.sensor_data.create_multi_columnar(
+                db,
+                sensor_id=np.concatenate([np.full(len(e.values), e.sensor_id, dtype=object) for e in entries]),
+                measurement_timestamps=np.concatenate([e.timestamps for e in entries]),
+                values=np.concatenate([e.values for e in entries]),
+                on_conflict="nothing",
+                commit=False
+            )
+            pending = {sensor_id: dict(windows) for sensor_id, windows in self._pending_watermarks.items()}
+            for entry in entries:
+                if entry.watermark is not None:
+                    pending.setdefault(entry.sensor_id, {})[entry.watermark[0]] = entry.watermark[1]
+            self._advance_watermarks(db, pending)
+            db.commit()
+            self._pending_watermarks = pending
+            return inserted
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _advance_watermarks(self, db, pending: Dict[str, Dict[datetime, datetime]]) -> None:
+        """
+        Schreibt die Watermarks je Sensor in Zeitreihenfolge fort, bis kein Fenster mehr anschließt.
+        Fenster, die das Watermark bereits abdeckt, entfallen. Die übrigen bleiben für spätere Flushes
+        vorgemerkt (nur im Speicher: nach einem Neustart lädt der nächste Flow-Run den Zeitraum erneut).
+        """
+        current = crud_sensor.sensor_ingestion_watermark.get_by_sensor_ids(db, sensor_ids=list(pending))
+        for sensor_id, windows in pending.items():
+            fetched_through = current.get(sensor_id)
+            for window_from in sorted(windows):
+                window_to = windows[window_from]
+                if fetched_through is not None and window_to <= fetched_through:
+                    del windows[window_from]
+                elif crud_sensor.sensor_ingestion_watermark.advance(
+                    db, sensor_id=sensor_id, from_date=window_from, to_date=window_to
+                ):
+                    fetched_through = window_to
+                    del windows[window_from]
+        for sensor_id in [sensor_id for sensor_id, windows in pending.items() if not windows]:
+            del pending[sensor_id]
+
+    def flush(self) -> int:
+        """ Schreibt den Puffer, bestätigt die Einträge und aktualisiert die Lag-Kennzahlen. """
+        if not self._buffer:
+            self._refresh_late_writes()
+            return 0
+        entries, rows = self._buffer, self._buffer_rows
+        inserted = self._write(entries)
+        self._ack([e.entry_id for e in entries])
+        self._buffer, self._buffer_rows, self._buffer_since = [], 0, None
+        earliest = min((e.timestamps.min() for e in entries if len(e.timestamps)), default=None)
+        if earliest is not None:
+            earliest = datetime.fromtimestamp(earliest.astype("datetime64[us]").astype("int64") / 1e6, tz=timezone.utc)
+            self._late_since = earliest if self._late_since is None else min(self._late_since, earliest)
+
+        # Ende-zu-Ende-Lag: XADD durch den Fetch-Task bis Commit in TimescaleDB
+        now_ms = int(time.time() * 1000)
+        lags = np.array([now_ms - e.enqueued_at_ms for e in entries])
+        self._redis.hset(self.stats_key, mapping={
+            "last_commit_at_ms": now_ms,
+            "last_batch_entries": len(entries),
+            "last_batch_rows": rows,
+            "last_lag_p50_ms": int(np.percentile(lags, 50)),
+            "last_lag_max_ms": int(lags.max())
+        })
+        self._redis.hincrby(self.stats_key, "rows_committed", rows)
+        metrics.observe("write_behind_lag_seconds", np.percentile(lags, 50) / 1000, quantile="p50", entries=len(entries))
+        metrics.observe("write_behind_lag_seconds", lags.max() / 1000, quantile="max", entries=len(entries))
+        metrics.observe("write_behind_commit_rows", rows, inserted=inserted)
+        # Langlebiger Prozess: Metriken mit jedem Commit schreiben, eine Zeile pro Kennzahl
+        metrics.flush()
+        logger.info(
+            f"Ingest-Stream: {len(entries)} Batches / {rows} Messwerte committed ({inserted} neu), "
+            f"Lag p50 {np.percentile(lags, 50):.0f} ms, max {lags.max():.0f} ms."
+        )
+        self._refresh_late_writes()
+        return inserted
+
+    def _refresh_late_writes(self) -> None:
+        """
+        Materialisiert nach dem Commit Messwerte vor dem Fenster der Refresh-Policies. Schlägt der Refresh fehl,
+        bleibt der Zeitpunkt vorgemerkt und wird beim nächsten Flush erneut versucht.
+        """
+        if self._late_since is None:
+            return
+        refresh_late_writes(self._late_since, logger)
+        self._late_since = None
+
+    def _claim_stale(self) -> None:
+        """ Übernimmt Einträge abgestürzter Consumer, die länger als claim_idle_seconds unbestätigt sind. """
+        _, claimed, *_ = self._redis.xautoclaim(
+            self.stream_key, self.group, self.consumer, min_idle_time=self.claim_idle_ms, start_id="0-0", count=1000
+        )
+        if claimed:
+            logger.info(f"Ingest-Stream: {len(claimed)} unbestätigte Einträge übernommen.")
+            self._add(claimed)
+
+    def run(self, stop_after_seconds: float | None = None) -> None:
+        """ Endlosschleife (bzw. bis stop_after_seconds): lesen, puffern, bei Schwelle schreiben. """
+        self.ensure_group()
+        started = time.monotonic()
+        # Nach einem Neustart zuerst die eigenen, noch unbestätigten Einträge erneut verarbeiten
+        pending = self._redis.xreadgroup(self.group, self.consumer, {self.stream_key: "0"}, count=10_000)
+        for _, entries in pending or []:
+            self._add(entries)
+        last_claim = 0.0
+
+        while stop_after_seconds is None or time.monotonic() - started < stop_after_seconds:
+            try:
+                if time.monotonic() - last_claim >= self.claim_idle_ms / 1000:
+                    self._claim_stale()
+                    last_claim = time.monotonic()
+
+                if self._due():
+                    self.flush()
+                    continue
+
+                # Blockierend lesen, höchstens bis zur nächsten Zeitschwelle des Puffers
+                block_ms = int(self.flush_seconds * 1000)
+                if self._buffer_since is not None:
+                    block_ms = max(1, int((self.flush_seconds - (time.monotonic() - self._buffer_since)) * 1000))
+                response = self._redis.xreadgroup(
+                    self.group, self.consumer, {self.stream_key: ">"}, count=500, block=block_ms
+                )
+                for _, entries in response or []:
+                    self._add(entries)
+            except RedisError as e:
+                logger.error(f"Ingest-Stream: Redis-Fehler ({e}), neuer Versuch in 5 s.")
+                time.sleep(5)
+            except Exception as e:
+                # DB-Fehler: Einträge bleiben unbestätigt im Puffer und werden erneut geschrieben
+                logger.error(f"Ingest-Stream: Schreiben fehlgeschlagen ({e}), neuer Versuch in 5 s.", exc_info=True)
+                time.sleep(5)
+        self.flush()
+
+
+def ingest_stream_lag(stream_key: str = settings.INGEST_STREAM_KEY, group: str = settings.INGEST_STREAM_GROUP) -> Dict[str, Any]:
+    """
+    Aktueller Rückstand des Write-behind-Puffers: Einträge im Stream, unbestätigte Einträge der Gruppe,
+    Alter des ältesten Eintrags und die Lag-Kennzahlen des letzten Commits.
+    """
+    client = _redis()
+    try:
+        length = client.xlen(stream_key)
+        groups = {g["name"].decode(): g for g in client.xinfo_groups(stream_key)} if client.exists(stream_key) else {}
+        oldest = client.xrange(stream_key, count=1)
+        stats = {k.decode(): int(v) for k, v in client.hgetall(f"{stream_key}:stats").items()}
+    finally:
+        client.close()
+
+    oldest_age_ms = None
+    if oldest:
+        oldest_age_ms = int(time.time() * 1000) - int(oldest[0][0].decode().split("-")[0])
+    return {
+        "stream_length": length,
+        "pending": groups.get(group, {}).get("pending", 0),
+        "oldest_entry_age_ms": oldest_age_ms,
+        **stats
+    }
@@ -0,0 +1,148 @@
+# utils/ingestion_metrics.py
+
+import re
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List
+
+from .config import settings
+
+from shared.crud import crud_sensor
+
+logger = logging.getLogger(__name__)
+
+_DATA_PATH = re.compile(r"/boxes/(?P<box_id>[^/?]+)/data/(?P<sensor_id>[^/?]+)")
+_BOX_PATH = re.compile(r"/boxes/(?P<box_id>[^/?]+)$")
+
+
+def _current_flow_run_id() -> str | None:
+    try:
+        from prefect.runtime import flow_run
+        return flow_run.id
+    except Exception:
+        return None
+
+
+def osm_request_labels(url: str) -> Dict[str, Any]:
+    """ Ordnet eine OpenSenseMap-URL einem Endpunkt zu (data, box, boxes) und extrahiert Box/Sensor. """
+    path = url.split("?", 1)[0]
+    if match := _DATA_PATH.search(path):
+        return {"endpoint": "data", "box_id": match["box_id"], "sensor_id": match["sensor_id"]}
+    if match := _BOX_PATH.search(path):
+        return {"endpoint": "box", "box_id": match["box_id"]}
+    return {"endpoint": "boxes"}
+
+
+class IngestionMetricsRecorder:
+    """
+    Sammelt Metrik-Beobachtungen im Prozess und schreibt sie gebündelt nach ingestion_metrics
+    (init_scripts/migration_005_ingestion_metrics.sql). observe() blockiert nie und ist thread-safe,
+    flush() schreibt synchron und wird aus Worker-Threads bzw. per asyncio.to_thread aufgerufen.
+    Fehler beim Schreiben werden geloggt und verworfen, Metriken brechen die Ingestion nie ab.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = settings.INGESTION_METRICS_ENABLED,
+        flush_rows: int = settings.INGESTION_METRICS_FLUSH_ROWS,
+        max_buffered_rows: int = settings.INGESTION_METRICS_MAX_BUFFERED_ROWS
+    ):
+        self.enabled = enabled
+        self.flush_rows = flush_rows
+        self.max_buffered_rows = max_buffered_rows
+        self._rows: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def observe(
+        self,
+        metric: str,
+        value: float,
+        *,
+        sensor_id: str | None = None,
+        box_id: str | None = None,
+        **labels: Any
+    ) -> None:
+        if not self.enabled:
+            return
+        row = {
+            "time": datetime.now(timezone.utc),
+            "metric": metric,
+            "value": float(value),
+            "sensor_id": sensor_id,
+            "box_id": box_id,
+            "flow_run_id": _current_flow_run_id(),
+            "labels": json.dumps(labels) if labels else None
+        }
+        with self._lock:
+            if len(self._rows) >= self.max_buffered_rows:
+                # DB dauerhaft nicht erreichbar: älteste Beobachtungen verwerfen statt unbegrenzt zu puffern
+                del self._rows[: len(self._rows) // 2]
+            self._rows.append(row)
+
+    @contextmanager
+    def timer(self, metric: str, **kwargs: Any) -> Iterator[Dict[str, Any]]:
+        """ Misst die Dauer des Blocks in Sekunden. Über das gelieferte Dict lassen sich Labels ergänzen. """
+        extra: Dict[str, Any] = {}
+        start = time.perf_counter()
+        try:
+            yield extra
+        finally:
+            self.observe(metric, time.perf_counter() - start, **kwargs, **extra)
+
+    def flush(self) -> int:
+        """ Schreibt alle gepufferten Beobachtungen in einer Transaktion. Gibt die Anzahl geschriebener Zeilen zurück. """
+        from .db_utils import SessionLocal
+
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows or SessionLocal is None:
+            return 0
+
+        db = SessionLocal()
+        try:
+            crud_sensor.ingestion_metrics.create_multi(db, rows=rows)
+            db.commit()
+            return len(rows)
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Ingestion-Metriken: {len(rows)} Beobachtungen konnten nicht geschrieben werden ({e}).")
+            return 0
+        finally:
+            db.close()
+
+    def flush_if_due(self) -> int:
+        if len(self._rows) < self.flush_rows:
+            return 0
+        return self.flush()
+
+    def observe_data_lag(self, box_id: str, sensor_ids: List[str]) -> None:
+        """
+        data_lag_seconds je Sensor: Abstand zwischen jetzt und dem neuesten gespeicherten Messwert.
+        Im Write-behind-Modus enthält der Wert auch die Verzögerung des Ingest-Consumers.
+        """
+        from .db_utils import SessionLocal
+
+        if not self.enabled or not sensor_ids or SessionLocal is None:
+            return
+        db = SessionLocal()
+        try:
+            latest = crud_sensor.sensor_data.get_latest_timestamps_by_sensor_ids(db, sensor_ids=sensor_ids)
+        except Exception as e:
+            logger.warning(f"Ingestion-Metriken: Datenalter für Box {box_id} nicht ermittelbar ({e}).")
+            return
+        finally:
+            db.close()
+
+        now = datetime.now(timezone.utc)
+        for sensor_id, latest_ts in latest.items():
+            if latest_ts.tzinfo is None:
+                latest_ts = latest_ts.replace(tzinfo=timezone.utc)
+            self.observe("data_lag_seconds", (now - latest_ts).total_seconds(), sensor_id=sensor_id, box_id=box_id)
+
+
+# Ein Recorder pro Prozess
+metrics = IngestionMetricsRecorder()
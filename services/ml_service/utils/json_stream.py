@@ -0,0 +1,99 @@
+# utils/json_stream.py
+
+import json
+from typing import Any, AsyncIterator, List
+
+# Obergrenze für ein einzelnes noch nicht dekodierbares Element im Puffer,
+# schützt vor unbegrenztem Puffern bei kaputten Antworten
+MAX_PENDING_CHARS = 1_000_000
+
+
+class JSONArrayStreamParser:
+    """
+    Inkrementeller Parser für ein JSON-Array auf oberster Ebene (z.B. `[{...}, {...}]`).
+    Text wird stückweise per `feed()` übergeben, vollständig dekodierte Elemente werden sofort zurückgegeben.
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._started = False
+        self._finished = False
+        self._expect_separator = False
+
+    def feed(self, text: str) -> List[Any]:
+        self._buffer += text
+        items: List[Any] = []
+        pos = 0
+        length = len(self._buffer)
+
+        while True:
+            while pos < length and self._buffer[pos].isspace():
+                pos += 1
+            if pos >= length:
+                break
+
+            char = self._buffer[pos]
+            if self._finished:
+                raise ValueError(f"Unerwartete Daten nach Ende des JSON-Arrays: {self._buffer[pos:pos + 50]!r}")
+            if not self._started:
+                if char != "[":
+                    raise ValueError(f"JSON-Array erwartet, erhalten: {self._buffer[pos:pos + 50]!r}")
+                self._started = True
+                pos += 1
+                continue
+            if char == "]":
+                self._finished = True
+                pos += 1
+                continue
+            if self._expect_separator:
+                if char != ",":
+                    raise ValueError(f"',' oder ']' erwartet, erhalten: {self._buffer[pos:pos + 50]!r}")
+                self._expect_separator = False
+                pos += 1
+                continue
+
+            try:
+                item, end = self._decoder.raw_decode(self._buffer, pos)
+            except json.JSONDecodeError:
+                # Element ist (noch) unvollständig -> auf weitere Daten warten
+                break
+            if end >= length and not isinstance(item, (dict, list)):
+                # Zahlen/Literale am Pufferende könnten abgeschnitten sein (z.B. "12" von "123")
+                break
+            items.append(item)
+            self._expect_separator = True
+            pos = end
+
+        self._buffer = self._buffer[pos:]
+        if len(self._buffer) > MAX_PENDING_CHARS:
+            raise ValueError(f"JSON-Element größer als {MAX_PENDING_CHARS} Zeichen oder ungültige Antwort.")
+        return items
+
+    def close(self) -> List[Any]:
+        """
+        Signalisiert das Ende des Streams. Gibt ggf. noch gepufferte Elemente zurück
+        und wirft ValueError, falls das Array unvollständig ist.
+        """
+        items: List[Any] = []
+        if self._buffer.strip() and not self._finished:
+            # Letztes Literal ohne nachfolgende Daten (z.B. "[1, 2" + EOF) -> als Fehler behandeln
+            items = self.feed(" ")
+        if not self._started:
+            raise ValueError("Leere Antwort, JSON-Array erwartet.")
+        if not self._finished:
+            raise ValueError("Unvollständiges JSON-Array (Stream vorzeitig beendet).")
+        return items
+
+
+async def iter_json_array(text_chunks: AsyncIterator[str]) -> AsyncIterator[Any]:
+    """
+    Dekodiert ein JSON-Array aus einem asynchronen Text-Stream (z.B. `httpx.Response.aiter_text()`)
+    und liefert die Elemente einzeln, ohne die komplette Antwort im Speicher zu halten.
+    """
+    parser = JSONArrayStreamParser()
+    async for chunk in text_chunks:
+        for item in parser.feed(chunk):
+            yield item
+    for item in parser.close():
+        yield item
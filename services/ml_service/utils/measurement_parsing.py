@@ -0,0 +1,73 @@
+# utils/measurement_parsing.py
+
+from typing import Any, Dict, List, NamedTuple
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+class ParsedMeasurements(NamedTuple):
+    """ Spaltenweise geparste Messwerte eines Batches. """
+    timestamps: np.ndarray  # datetime64[ns], UTC
+    values: np.ndarray      # float64
+    invalid_count: int      # Anzahl verworfener Messwerte (fehlendes/ungültiges Datum oder Wert)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def latest_timestamp(self) -> datetime | None:
+        """ Spätester Zeitstempel als TZ-aware datetime (UTC) oder None bei leerem Batch. """
+        if len(self.timestamps) == 0:
+            return None
+        return pd.Timestamp(self.timestamps.max(), tz="UTC").to_pydatetime()
+
+    def earliest_timestamp(self) -> datetime | None:
+        """ Frühester Zeitstempel als TZ-aware datetime (UTC) oder None bei leerem Batch. """
+        if len(self.timestamps) == 0:
+            return None
+        return pd.Timestamp(self.timestamps.min(), tz="UTC").to_pydatetime()
+
+
+def _parse_timestamps(created_at: List[Any]) -> np.ndarray:
+    """ ISO-Strings -> datetime64[ns] (UTC), ungültige Einträge werden NaT. """
+    # Schneller Pfad für das OpenSenseMap-Format "YYYY-MM-DDTHH:MM:SS.mmmZ": NumPy parst naive ISO-Strings direkt
+    if all(isinstance(ts, str) and ts.endswith("Z") for ts in created_at):
+        try:
+            return np.array([ts[:-1] for ts in created_at], dtype="datetime64[ns]")
+        except ValueError:
+            pass
+    # Allgemeiner Pfad: beliebige Offsets, ungültige Werte werden zu NaT
+    parsed = pd.to_datetime(pd.Series(created_at, dtype=object), utc=True, errors="coerce", format="ISO8601")
+    return parsed.dt.tz_convert(None).to_numpy(dtype="datetime64[ns]")
+
+
+def _parse_values(raw_values: List[Any]) -> np.ndarray:
+    """ Messwerte -> float64, ungültige Einträge werden NaN. """
+    try:
+        return np.array(raw_values, dtype="float64")
+    except (ValueError, TypeError):
+        return pd.to_numeric(pd.Series(raw_values, dtype=object), errors="coerce").to_numpy(dtype="float64")
+
+
+def parse_measurements(measurements: List[Dict[str, Any]]) -> ParsedMeasurements:
+    """
+    Wandelt rohe API-Messwerte (`createdAt`, `value`) vektorisiert in datetime64[ns] (UTC)
+    und float64-Arrays um. Ungültige Zeilen werden maskiert und nur gezählt.
+    """
+    if not measurements:
+        return ParsedMeasurements(np.empty(0, dtype="datetime64[ns]"), np.empty(0, dtype="float64"), 0)
+
+    created_at = [m.get("createdAt") if isinstance(m, dict) else None for m in measurements]
+    raw_values = [m.get("value") if isinstance(m, dict) else None for m in measurements]
+
+    timestamps = _parse_timestamps(created_at)
+    values = _parse_values(raw_values)
+
+    valid = ~np.isnat(timestamps) & np.isfinite(values)
+
+    return ParsedMeasurements(
+        timestamps=timestamps[valid],
+        values=values[valid],
+        invalid_count=int((~valid).sum())
+    )
@@ -0,0 +1,73 @@
+# utils/plausibility.py
+
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+from .measurement_parsing import ParsedMeasurements
+
+# Regeln und Klassifikation liegen in shared, damit die Push-Ingestion des Backends sie ebenfalls nutzt
+from shared.plausibility import (  # noqa: F401 -- Re-Exporte für bestehende Importe aus utils.plausibility
+    MAX_ANCHOR_GAP,
+    PLAUSIBILITY_RULES,
+    REASON_RANGE,
+    REASON_SPIKE,
+    REASON_STUCK,
+    STUCK_LOOKBACK,
+    PlausibilityAnchor,
+    PlausibilityRule,
+    RejectedMeasurements,
+    anchor_from_context,
+    anchor_precedes,
+    classify_measurements,
+    rule_for_unit
+)
+
+
+class PlausibilityFilter:
+    """
+    Prüft die Batches eines Sensors nacheinander. Der jeweils neueste plausible Wert wird als Anker
+    für den nächsten (jüngeren) Batch fortgeschrieben, damit Ausreißer und hängende Werte auch über
+    Batch- und Chunk-Grenzen hinweg erkannt werden.
+    """
+
+    def __init__(self, rule: PlausibilityRule, anchor: PlausibilityAnchor | None = None):
+        self.rule = rule
+        self.anchor = anchor
+
+    @classmethod
+    def from_context(cls, context: Dict[str, Any] | None) -> "PlausibilityFilter | None":
+        """ Baut den Filter aus CRUDSensorData.get_plausibility_context, None ohne Regel für die Einheit. """
+        rule = rule_for_unit(context.get("unit")) if context else None
+        if rule is None:
+            return None
+        return cls(rule, anchor_from_context(context))
+
+    def apply(self, parsed: ParsedMeasurements) -> Tuple[ParsedMeasurements, RejectedMeasurements]:
+        """ Teilt einen Batch in plausible und verworfene Messwerte. """
+        reasons = classify_measurements(parsed.timestamps, parsed.values, self.rule, self.anchor)
+        accepted = reasons == ""
+        rejected = ~accepted
+
+        accepted_ts, accepted_values = parsed.timestamps[accepted], parsed.values[accepted]
+        self._advance_anchor(accepted_ts, accepted_values)
+
+        return (
+            ParsedMeasurements(accepted_ts, accepted_values, parsed.invalid_count),
+            RejectedMeasurements(parsed.timestamps[rejected], parsed.values[rejected], reasons[rejected])
+        )
+
+    def _advance_anchor(self, timestamps: np.ndarray, values: np.ndarray) -> None:
+        if len(values) == 0:
+            return
+        order = np.argsort(timestamps, kind="stable")
+        ts, x = timestamps[order], values[order]
+        if self.anchor is not None and ts[-1] <= self.anchor.timestamp:
+            return
+
+        # Beginn der abschließenden Folge identischer Werte
+        changed = np.flatnonzero(x != x[-1])
+        run_started_at = ts[changed[-1] + 1] if len(changed) else ts[0]
+        if not len(changed) and anchor_precedes(self.anchor, ts[0]) and self.anchor.value == x[-1]:
+            run_started_at = self.anchor.run_started_at
+        self.anchor = PlausibilityAnchor(ts[-1], float(x[-1]), run_started_at)
@@ -0,0 +1,184 @@
+# utils/rate_limit.py
+
+import time
+import random
+import asyncio
+import logging
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+REDIS_RETRY_SECONDS = 60
+
+
+# Token Bucket als Redis-Hash {tokens, ts, blocked_until}. Läuft atomar im Redis-Server und nutzt dessen Uhr,
+# damit alle Dask-Worker/Flows dasselbe Budget teilen. Rückgabe: 0 = Token erhalten, sonst Wartezeit in ms.
+_TOKEN_BUCKET_LUA = """
+local key = KEYS[1]
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local state = redis.call('HMGET', key, 'tokens', 'ts', 'blocked_until')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+local blocked_until = tonumber(state[3]) or 0
+
+if blocked_until > now then
+    return blocked_until - now
+end
+
+tokens = math.min(burst, tokens + (now - ts) * rate / 1000)
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = math.ceil((requested - tokens) * 1000 / rate)
+end
+
+redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', key, math.ceil(burst * 1000 / rate) + 60000)
+return wait
+"""
+
+# Sperrt den Bucket für alle Worker bis now + ms (z.B. nach HTTP 429 mit Retry-After)
+_PAUSE_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local until_ms = now + tonumber(ARGV[1])
+local current = tonumber(redis.call('HGET', KEYS[1], 'blocked_until')) or 0
+if until_ms > current then
+    redis.call('HSET', KEYS[1], 'blocked_until', until_ms)
+end
+redis.call('PEXPIRE', KEYS[1], tonumber(ARGV[1]) + 60000)
+return until_ms
+"""
+
+
+class LocalTokenBucket:
+    """ Token Bucket im Prozess, Fallback wenn Redis nicht erreichbar ist. """
+
+    def __init__(self, rate_per_second: float, burst: int):
+        self.rate = rate_per_second
+        self.burst = burst
+        self._tokens = float(burst)
+        self._ts = time.monotonic()
+        self._blocked_until = 0.0
+
+    def try_acquire(self, tokens: int = 1) -> float:
+        """ Gibt 0 zurück, wenn Tokens verfügbar waren, sonst die Wartezeit in Sekunden. """
+        now = time.monotonic()
+        if self._blocked_until > now:
+            return self._blocked_until - now
+        self._tokens = min(self.burst, self._tokens + (now - self._ts) * self.rate)
+        self._ts = now
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return 0.0
+        return (tokens - self._tokens) / self.rate
+
+    def pause(self, seconds: float) -> None:
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+class SharedRateLimiter:
+    """
+    Worker-übergreifender Token Bucket für die OpenSenseMap API (Redis).
+    Ist Redis nicht erreichbar, wird pro Prozess mit demselben Budget weiter begrenzt.
+    """
+
+    def __init__(
+        self,
+        key: str = settings.OSM_RATE_LIMIT_KEY,
+        rate_per_second: float = settings.OSM_RATE_LIMIT_PER_SECOND,
+        burst: int = settings.OSM_RATE_LIMIT_BURST,
+        redis_url: str | None = settings.REDIS_URL
+    ):
+        self.key = key
+        self.rate = rate_per_second
+        self.burst = max(1, burst)
+        self._local = LocalTokenBucket(rate_per_second, self.burst)
+        self._redis = aioredis.from_url(redis_url) if redis_url else None
+        self._acquire_script = self._redis.register_script(_TOKEN_BUCKET_LUA) if self._redis else None
+        self._pause_script = self._redis.register_script(_PAUSE_LUA) if self._redis else None
+        self._redis_failed_at: float | None = None
+
+    def _use_redis(self) -> bool:
+        # Nach einem Redis-Ausfall wird nach REDIS_RETRY_SECONDS erneut versucht
+        if self._redis is None:
+            return False
+        return self._redis_failed_at is None or time.monotonic() - self._redis_failed_at > REDIS_RETRY_SECONDS
+
+    def _disable_redis(self, error: Exception) -> None:
+        if self._redis_failed_at is None:
+            logger.warning(f"Rate Limiter: Redis nicht erreichbar ({error}). Begrenze vorübergehend nur lokal pro Prozess.")
+        self._redis_failed_at = time.monotonic()
+
+    async def acquire(self, tokens: int = 1) -> None:
+        """ Wartet, bis ein Token verfügbar ist. """
+        if self.rate <= 0:
+            return
+        while True:
+            if self._use_redis():
+                try:
+                    wait_seconds = int(await self._acquire_script(keys=[self.key], args=[self.rate, self.burst, tokens])) / 1000
+                    self._redis_failed_at = None
+                except RedisError as e:
+                    self._disable_redis(e)
+                    continue
+            else:
+                wait_seconds = self._local.try_acquire(tokens)
+            if wait_seconds <= 0:
+                return
+            # Jitter verhindert, dass alle wartenden Worker im selben Moment erneut anfragen
+            await asyncio.sleep(wait_seconds + random.uniform(0, wait_seconds * 0.1))
+
+    async def pause(self, seconds: float) -> None:
+        """ Sperrt den Bucket für alle Worker für `seconds` (z.B. Retry-After). """
+        if seconds <= 0:
+            return
+        self._local.pause(seconds)
+        if self._use_redis():
+            try:
+                await self._pause_script(keys=[self.key], args=[int(seconds * 1000)])
+            except RedisError as e:
+                self._disable_redis(e)
+
+    async def aclose(self) -> None:
+        if self._redis is not None:
+            await self._redis.aclose()
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """ Retry-After-Header (Sekunden oder HTTP-Datum) -> Sekunden, None wenn nicht auswertbar. """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(
+    attempt: int,
+    base_seconds: float = settings.HTTP_BACKOFF_BASE_SECONDS,
+    max_seconds: float = settings.HTTP_BACKOFF_MAX_SECONDS
+) -> float:
+    """ Exponentielles Backoff mit vollem Jitter: zufällig in [0, min(max, base * 2^attempt)]. """
+    return random.uniform(0, min(max_seconds, base_seconds * (2 ** attempt)))
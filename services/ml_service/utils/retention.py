@@ -0,0 +1,143 @@
+# utils/retention.py
+
+from prefect import task, get_run_logger
+from typing import Dict, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import text
+
+from utils.db_utils import get_db_session
+from utils.continuous_aggregates import CONTINUOUS_AGGREGATES, REFRESH_POLICY_OFFSETS_SQL
+
+from shared.crud import crud_sensor
+
+# Mit dem Horizont gelöscht: Rohdaten und das gleich feine Minuten-Rollup.
+# sensor_data_rollup_1h und _1d (und die *_avg-Views) bleiben erhalten.
+DROPPED_WITH_RAW_DATA = ["sensor_data", "sensor_data_rollup_1m"]
+
+# Verworfene Messwerte haben keine Rollups und eine eigene Aufbewahrungsdauer (SENSOR_DATA_REJECTED_RETENTION_DAYS)
+REJECTED_TABLE = "sensor_data_rejected"
+
+# Je Sensor: Rohdaten und Tages-Rollup müssen im Zeitraum gleich viele Messwerte zählen
+_COVERAGE_MISMATCH_SQL = """
+WITH raw AS (
+    SELECT sensor_key, count(*) AS value_count
+    FROM sensor_data
+    WHERE measurement_timestamp >= :window_start AND measurement_timestamp < :cutoff
+    GROUP BY sensor_key
+), rollup AS (
+    SELECT sensor_key, sum(value_count) AS value_count
+    FROM sensor_data_rollup_1d
+    WHERE bucket >= :window_start AND bucket < :cutoff
+    GROUP BY sensor_key
+)
+SELECT count(*)
+FROM raw
+FULL JOIN rollup USING (sensor_key)
+WHERE raw.value_count IS DISTINCT FROM rollup.value_count
+"""
+
+
+def _start_of_day(ts: datetime) -> datetime:
+    return ts.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+@task(name="Plan Sensor Data Retention", log_prints=True)
+def plan_retention(raw_retention_days: int) -> Optional[Tuple[datetime, datetime]]:
+    """
+    Bestimmt den zu löschenden Zeitraum [window_start, cutoff) der Rohdaten. cutoff liegt auf einer Tagesgrenze
+    (UTC), damit Chunks von 1 Tag und die Buckets des Tages-Rollups genau dort enden, und nie innerhalb des Fensters,
+    das eine Refresh-Policy der Continuous Aggregates noch neu berechnet. window_start ist der bisherige Horizont
+    bzw. der Beginn des ältesten Chunks. Gibt None zurück, wenn es nichts zu löschen gibt.
+    """
+    logger = get_run_logger()
+    now_utc = datetime.now(timezone.utc)
+    cutoff = _start_of_day(now_utc - timedelta(days=raw_retention_days))
+
+    buckets = dict(CONTINUOUS_AGGREGATES)
+    with get_db_session() as db:
+        if db is None:
+            raise RuntimeError("DB Session nicht verfügbar für die Aufbewahrung.")
+        policies = db.execute(text(REFRESH_POLICY_OFFSETS_SQL), {"view_names": list(buckets)}).all()
+        retained_from = crud_sensor.sensor_data_retention.get_retained_from(db)
+        oldest_chunk = db.execute(
+            text("SELECT min(range_start) FROM timescaledb_information.chunks WHERE hypertable_name = 'sensor_data'")
+        ).scalar()
+
+    for policy in policies:
+        if policy.start_offset is None:
+            raise RuntimeError(f"Refresh-Policy von {policy.view_name} hat kein start_offset, Rohdaten dürfen nicht gelöscht werden.")
+        # Die Policy berechnet ganze Buckets ab now() - start_offset neu, dort müssen die Rohdaten noch vorliegen
+        policy_safe_before = _start_of_day(now_utc - policy.start_offset - buckets[policy.view_name])
+        if cutoff > policy_safe_before:
+            logger.warning(
+                f"[Retention] Refresh-Policy von {policy.view_name} liest bis {policy_safe_before} zurück, "
+                f"Rohdaten werden erst davor gelöscht statt vor {cutoff}."
+            )
+            cutoff = policy_safe_before
+
+    window_start = retained_from if retained_from is not None else oldest_chunk
+    if window_start is None or _start_of_day(window_start) >= cutoff:
+        logger.info(f"[Retention] Keine Rohdaten vor {cutoff} (Horizont: {retained_from}).")
+        return None
+    window_start = _start_of_day(window_start)
+    logger.info(f"[Retention] Rohdaten in {window_start} -> {cutoff} werden auf die Rollups reduziert.")
+    return window_start, cutoff
+
+
+@task(name="Verify Rollup Coverage", log_prints=True)
+def verify_rollup_coverage(window_start: datetime, cutoff: datetime) -> int:
+    """
+    Vergleicht je Sensor die Anzahl der Rohdaten in [window_start, cutoff) mit sensor_data_rollup_1d, das über
+    sensor_data_rollup_1h aus dem Minuten-Rollup entsteht. Gibt die Anzahl abweichender Sensoren zurück.
+    """
+    logger = get_run_logger()
+    with get_db_session() as db:
+        if db is None:
+            raise RuntimeError("DB Session nicht verfügbar für die Aufbewahrung.")
+        mismatches = db.execute(text(_COVERAGE_MISMATCH_SQL), {"window_start": window_start, "cutoff": cutoff}).scalar()
+    logger.info(f"[Retention] Rollup-Abdeckung {window_start} -> {cutoff}: {mismatches} Sensoren weichen ab.")
+    return mismatches
+
+
+@task(name="Drop Raw Sensor Data Chunks", log_prints=True)
+def drop_raw_chunks_before(cutoff: datetime) -> Dict[str, int]:
+    """
+    Setzt den Aufbewahrungshorizont auf cutoff und löscht in derselben Transaktion alle Chunks der Tabellen aus
+    DROPPED_WITH_RAW_DATA, die vollständig davor liegen. Ab dem Commit lesen Abfragen den Zeitraum aus den
+    Rollups und Inserts davor werden verworfen. Gibt die Anzahl gelöschter Chunks je Tabelle zurück.
+    """
+    logger = get_run_logger()
+    dropped: Dict[str, int] = {}
+    with get_db_session() as db:
+        if db is None:
+            raise RuntimeError("DB Session nicht verfügbar für die Aufbewahrung.")
+        crud_sensor.sensor_data_retention.raise_to(db, retained_from=cutoff)
+        for table in DROPPED_WITH_RAW_DATA:
+            chunks = db.execute(
+                text("SELECT drop_chunks(CAST(:table AS regclass), older_than => CAST(:cutoff AS TIMESTAMPTZ))"),
+                {"table": table, "cutoff": cutoff}
+            ).all()
+            dropped[table] = len(chunks)
+    logger.info(f"[Retention] Horizont auf {cutoff} gesetzt, gelöschte Chunks: {dropped}")
+    return dropped
+
+
+@task(name="Drop Rejected Sensor Data Chunks", log_prints=True)
+def drop_rejected_chunks_before(rejected_retention_days: int) -> int:
+    """
+    Löscht alle Chunks von sensor_data_rejected, die vollständig vor dem Tagesbeginn (UTC) vor
+    rejected_retention_days Tagen liegen. Unabhängig vom Aufbewahrungshorizont der Rohdaten: Die Tabelle
+    hat keine Rollups und wird von keiner Abfrage als Ersatz für sensor_data gelesen.
+    Gibt die Anzahl gelöschter Chunks zurück.
+    """
+    logger = get_run_logger()
+    cutoff = _start_of_day(datetime.now(timezone.utc) - timedelta(days=rejected_retention_days))
+    with get_db_session() as db:
+        if db is None:
+            raise RuntimeError("DB Session nicht verfügbar für die Aufbewahrung.")
+        chunks = db.execute(
+            text("SELECT drop_chunks(CAST(:table AS regclass), older_than => CAST(:cutoff AS TIMESTAMPTZ))"),
+            {"table": REJECTED_TABLE, "cutoff": cutoff}
+        ).all()
+    logger.info(f"[Retention] Verworfene Messwerte vor {cutoff} gelöscht: {len(chunks)} Chunks.")
+    return len(chunks)
@@ -0,0 +1,51 @@
+# utils/task_runners.py
+
+from typing import Any, Dict
+from datetime import datetime, timezone
+from prefect.task_runners import ThreadPoolTaskRunner
+from prefect_dask.task_runners import DaskTaskRunner
+
+from utils.config import settings
+
+TASK_RUNNER_MODES = ("auto", "thread", "dask")
+
+
+def estimate_pending_window_days(
+    cached_state: Dict[str, Any] | None,
+    initial_fetch_days: int,
+    now: datetime | None = None
+) -> float:
+    """
+    Schätzt den noch abzurufenden Zeitraum einer Box in Tagen aus dem gespeicherten Sync-Stand
+    (ältestes Sensor-Watermark bzw. last_data_fetched). Ohne Sync-Stand (neue Box) gilt initial_fetch_days.
+    """
+    if not cached_state:
+        return float(initial_fetch_days)
+
+    watermarks = [wm for wm in (cached_state.get("sensor_watermarks") or {}).values() if wm is not None]
+    oldest = min(watermarks) if watermarks else cached_state.get("db_last_data_fetched")
+    if oldest is None:
+        return float(initial_fetch_days)
+
+    now = now or datetime.now(timezone.utc)
+    return max(0.0, (now - oldest.astimezone(timezone.utc)).total_seconds() / 86400)
+
+
+def select_ingestion_task_runner(mode: str, pending_days: float) -> str:
+    """
+    Wählt den Task Runner für einen Ingestion-Lauf: "thread" für kleine inkrementelle Fenster
+    (kein Cluster-Start), "dask" ab INGESTION_DASK_THRESHOLD_DAYS offenem Zeitraum.
+    """
+    if mode not in TASK_RUNNER_MODES:
+        raise ValueError(f"Unbekannter Task-Runner-Modus '{mode}', erlaubt: {', '.join(TASK_RUNNER_MODES)}")
+    if mode != "auto":
+        return mode
+    return "dask" if pending_days >= settings.INGESTION_DASK_THRESHOLD_DAYS else "thread"
+
+
+def thread_task_runner() -> ThreadPoolTaskRunner:
+    return ThreadPoolTaskRunner(max_workers=settings.THREAD_RUNNER_MAX_WORKERS)
+
+
+def dask_task_runner(n_workers: int = settings.DASK_N_WORKERS) -> DaskTaskRunner:
+    return DaskTaskRunner(cluster_kwargs={"n_workers": n_workers})
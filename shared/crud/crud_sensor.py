@@ -1,9 +1,12 @@
 # services/backend/app/crud/crud_sensor.py
-from typing import List, Optional, Dict, Any
-from datetime import datetime
+import itertools
+from typing import List, Optional, Dict, Any, Iterable, Iterator, NamedTuple, Sequence, Tuple
+from datetime import datetime, timedelta, timezone
 
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, func, case, column, over, text, alias
+from sqlalchemy import desc, func, case, column, over, text, alias, literal_column, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DataError
 
 from ..models import sensor as sensor_model
 from ..models.sensor import sensor_data_hourly_avg_view, sensor_data_daily_avg_view, \
@@ -11,6 +14,168 @@ from ..models.sensor import sensor_data_hourly_avg_view, sensor_data_daily_avg_v
                               sensor_data_yearly_avg_view, sensor_data_daily_summary_agg_view
 from ..schemas import sensor as sensor_schema
 
+class _CopyRowStream:
+    """
+    Dateiähnlicher Wrapper um einen Zeilen-Generator für `COPY ... FROM STDIN`.
+    psycopg2 ruft `read()` blockweise auf, die Zeilen werden also gestreamt statt vorher komplett im Speicher gebaut.
+    """
+    def __init__(self, lines: Iterator[str]):
+        self._lines = lines
+        self._buffer = b""
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line.encode("utf-8")
+        if size < 0:
+            chunk, self._buffer = self._buffer, b""
+        else:
+            chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+def _format_copy_timestamp(ts: Any) -> str:
+    # datetime -> ISO-String inkl. Offset, alles andere (z.B. bereits formatierte Strings) unverändert
+    return ts.isoformat() if isinstance(ts, datetime) else str(ts)
+
+
+def _to_utc_iso_strings(timestamps: Any) -> Sequence[Any]:
+    """
+    Wandelt NumPy/Pandas datetime64-Arrays vektorisiert in UTC ISO-Strings um.
+    Listen von datetime-Objekten werden unverändert zurückgegeben.
+    """
+    dtype = getattr(timestamps, "dtype", None)
+    if dtype is None or getattr(dtype, "kind", None) != "M":
+        return timestamps
+    import numpy as np # nur für den Spalten-Pfad nötig
+    as_utc = np.asarray(timestamps, dtype="datetime64[us]")
+    return np.datetime_as_string(as_utc, unit="us", timezone="UTC")
+
+
+def _sensor_key(sensor_id: str):
+    """ Skalare Unterabfrage sensor_id -> sensor.sensor_key (Schlüsselspalte von sensor_data und der Aggregate). """
+    return select(sensor_model.Sensor.sensor_key).where(sensor_model.Sensor.sensor_id == sensor_id).scalar_subquery()
+
+
+def _as_utc(value: datetime) -> datetime:
+    """ Naive Zeitpunkte (Query-Parameter ohne Offset) gelten als UTC, damit sie mit den TZ-aware Grenzen aus der DB vergleichbar sind. """
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _contiguous_through(from_date: datetime, partitions: Iterable[Tuple[datetime, datetime]]) -> datetime:
+    """
+    Ende der lückenlosen Folge von Zeitfenstern [von, bis) ab from_date. partitions muss nach `von` sortiert sein,
+    überlappende Fenster setzen die Folge fort, eine Lücke beendet sie.
+    """
+    through = from_date
+    for partition_from, partition_to in partitions:
+        if partition_from <= through < partition_to:
+            through = partition_to
+    return through
+
+
+class _ContinuousAggregateRoute(NamedTuple):
+    """ Rollup, aus dem get_aggregated_data_from_continuous_aggregates lesen kann. """
+    view: str
+    unit: str  # Bucket-Einheit: jedes Intervall aus ganzen Vielfachen davon setzt sich exakt aus Rollup-Buckets zusammen
+
+
+# Hierarchische Rollups (init_scripts/migration_009_sensor_data_rollups.sql), vom gröbsten zum feinsten Raster.
+# time_bucket richtet Minuten, Stunden, Tage, Wochen und Monate in UTC an den Grenzen der feineren Einheit aus,
+# z.B. liegt jeder Tages-Bucket vollständig in genau einem Wochen- oder Monats-Bucket.
+_CONTINUOUS_AGGREGATE_ROUTES: List[_ContinuousAggregateRoute] = [
+    _ContinuousAggregateRoute("sensor_data_rollup_1d", "day"),
+    _ContinuousAggregateRoute("sensor_data_rollup_1h", "hour"),
+    _ContinuousAggregateRoute("sensor_data_rollup_1m", "minute"),
+]
+
+# aggregation_type -> Zusammenfassung der Rollup-Spalten. Stichproben-Standardabweichung wie stddev() aus
+# Quadratsumme und Summe, bei nur einem Wert NULL.
+_ROLLUP_AGGREGATES = {
+    "avg": "sum(value_sum) / NULLIF(sum(value_count), 0)",
+    "min": "min(value_min)",
+    "max": "max(value_max)",
+    "count": "CAST(sum(value_count) AS BIGINT)",
+    "sum": "sum(value_sum)",
+    "stddev": (
+        "CASE WHEN sum(value_count) > 1 THEN sqrt(GREATEST("
+        "(sum(value_sumsq) - sum(value_sum) * sum(value_sum) / sum(value_count)) / (sum(value_count) - 1), 0"
+        ")) END"
+    ),
+}
+
+_SENSOR_KEY_SQL = "(SELECT sensor_key FROM sensor WHERE sensor_id = :sensor_id)"
+
+# Aufbewahrungshorizont der Rohdaten (init_scripts/migration_010_sensor_data_retention.sql, flows/retention.py),
+# NULL solange nichts gelöscht wurde
+_RAW_RETAINED_FROM_SQL = "(SELECT retained_from FROM sensor_data_retention WHERE hypertable_name = 'sensor_data')"
+
+_MOMENT_COLUMNS = "value_count, value_sum, value_sumsq, value_min, value_max"
+
+# Continuous Aggregates auf sensor_data mit ihrer Bucket-Größe (siehe init_scripts/init_db.sql und
+# migration_009_sensor_data_rollups.sql). Die Rollups bauen aufeinander auf und stehen daher von fein nach grob.
+CONTINUOUS_AGGREGATES: List[Tuple[str, timedelta]] = [
+    ("sensor_data_hourly_avg", timedelta(hours=1)),
+    ("sensor_data_daily_avg", timedelta(days=1)),
+    ("sensor_data_daily_summary_agg", timedelta(days=1)),
+    ("sensor_data_weekly_avg", timedelta(weeks=1)),
+    ("sensor_data_monthly_avg", timedelta(days=31)),
+    ("sensor_data_yearly_avg", timedelta(days=366)),
+    ("sensor_data_rollup_1m", timedelta(minutes=1)),
+    ("sensor_data_rollup_1h", timedelta(hours=1)),
+    ("sensor_data_rollup_1d", timedelta(days=1)),
+]
+
+REFRESH_POLICY_OFFSETS_SQL = """
+SELECT ca.view_name, (j.config ->> 'start_offset')::interval AS start_offset
+FROM timescaledb_information.jobs j
+JOIN timescaledb_information.continuous_aggregates ca
+  ON ca.materialization_hypertable_schema = j.hypertable_schema
+ AND ca.materialization_hypertable_name = j.hypertable_name
+WHERE j.proc_name = 'policy_refresh_continuous_aggregate'
+  AND ca.view_name = ANY(:view_names)
+"""
+
+
+def _moment_segments(
+    name: str,
+    *,
+    from_date: datetime,
+    to_date: datetime,
+    retained_from: Optional[datetime],
+    time_bucket: bool
+) -> Tuple[List[str], Dict[str, datetime]]:
+    """
+    Teilabfragen mit den Spalten der Rollups (Anzahl, Summe, Quadratsumme, Min, Max) für [from_date, to_date):
+    Rohdaten ab dem Aufbewahrungshorizont, davor ganze Stunden aus sensor_data_rollup_1h. Mit time_bucket
+    zusätzlich die Spalte time_bucket(:interval). Parameter tragen das Präfix name, :sensor_id bindet der Aufrufer.
+    """
+    segments, params = [], {}
+    if retained_from is not None and from_date < retained_from:
+        old_to = min(to_date, retained_from)
+        bucket_column = "time_bucket(CAST(:interval AS INTERVAL), bucket) AS time_bucket, " if time_bucket else ""
+        segments.append(
+            f"SELECT {bucket_column}{_MOMENT_COLUMNS} FROM sensor_data_rollup_1h "
+            f"WHERE sensor_key = {_SENSOR_KEY_SQL} AND bucket >= :{name}_old_from "
+            f"AND bucket <= CAST(:{name}_old_to AS TIMESTAMPTZ) - INTERVAL '1 hour'"
+        )
+        params.update({f"{name}_old_from": from_date, f"{name}_old_to": old_to})
+        from_date = old_to
+    if from_date < to_date:
+        bucket_column = "time_bucket(CAST(:interval AS INTERVAL), measurement_timestamp) AS time_bucket, " if time_bucket else ""
+        segments.append(
+            f"SELECT {bucket_column}count(*) AS value_count, sum(value) AS value_sum, sum(value * value) AS value_sumsq, "
+            "min(value) AS value_min, max(value) AS value_max "
+            f"FROM sensor_data WHERE sensor_key = {_SENSOR_KEY_SQL} "
+            f"AND measurement_timestamp >= :{name}_from AND measurement_timestamp < :{name}_to"
+            + (" GROUP BY 1" if time_bucket else "")
+        )
+        params.update({f"{name}_from": from_date, f"{name}_to": to_date})
+    return segments, params
+
+
 class CRUDSensorBox:
     def get(self, db: Session, id: str) -> Optional[sensor_model.SensorBox]:
         return db.query(sensor_model.SensorBox).filter(sensor_model.SensorBox.box_id == id).first()
@@ -22,6 +187,78 @@ class CRUDSensorBox:
         """
         return db.query(sensor_model.SensorBox).offset(skip).limit(limit).all()
 
+    def get_multi_by_ids(self, db: Session, *, box_ids: Sequence[str]) -> List[sensor_model.SensorBox]:
+        """
+        Ruft mehrere Sensorboxen per ID in einer Abfrage ab (ohne die Sensoren zu laden).
+        """
+        if not box_ids:
+            return []
+        return db.query(sensor_model.SensorBox).filter(sensor_model.SensorBox.box_id.in_(list(box_ids))).all()
+
+    def touch_metadata(
+        self,
+        db: Session,
+        *,
+        box_id: str,
+        last_measurement_at: Optional[datetime],
+        metadata_etag: Optional[str] = None,
+        metadata_last_modified: Optional[str] = None
+    ) -> None:
+        """
+        Aktualisiert bei unveränderten Metadaten nur lastMeasurementAt (nie rückwärts) und die HTTP-Validatoren,
+        ohne Box und Sensoren zu laden. Kein Commit.
+        """
+        db.execute(
+            text(
+                'UPDATE sensor_box SET '
+                '"lastMeasurementAt" = GREATEST("lastMeasurementAt", CAST(:last_measurement_at AS TIMESTAMPTZ)), '
+                'metadata_etag = COALESCE(:metadata_etag, metadata_etag), '
+                'metadata_last_modified = COALESCE(:metadata_last_modified, metadata_last_modified) '
+                'WHERE box_id = :box_id'
+            ),
+            {
+                "box_id": box_id, "last_measurement_at": last_measurement_at,
+                "metadata_etag": metadata_etag, "metadata_last_modified": metadata_last_modified
+            }
+        )
+
+    def upsert_multi(self, db: Session, *, objs_in: Sequence[sensor_schema.SensorBoxCreate]) -> Dict[str, Dict[str, Any]]:
+        """
+        Legt mehrere Boxen in einem Statement an bzw. aktualisiert sie (INSERT ... ON CONFLICT DO UPDATE).
+        Bestehende Boxen behalten last_data_fetched, lastMeasurementAt wird nie zurückgesetzt.
+        Kein Commit. Gibt je box_id {"inserted", "last_data_fetched", "lastMeasurementAt"} zurück.
+        """
+        if not objs_in:
+            return {}
+        # ON CONFLICT DO UPDATE darf dieselbe Zeile nicht zweimal pro Statement anfassen
+        rows = list({obj.box_id: obj.model_dump() for obj in objs_in}.values())
+        table = sensor_model.SensorBox.__table__
+        stmt = pg_insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.box_id],
+            set_={
+                "name": stmt.excluded.name,
+                "exposure": stmt.excluded.exposure,
+                "model": stmt.excluded.model,
+                "currentLocation": stmt.excluded.currentLocation,
+                "lastMeasurementAt": func.greatest(table.c.lastMeasurementAt, stmt.excluded.lastMeasurementAt),
+                "updatedAt": stmt.excluded.updatedAt,
+                "metadata_hash": stmt.excluded.metadata_hash,
+                "metadata_etag": stmt.excluded.metadata_etag,
+                "metadata_last_modified": stmt.excluded.metadata_last_modified,
+            }
+        ).returning(
+            table.c.box_id,
+            table.c.last_data_fetched,
+            table.c.lastMeasurementAt,
+            # xmax = 0 nur bei neu eingefügten Zeilen
+            literal_column("(xmax = 0)").label("inserted")
+        )
+        return {
+            row.box_id: {"inserted": row.inserted, "last_data_fetched": row.last_data_fetched, "lastMeasurementAt": row.lastMeasurementAt}
+            for row in db.execute(stmt)
+        }
+
     def create(self, db: Session, *, obj_in: sensor_schema.SensorBoxCreate) -> sensor_model.SensorBox:
         db_obj = sensor_model.SensorBox(**obj_in.model_dump())
         db.add(db_obj)
@@ -50,6 +287,34 @@ class CRUDSensor:
         """
         return db.query(sensor_model.Sensor).filter(sensor_model.Sensor.box_id == box_id).offset(skip).limit(limit).all()
 
+    def get_existing_ids(self, db: Session, *, sensor_ids: Sequence[str]) -> set:
+        """ Gibt die Teilmenge der übergebenen sensor_ids zurück, die in der Datenbank existieren. """
+        if not sensor_ids:
+            return set()
+        rows = db.query(sensor_model.Sensor.sensor_id).filter(sensor_model.Sensor.sensor_id.in_(list(sensor_ids))).all()
+        return {row.sensor_id for row in rows}
+
+    def upsert_multi(self, db: Session, *, objs_in: Sequence[sensor_schema.SensorCreate]) -> Dict[str, bool]:
+        """
+        Legt Sensoren beliebig vieler Boxen in einem Statement an bzw. aktualisiert Titel, Typ, Einheit und Box.
+        Kein Commit. Gibt je sensor_id zurück, ob der Sensor neu eingefügt wurde.
+        """
+        if not objs_in:
+            return {}
+        rows = list({obj.sensor_id: obj.model_dump() for obj in objs_in}.values())
+        table = sensor_model.Sensor.__table__
+        stmt = pg_insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.sensor_id],
+            set_={
+                "box_id": stmt.excluded.box_id,
+                "title": stmt.excluded.title,
+                "sensor_type": stmt.excluded.sensor_type,
+                "unit": stmt.excluded.unit,
+                "icon": func.coalesce(stmt.excluded.icon, table.c.icon),
+            }
+        ).returning(table.c.sensor_id, literal_column("(xmax = 0)").label("inserted"))
+        return {row.sensor_id: row.inserted for row in db.execute(stmt)}
 
     def create(self, db: Session, *, obj_in: sensor_schema.SensorCreate) -> sensor_model.Sensor:
         db_obj = sensor_model.Sensor(
@@ -76,11 +341,133 @@ class CRUDSensor:
 
 
 class CRUDSensorData:
+    ON_CONFLICT_MODES = ("nothing", "update")
+
     def create_multi(self, db: Session, *, objs_in: List[sensor_schema.SensorDataCreate]) -> List[sensor_model.SensorData]:
-        db_objs = (sensor_model.SensorData(**obj_in.model_dump()) for obj_in in objs_in)
+        """
+        ORM-Bulk-Insert. Wie bei create_multi_rows werden Messwerte vor dem Aufbewahrungshorizont und Messwerte
+        unbekannter Sensoren (JOIN auf sensor im COPY-Pfad) verworfen, zurückgegeben werden nur die gespeicherten Objekte.
+        """
+        retained_from = self._raw_retained_from(db)
+        if retained_from is not None:
+            objs_in = [obj_in for obj_in in objs_in if _as_utc(obj_in.measurement_timestamp) >= retained_from]
+        sensor_keys = dict(
+            db.query(sensor_model.Sensor.sensor_id, sensor_model.Sensor.sensor_key)
+            .filter(sensor_model.Sensor.sensor_id.in_({obj_in.sensor_id for obj_in in objs_in}))
+            .all()
+        )
+        objs_in = [obj_in for obj_in in objs_in if obj_in.sensor_id in sensor_keys]
+        db_objs = [
+            sensor_model.SensorData(
+                sensor_key=sensor_keys[obj_in.sensor_id],
+                value=obj_in.value,
+                measurement_timestamp=obj_in.measurement_timestamp
+            )
+            for obj_in in objs_in
+        ]
         db.bulk_save_objects(db_objs)
         db.commit()
-        return list(db_objs)
+        return db_objs
+
+    def create_multi_columnar(
+        self,
+        db: Session,
+        *,
+        sensor_id: str | Sequence[str],
+        measurement_timestamps: Sequence[Any],
+        values: Sequence[float],
+        on_conflict: Optional[str] = None,
+        commit: bool = True
+    ) -> int:
+        """
+        Spaltenbasierter Bulk-Insert ohne Pydantic-/ORM-Objekte pro Messwert.
+        `sensor_id` ist entweder eine einzelne ID (gilt für alle Zeilen) oder eine Spalte gleicher Länge.
+        Zeitstempel dürfen TZ-aware datetimes, ISO-Strings mit Offset oder ein datetime64-Array (UTC) sein.
+        `on_conflict` wie bei `create_multi_rows`. Gibt die Anzahl eingefügter Zeilen zurück.
+        """
+        if len(measurement_timestamps) != len(values):
+            raise ValueError(f"Spaltenlängen passen nicht: {len(measurement_timestamps)} Zeitstempel, {len(values)} Werte.")
+
+        sensor_ids = itertools.repeat(sensor_id) if isinstance(sensor_id, str) else sensor_id
+        timestamps = _to_utc_iso_strings(measurement_timestamps)
+        return self.create_multi_rows(
+            db, rows=zip(sensor_ids, values, timestamps), on_conflict=on_conflict, commit=commit
+        )
+
+    def create_multi_rows(
+        self,
+        db: Session,
+        *,
+        rows: Iterable[Tuple[str, float, Any]],
+        on_conflict: Optional[str] = None,
+        commit: bool = True
+    ) -> int:
+        """
+        Bulk-Insert von (sensor_id, value, measurement_timestamp)-Tupeln per `COPY ... FROM STDIN`.
+        Die Zeilen werden gestreamt, es wird kein Objekt pro Messwert angelegt. Da sensor_data nur den
+        sensor_key speichert, laufen die Zeilen immer über eine temporäre Staging-Tabelle und werden beim
+        Merge über sensor auf den Schlüssel abgebildet. Zeilen unbekannter Sensoren werden dabei übersprungen,
+        ebenso Zeilen vor dem Aufbewahrungshorizont (der Zeitraum liegt nur noch in den Rollups vor).
+
+        on_conflict:
+            None      -> direkter Insert (Duplikate führen zu einem Fehler)
+            'nothing' -> bereits vorhandene (sensor_key, measurement_timestamp) werden übersprungen
+            'update'  -> bereits vorhandene Messwerte werden mit dem neuen Wert überschrieben
+        Gibt die Anzahl tatsächlich eingefügter bzw. aktualisierter Zeilen zurück.
+        """
+        if on_conflict is not None and on_conflict not in self.ON_CONFLICT_MODES:
+            raise ValueError(f"Ungültiger on_conflict Modus: {on_conflict}. Erlaubt: {self.ON_CONFLICT_MODES}")
+
+        db.execute(text(
+            "CREATE TEMP TABLE IF NOT EXISTS sensor_data_staging ("
+            " sensor_id VARCHAR(50), value DOUBLE PRECISION, measurement_timestamp TIMESTAMPTZ"
+            ") ON COMMIT DELETE ROWS"
+        ))
+        self._copy_rows(db, table="sensor_data_staging", rows=rows)
+
+        if on_conflict is None:
+            merge_sql = (
+                "INSERT INTO sensor_data (sensor_key, value, measurement_timestamp) "
+                "SELECT s.sensor_key, st.value, st.measurement_timestamp "
+                "FROM sensor_data_staging st JOIN sensor s ON s.sensor_id = st.sensor_id "
+                f"WHERE st.measurement_timestamp >= COALESCE({_RAW_RETAINED_FROM_SQL}, '-infinity')"
+            )
+        else:
+            conflict_action = "DO NOTHING" if on_conflict == "nothing" else "DO UPDATE SET value = EXCLUDED.value"
+            # DISTINCT ON, da ON CONFLICT DO UPDATE dieselbe Zeile nicht zweimal pro Statement anfassen darf
+            merge_sql = (
+                "INSERT INTO sensor_data (sensor_key, value, measurement_timestamp) "
+                "SELECT DISTINCT ON (s.sensor_key, st.measurement_timestamp) s.sensor_key, st.value, st.measurement_timestamp "
+                "FROM sensor_data_staging st JOIN sensor s ON s.sensor_id = st.sensor_id "
+                f"WHERE st.measurement_timestamp >= COALESCE({_RAW_RETAINED_FROM_SQL}, '-infinity') "
+                f"ON CONFLICT (sensor_key, measurement_timestamp) {conflict_action}"
+            )
+        row_count = db.execute(text(merge_sql)).rowcount
+        db.execute(text("TRUNCATE sensor_data_staging"))
+
+        if commit:
+            db.commit()
+        return row_count
+
+    def _copy_rows(self, db: Session, *, table: str, rows: Iterable[Tuple[str, float, Any]]) -> int:
+        """ Streamt (sensor_id, value, measurement_timestamp)-Tupel per COPY in die angegebene Tabelle. """
+        row_count = 0
+
+        def lines() -> Iterator[str]:
+            nonlocal row_count
+            for sid, value, ts in rows:
+                row_count += 1
+                yield f"{sid}\t{float(value)!r}\t{_format_copy_timestamp(ts)}\n"
+
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {table} (sensor_id, value, measurement_timestamp) FROM STDIN",
+                _CopyRowStream(lines())
+            )
+        finally:
+            cursor.close()
+        return row_count
 
     def get_by_sensor_id(
         self,
@@ -91,11 +478,17 @@ class CRUDSensorData:
         to_date: Optional[datetime] = None,
         skip: int = 0,
         limit: int = 1000 
-    ) -> List[sensor_model.SensorData]:
+    ) -> List[Dict[str, Any]]:
         """
         Ruft Datenpunkte für einen spezifischen Sensor ab, optional innerhalb eines Zeitraums.
+        Der Sensor wird einmal auf seinen sensor_key abgebildet, die Abfrage läuft dann über
+        den Index (sensor_key, measurement_timestamp DESC).
         """
-        query = db.query(sensor_model.SensorData).filter(sensor_model.SensorData.sensor_id == sensor_id)
+        query = db.query(
+            literal(sensor_id).label('sensor_id'),
+            sensor_model.SensorData.value,
+            sensor_model.SensorData.measurement_timestamp
+        ).filter(sensor_model.SensorData.sensor_key == _sensor_key(sensor_id))
 
         if from_date:
             query = query.filter(sensor_model.SensorData.measurement_timestamp >= from_date)
@@ -105,7 +498,7 @@ class CRUDSensorData:
         # Standardmäßig nach Zeit absteigend sortieren, um die neuesten Daten zuerst zu bekommen
         query = query.order_by(desc(sensor_model.SensorData.measurement_timestamp))
 
-        return query.offset(skip).limit(limit).all()
+        return [row._asdict() for row in query.offset(skip).limit(limit).all()]
     
     def get_hourly_average_by_sensor_id(
         self,
@@ -122,7 +515,7 @@ class CRUDSensorData:
             sensor_data_hourly_avg_view.c.hour.label('hour'),
             sensor_data_hourly_avg_view.c.average_value.label('average_value')
         ) \
-        .filter(sensor_data_hourly_avg_view.c.sensor_id == sensor_id)  \
+        .filter(sensor_data_hourly_avg_view.c.sensor_key == _sensor_key(sensor_id))  \
         .filter(sensor_data_hourly_avg_view.c.hour >= from_date)  \
         .filter(sensor_data_hourly_avg_view.c.hour < to_date)  \
         .order_by(sensor_data_hourly_avg_view.c.hour)
@@ -150,7 +543,7 @@ class CRUDSensorData:
             sensor_data_daily_summary_agg_view.c.average_value.label('average_value'),
             sensor_data_daily_summary_agg_view.c.count.label('count')
         ) \
-        .filter(sensor_data_daily_summary_agg_view.c.sensor_id == sensor_id)  \
+        .filter(sensor_data_daily_summary_agg_view.c.sensor_key == _sensor_key(sensor_id))  \
         .filter(sensor_data_daily_summary_agg_view.c.day >= from_date)  \
         .filter(sensor_data_daily_summary_agg_view.c.day < to_date)  \
         .order_by(sensor_data_daily_summary_agg_view.c.day)
@@ -165,6 +558,82 @@ class CRUDSensorData:
             'count': row.count
         } for row in results]
     
+    def get_points_per_day_by_sensor_ids(
+        self,
+        db: Session,
+        *,
+        sensor_ids: Sequence[str],
+        from_date: datetime
+    ) -> Dict[str, float]:
+        """
+        Durchschnittliche Anzahl Messwerte pro Tag je Sensor seit from_date (aus der täglichen Zusammenfassung).
+        Sensoren ohne Daten im Zeitraum fehlen im Ergebnis.
+        """
+        if not sensor_ids:
+            return {}
+
+        results = db.query(
+            sensor_model.Sensor.sensor_id,
+            func.avg(sensor_data_daily_summary_agg_view.c.count).label('points_per_day')
+        ) \
+        .join(sensor_model.Sensor, sensor_model.Sensor.sensor_key == sensor_data_daily_summary_agg_view.c.sensor_key) \
+        .filter(sensor_model.Sensor.sensor_id.in_(list(sensor_ids))) \
+        .filter(sensor_data_daily_summary_agg_view.c.day >= from_date) \
+        .group_by(sensor_model.Sensor.sensor_id) \
+        .all()
+
+        return {row.sensor_id: float(row.points_per_day) for row in results if row.points_per_day is not None}
+
+    def get_latest_timestamps_by_sensor_ids(self, db: Session, *, sensor_ids: Sequence[str]) -> Dict[str, datetime]:
+        """
+        Neuester gespeicherter Messzeitpunkt je Sensor (ein Index-Lookup pro Sensor per LATERAL).
+        Sensoren ohne Daten fehlen im Ergebnis.
+        """
+        if not sensor_ids:
+            return {}
+        rows = db.execute(
+            text(
+                "SELECT s.sensor_id, d.measurement_timestamp "
+                "FROM sensor s "
+                "CROSS JOIN LATERAL ("
+                " SELECT measurement_timestamp FROM sensor_data"
+                " WHERE sensor_key = s.sensor_key ORDER BY measurement_timestamp DESC LIMIT 1"
+                ") d "
+                "WHERE s.sensor_id = ANY(CAST(:sensor_ids AS VARCHAR[]))"
+            ),
+            {"sensor_ids": list(sensor_ids)}
+        )
+        return {row.sensor_id: row.measurement_timestamp for row in rows}
+
+    def get_plausibility_context(self, db: Session, *, sensor_id: str, lookback: timedelta) -> Optional[Dict[str, Any]]:
+        """
+        Einheit des Sensors und letzter gespeicherter Messwert als Anker für die Plausibilitätsprüfung.
+        run_started_at ist der Beginn der Folge identischer Werte, mit der die Daten enden
+        (nur innerhalb von `lookback` vor dem letzten Messwert gesucht). None, wenn der Sensor fehlt.
+        """
+        row = db.execute(
+            text(
+                "SELECT s.unit, l.measurement_timestamp AS last_timestamp, l.value AS last_value, ("
+                " SELECT min(r.measurement_timestamp) FROM sensor_data r"
+                " WHERE r.sensor_key = s.sensor_key"
+                "  AND r.measurement_timestamp >= l.measurement_timestamp - :lookback"
+                "  AND r.measurement_timestamp > COALESCE(("
+                "   SELECT max(c.measurement_timestamp) FROM sensor_data c"
+                "   WHERE c.sensor_key = s.sensor_key AND c.value <> l.value"
+                "    AND c.measurement_timestamp >= l.measurement_timestamp - :lookback"
+                "  ), '-infinity')"
+                ") AS run_started_at "
+                "FROM sensor s "
+                "LEFT JOIN LATERAL ("
+                " SELECT measurement_timestamp, value FROM sensor_data"
+                " WHERE sensor_key = s.sensor_key ORDER BY measurement_timestamp DESC LIMIT 1"
+                ") l ON TRUE "
+                "WHERE s.sensor_id = :sensor_id"
+            ),
+            {"sensor_id": sensor_id, "lookback": lookback}
+        ).first()
+        return dict(row._mapping) if row is not None else None
+
     def get_statistics_by_sensor_id(
         self,
         db: Session,
@@ -176,15 +645,74 @@ class CRUDSensorData:
         """
         Ruft statistische Kennzahlen (Avg, Min, Max, Count, StdDev) für einen spezifischen Sensor in einem Zeitraum ab.
         Gibt ein einzelnes Dictionary zurück.
+        Ganze, bereits materialisierte Tage kommen aus dem Tages-Rollup, nur die angeschnittenen Tage an den Rändern
+        und der noch nicht materialisierte Rest aus den Rohdaten, vor dem Aufbewahrungshorizont ganze Stunden aus dem
+        Stunden-Rollup. Die Teilergebnisse werden über Anzahl, Summe und Quadratsumme exakt (numeric) zusammengeführt,
+        die Laufzeit hängt damit kaum von der Länge des Zeitraums ab.
         """
+        from_date, to_date = _as_utc(from_date), _as_utc(to_date)
+        retained_from = self._raw_retained_from(db)
+        bounds = self._rollup_bounds(
+            db, view="sensor_data_rollup_1d", interval="1 day", from_date=from_date, to_date=to_date
+        )
+        if bounds is None and (retained_from is None or from_date >= retained_from):
+            return self._get_statistics_from_raw(db, sensor_id=sensor_id, from_date=from_date, to_date=to_date)
+
+        parts, params = [], {"sensor_id": sensor_id}
+        edges = [("head", from_date, to_date)]
+        if bounds is not None:
+            days_from, days_to = bounds
+            parts.append(
+                f"SELECT {_MOMENT_COLUMNS} FROM sensor_data_rollup_1d WHERE sensor_key = {_SENSOR_KEY_SQL} "
+                "AND bucket >= :days_from AND bucket < :days_to"
+            )
+            params.update(days_from=days_from, days_to=days_to)
+            edges = [("head", from_date, days_from), ("tail", days_to, to_date)]
+        for name, edge_from, edge_to in edges:
+            edge_parts, edge_params = _moment_segments(
+                name, from_date=edge_from, to_date=edge_to, retained_from=retained_from, time_bucket=False
+            )
+            parts.extend(edge_parts)
+            params.update(edge_params)
+
+        row = db.execute(
+            text(
+                "WITH parts AS ("
+                + " UNION ALL ".join(f"({part})" for part in parts)
+                + "), totals AS ("
+                " SELECT sum(value_count) AS n, sum(CAST(value_sum AS NUMERIC)) AS s, sum(CAST(value_sumsq AS NUMERIC)) AS q,"
+                " min(value_min) AS mn, max(value_max) AS mx"
+                " FROM parts"
+                ") "
+                "SELECT "
+                " CAST(s / NULLIF(n, 0) AS DOUBLE PRECISION) AS average_value,"
+                " mn AS min_value,"
+                " mx AS max_value,"
+                " CAST(COALESCE(n, 0) AS BIGINT) AS count,"
+                " CASE WHEN n > 1 THEN sqrt(CAST(GREATEST((q - s * s / n) / (n - 1), 0) AS DOUBLE PRECISION)) END AS stddev_value "
+                "FROM totals"
+            ),
+            params
+        ).one()
+        return dict(row._mapping)
+
+    def _get_statistics_from_raw(
+        self,
+        db: Session,
+        *,
+        sensor_id: str,
+        from_date: datetime,
+        to_date: datetime
+    ) -> Optional[Dict[str, Any]]:
+        """ Kennzahlen mit einem Scan der Rohdaten (Zeiträume ohne ganzen materialisierten Tag nach dem Horizont). """
         result = db.query(
             func.avg(sensor_model.SensorData.value).label('average_value'),
             func.min(sensor_model.SensorData.value).label('min_value'),
             func.max(sensor_model.SensorData.value).label('max_value'),
-            func.count(sensor_model.SensorData.id).label('count'),
+            func.count().label('count'),
             func.stddev(sensor_model.SensorData.value).label('stddev_value') 
         ) \
-        .filter(sensor_model.SensorData.sensor_id == sensor_id) \
+        .filter(sensor_model.SensorData.sensor_key == _sensor_key(sensor_id)) \
         .filter(sensor_model.SensorData.measurement_timestamp >= from_date) \
         .filter(sensor_model.SensorData.measurement_timestamp < to_date) \
         .one_or_none() 
@@ -209,14 +737,14 @@ class CRUDSensorData:
         from_date: datetime,
         to_date: datetime,
         interval: str, # Z.B. '1 hour', '1 day', '5 minutes'
-        aggregation_type: str, # Z.B. 'avg', 'min', 'max', 'count', 'sum'
+        aggregation_type: str, # Z.B. 'avg', 'min', 'max', 'count', 'sum', 'stddev'
         smoothing_window: Optional[int] = None, # Optional: Fenstergröße für Glättung auf aggregierten Daten
         interpolation_method: Optional[str] = None # Optional: 'linear', 'locf'
     ) -> List[Dict[str, Any]]:
         """
         Ruft aggregierte Daten mit flexiblem Intervall/Typ ab, wendet optional Glättung und/oder Interpolation an.
         """
-        allowed_aggregation_types = ['avg', 'min', 'max', 'count', 'sum']
+        allowed_aggregation_types = ['avg', 'min', 'max', 'count', 'sum', 'stddev']
         if aggregation_type.lower() not in allowed_aggregation_types:
             raise ValueError(f"Ungültiger Aggregationstyp: {aggregation_type}. Erlaubt: {allowed_aggregation_types}")
 
@@ -235,9 +763,11 @@ class CRUDSensorData:
         elif aggregation_type.lower() == 'max':
             agg_func = func.max(sensor_model.SensorData.value)
         elif aggregation_type.lower() == 'count':
-            agg_func = func.count(sensor_model.SensorData.id)
+            agg_func = func.count()
         elif aggregation_type.lower() == 'sum':
              agg_func = func.sum(sensor_model.SensorData.value)
+        elif aggregation_type.lower() == 'stddev':
+             agg_func = func.stddev(sensor_model.SensorData.value)
 
         if agg_func is None:
              raise ValueError(f"Ungültiger Aggregationstyp nach Validierung: {aggregation_type}")
@@ -249,9 +779,9 @@ class CRUDSensorData:
         aggregated_cte = db.query(
             time_bucket_func(text(f"INTERVAL '{interval}'"), sensor_model.SensorData.measurement_timestamp).label('time_bucket'),
             agg_func.label('aggregated_value_raw'),
-            func.count(sensor_model.SensorData.id).label('count') 
+            func.count().label('count')
         ) \
-        .filter(sensor_model.SensorData.sensor_id == sensor_id) \
+        .filter(sensor_model.SensorData.sensor_key == _sensor_key(sensor_id)) \
         .filter(sensor_model.SensorData.measurement_timestamp >= from_date) \
         .filter(sensor_model.SensorData.measurement_timestamp < to_date) \
         .group_by('time_bucket') \
@@ -264,8 +794,152 @@ class CRUDSensorData:
             )
 
         aggregated_cte = aggregated_cte.cte("aggregated_data")
+        return self._finalize_aggregated_data(db, aggregated_cte, smoothing_window, interpolation_method)
+
+    def get_aggregated_data_from_continuous_aggregates(
+        self,
+        db: Session,
+        *,
+        sensor_id: str,
+        from_date: datetime,
+        to_date: datetime,
+        interval: str,
+        aggregation_type: str,
+        smoothing_window: Optional[int] = None,
+        interpolation_method: Optional[str] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Wie get_aggregated_data_by_sensor_id, aber aus dem gröbsten Rollup, dessen Buckets sich exakt zum
+        Intervall zusammenfassen lassen (Tag, Stunde oder Minute). Nur vollständig im Zeitraum liegende, bereits
+        materialisierte Buckets kommen aus dem Rollup (bis zu dessen Watermark), angeschnittene Randbuckets und
+        der noch nicht materialisierte Rest aus den Rohdaten (UNION ALL, je Bucket über die Rollup-Spalten
+        zusammengefasst). Vor dem Aufbewahrungshorizont der Rohdaten kommen die Ränder aus ganzen Stunden des
+        Stunden-Rollups, Minuten-Intervalle beginnen frühestens am Horizont. Gibt None zurück, wenn kein Rollup passt
+        (Interpolation, unbekannter Aggregationstyp, Intervall unter einer Minute, Zeitraum ohne vollständigen Bucket
+        nach dem Horizont).
+        """
+        from_date, to_date = _as_utc(from_date), _as_utc(to_date)
+        aggregation_type = aggregation_type.lower()
+        if interpolation_method is not None or (smoothing_window is not None and smoothing_window <= 0):
+            return None
+        if aggregation_type not in _ROLLUP_AGGREGATES:
+            return None
+
+        route = self._route_continuous_aggregate(db, interval=interval)
+        if route is None:
+            return None
+
+        retained_from = self._raw_retained_from(db)
+        if route.unit == "minute" and retained_from is not None and from_date < retained_from:
+            # Das Minuten-Rollup wird zusammen mit den Rohdaten gelöscht
+            from_date = retained_from
+            if from_date >= to_date:
+                return []
+        below_horizon = retained_from is not None and from_date < retained_from
+
+        bounds = self._rollup_bounds(db, view=route.view, interval=interval, from_date=from_date, to_date=to_date)
+        if bounds is None and not below_horizon:
+            return None
+
+        segments, params = [], {"sensor_id": sensor_id, "interval": interval}
+        edges = [("head", from_date, to_date)]
+        if bounds is not None:
+            cagg_from, cagg_to = bounds
+            segments.append(
+                f"SELECT time_bucket(CAST(:interval AS INTERVAL), bucket) AS time_bucket, {_MOMENT_COLUMNS} "
+                f"FROM {route.view} WHERE sensor_key = {_SENSOR_KEY_SQL} "
+                "AND bucket >= :cagg_from AND bucket < :cagg_to"
+            )
+            params.update(cagg_from=cagg_from, cagg_to=cagg_to)
+            edges = [("head", from_date, cagg_from), ("tail", cagg_to, to_date)]
+        # Getrennte Bereichsabfragen für Kopf und Rest, damit beide nur ihre eigenen Chunks lesen
+        for name, edge_from, edge_to in edges:
+            edge_segments, edge_params = _moment_segments(
+                name, from_date=edge_from, to_date=edge_to, retained_from=retained_from, time_bucket=True
+            )
+            segments.extend(edge_segments)
+            params.update(edge_params)
+
+        aggregated_sql = (
+            "SELECT time_bucket, "
+            f"{_ROLLUP_AGGREGATES[aggregation_type]} AS aggregated_value_raw, CAST(sum(value_count) AS BIGINT) AS count "
+            "FROM (" + " UNION ALL ".join(f"({segment})" for segment in segments) + ") AS segments "
+            "GROUP BY time_bucket"
+        )
+        aggregated_cte = text(aggregated_sql) \
+            .bindparams(**params) \
+            .columns(column('time_bucket'), column('aggregated_value_raw'), column('count')) \
+            .cte("aggregated_data")
+        return self._finalize_aggregated_data(db, aggregated_cte, smoothing_window, None)
+
+    def _raw_retained_from(self, db: Session) -> Optional[datetime]:
+        """ Aufbewahrungshorizont der Rohdaten: ab hier liegen sie vollständig vor, None ohne Löschung. """
+        return db.execute(text(f"SELECT {_RAW_RETAINED_FROM_SQL}")).scalar()
 
-        # Schritt 2: Optionale Interpolation und/oder Glättung auf den aggregierten Daten
+    def _rollup_bounds(
+        self,
+        db: Session,
+        *,
+        view: str,
+        interval: str,
+        from_date: datetime,
+        to_date: datetime
+    ) -> Optional[Tuple[datetime, datetime]]:
+        """
+        [cagg_from, cagg_to): Bereich der Buckets des Intervalls, die vollständig in [from_date, to_date) liegen
+        und im Rollup bereits materialisiert sind (Watermark). None, wenn kein solcher Bucket existiert.
+        """
+        bounds = db.execute(
+            text(
+                "WITH w AS ("
+                " SELECT _timescaledb_functions.to_timestamp(_timescaledb_functions.cagg_watermark(mat_hypertable_id)) AS watermark"
+                " FROM _timescaledb_catalog.continuous_agg WHERE user_view_name = :view"
+                ") "
+                "SELECT "
+                " CASE WHEN time_bucket(CAST(:interval AS INTERVAL), CAST(:from_date AS TIMESTAMPTZ)) = :from_date"
+                "  THEN CAST(:from_date AS TIMESTAMPTZ)"
+                "  ELSE time_bucket(CAST(:interval AS INTERVAL), CAST(:from_date AS TIMESTAMPTZ)) + CAST(:interval AS INTERVAL)"
+                " END AS cagg_from,"
+                " CASE WHEN w.watermark > :from_date"
+                "  THEN time_bucket(CAST(:interval AS INTERVAL), LEAST(CAST(:to_date AS TIMESTAMPTZ), w.watermark))"
+                " END AS cagg_to "
+                "FROM w"
+            ),
+            {"view": view, "interval": interval, "from_date": from_date, "to_date": to_date}
+        ).first()
+        if bounds is None or bounds.cagg_to is None or bounds.cagg_to <= bounds.cagg_from:
+            return None
+        return bounds.cagg_from, bounds.cagg_to
+
+    def _route_continuous_aggregate(self, db: Session, *, interval: str) -> Optional[_ContinuousAggregateRoute]:
+        """
+        Gröbstes Rollup, dessen Bucket-Einheit das Intervall ohne Rest teilt. Das Intervall wertet PostgreSQL aus
+        (z.B. '1h', '60 minutes' und '1 hour'), date_trunc auf dem Intervall entfernt die Anteile unter der Einheit.
+        """
+        fits_columns = ", ".join(
+            f"date_trunc('{route.unit}', CAST(:interval AS INTERVAL)) = CAST(:interval AS INTERVAL) "
+            f"AND CAST(:interval AS INTERVAL) >= INTERVAL '1 {route.unit}' AS fits_{route.unit}"
+            for route in _CONTINUOUS_AGGREGATE_ROUTES
+        )
+        try:
+            row = db.execute(text(f"SELECT {fits_columns}"), {"interval": interval}).one()
+        except DataError:
+            db.rollback()
+            raise ValueError(f"Ungültiges Intervall: {interval}")
+
+        for route in _CONTINUOUS_AGGREGATE_ROUTES:
+            if row._mapping[f"fits_{route.unit}"]:
+                return route
+        return None
+
+    def _finalize_aggregated_data(
+        self,
+        db: Session,
+        aggregated_cte: Any,
+        smoothing_window: Optional[int],
+        interpolation_method: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        """ Schritt 2 der Aggregation: optionale Interpolation und/oder Glättung auf der CTE aggregated_data. """
         query = db.query(
              aggregated_cte.c.time_bucket.label('time_bucket'),
              aggregated_cte.c.count.label('count') # Behalte die Anzahl
@@ -292,13 +966,362 @@ class CRUDSensorData:
         query = query.add_columns(final_value.label('aggregated_value'))
 
         # Führe die Query auf der CTE aus
-        results = query.select_from(aggregated_cte).all()
+        results = query.select_from(aggregated_cte).order_by(aggregated_cte.c.time_bucket).all()
 
         return [row._asdict() for row in results]
 
 
+class CRUDSensorIngestionWatermark:
+    def get_by_sensor_ids(self, db: Session, *, sensor_ids: Sequence[str]) -> Dict[str, Optional[datetime]]:
+        """
+        Liefert das Watermark (lückenlos abgerufen bis) je Sensor. Sensoren ohne Eintrag fehlen im Ergebnis.
+        """
+        if not sensor_ids:
+            return {}
+        results = db.query(sensor_model.SensorIngestionWatermark) \
+            .filter(sensor_model.SensorIngestionWatermark.sensor_id.in_(list(sensor_ids))) \
+            .all()
+        return {row.sensor_id: row.fetched_through for row in results}
+
+    def get_by_box_ids(self, db: Session, *, box_ids: Sequence[str]) -> Dict[str, Dict[str, Optional[datetime]]]:
+        """
+        Liefert die Watermarks aller Sensoren je Box (box_id -> sensor_id -> fetched_through) in einer Abfrage.
+        """
+        if not box_ids:
+            return {}
+        results = db.query(sensor_model.Sensor.box_id, sensor_model.SensorIngestionWatermark.sensor_id, sensor_model.SensorIngestionWatermark.fetched_through) \
+            .join(sensor_model.Sensor, sensor_model.Sensor.sensor_id == sensor_model.SensorIngestionWatermark.sensor_id) \
+            .filter(sensor_model.Sensor.box_id.in_(list(box_ids))) \
+            .all()
+        watermarks: Dict[str, Dict[str, Optional[datetime]]] = {}
+        for row in results:
+            watermarks.setdefault(row.box_id, {})[row.sensor_id] = row.fetched_through
+        return watermarks
+
+    def ensure(self, db: Session, *, sensor_ids: Sequence[str], fetched_through: Optional[datetime]) -> None:
+        """
+        Legt fehlende Watermarks mit dem Startwert fetched_through in einem Statement an, bestehende bleiben unverändert.
+        """
+        if not sensor_ids:
+            return
+        db.execute(
+            text(
+                "INSERT INTO sensor_ingestion_watermark (sensor_id, fetched_through, updated_at) "
+                "SELECT sensor_id, CAST(:fetched_through AS TIMESTAMPTZ), now() "
+                "FROM unnest(CAST(:sensor_ids AS TEXT[])) AS sensor_id "
+                "ON CONFLICT (sensor_id) DO NOTHING"
+            ),
+            {"sensor_ids": list(sensor_ids), "fetched_through": fetched_through}
+        )
+
+    def ensure_for_box_ids(self, db: Session, *, box_ids: Sequence[str]) -> int:
+        """
+        Legt für alle Sensoren der Boxen fehlende Watermarks in einem Statement an. Startwert ist
+        last_data_fetched der jeweiligen Box, bestehende Watermarks bleiben unverändert.
+        """
+        if not box_ids:
+            return 0
+        result = db.execute(
+            text(
+                "INSERT INTO sensor_ingestion_watermark (sensor_id, fetched_through, updated_at) "
+                "SELECT s.sensor_id, b.last_data_fetched, now() "
+                "FROM sensor s JOIN sensor_box b ON b.box_id = s.box_id "
+                "WHERE s.box_id = ANY(:box_ids) "
+                "ON CONFLICT (sensor_id) DO NOTHING"
+            ),
+            {"box_ids": list(box_ids)}
+        )
+        return result.rowcount
+
+    def advance(self, db: Session, *, sensor_id: str, from_date: datetime, to_date: datetime) -> bool:
+        """
+        Schiebt das Watermark nach einem erfolgreich gespeicherten Chunk [from_date, to_date) auf to_date,
+        aber nur wenn der Chunk lückenlos anschließt (Watermark >= from_date). Ohne Watermark (NULL) wird nicht
+        fortgeschrieben, der Startwert kommt aus start_at. Kein Commit, damit das Update in derselben
+        Transaktion wie der Daten-Write des Sensors läuft. Gibt zurück, ob fortgeschrieben wurde.
+        """
+        result = db.execute(
+            text(
+                "UPDATE sensor_ingestion_watermark "
+                "SET fetched_through = :to_date, updated_at = now() "
+                "WHERE sensor_id = :sensor_id "
+                "AND fetched_through >= :from_date AND fetched_through < :to_date"
+            ),
+            {"sensor_id": sensor_id, "from_date": from_date, "to_date": to_date}
+        )
+        return result.rowcount == 1
+
+    def start_at(self, db: Session, *, from_dates: Dict[str, datetime]) -> int:
+        """
+        Setzt Watermarks ohne Wert (neue Box ohne last_data_fetched) auf den Beginn des geplanten
+        Abruf-Fensters, damit der erste Chunk lückenlos anschließt. Bestehende Werte bleiben unverändert.
+        Ein Statement für alle Sensoren.
+        """
+        if not from_dates:
+            return 0
+        result = db.execute(
+            text(
+                "UPDATE sensor_ingestion_watermark w "
+                "SET fetched_through = f.from_date, updated_at = now() "
+                "FROM unnest(CAST(:sensor_ids AS TEXT[]), CAST(:from_dates AS TIMESTAMPTZ[])) AS f(sensor_id, from_date) "
+                "WHERE w.sensor_id = f.sensor_id AND w.fetched_through IS NULL"
+            ),
+            {"sensor_ids": list(from_dates), "from_dates": list(from_dates.values())}
+        )
+        return result.rowcount
+
+    def raise_to(self, db: Session, *, sensor_id: str, fetched_through: datetime) -> bool:
+        """
+        Setzt das Watermark auf fetched_through, falls es dadurch nicht zurückgesetzt wird
+        (z.B. nach einem Backfill, dessen Partitionen nicht in Reihenfolge abgeschlossen wurden).
+        """
+        result = db.execute(
+            text(
+                "UPDATE sensor_ingestion_watermark "
+                "SET fetched_through = :fetched_through, updated_at = now() "
+                "WHERE sensor_id = :sensor_id "
+                "AND (fetched_through IS NULL OR fetched_through < :fetched_through)"
+            ),
+            {"sensor_id": sensor_id, "fetched_through": fetched_through}
+        )
+        return result.rowcount == 1
+
+
+class CRUDIngestionBackfillPartition:
+    def get_open_by_box_id(self, db: Session, *, box_id: str) -> List[sensor_model.IngestionBackfillPartition]:
+        """
+        Liefert alle nicht abgeschlossenen Partitionen (pending, running, failed) einer Box, älteste zuerst.
+        """
+        return db.query(sensor_model.IngestionBackfillPartition) \
+            .filter(
+                sensor_model.IngestionBackfillPartition.box_id == box_id,
+                sensor_model.IngestionBackfillPartition.status != "done"
+            ) \
+            .order_by(sensor_model.IngestionBackfillPartition.partition_from) \
+            .all()
+
+    def create_multi(self, db: Session, *, box_id: str, partitions: Iterable[Tuple[str, datetime, datetime]]) -> int:
+        """
+        Legt Partitionen (sensor_id, von, bis) als pending an. Bereits vorhandene Partitionen werden
+        zurückgesetzt, falls sie nicht abgeschlossen sind (ein Statement über alle Partitionen).
+        Gibt die Anzahl angelegter/zurückgesetzter Partitionen zurück.
+        """
+        partitions = list(partitions)
+        if not partitions:
+            return 0
+        sensor_ids, partition_froms, partition_tos = (list(column) for column in zip(*partitions))
+        result = db.execute(
+            text(
+                "INSERT INTO ingestion_backfill_partition (sensor_id, partition_from, partition_to, box_id, status, updated_at) "
+                "SELECT p.sensor_id, p.partition_from, p.partition_to, :box_id, 'pending', now() "
+                "FROM unnest(CAST(:sensor_ids AS TEXT[]), CAST(:partition_froms AS TIMESTAMPTZ[]), CAST(:partition_tos AS TIMESTAMPTZ[])) "
+                "AS p(sensor_id, partition_from, partition_to) "
+                "ON CONFLICT (sensor_id, partition_from, partition_to) DO UPDATE "
+                "SET status = 'pending', error = NULL, updated_at = now() "
+                "WHERE ingestion_backfill_partition.status <> 'done'"
+            ),
+            {"sensor_ids": sensor_ids, "partition_froms": partition_froms, "partition_tos": partition_tos, "box_id": box_id}
+        )
+        return result.rowcount
+
+    def set_status(
+        self,
+        db: Session,
+        *,
+        sensor_id: str,
+        partition_from: datetime,
+        partition_to: datetime,
+        status: str,
+        points_inserted: int = 0,
+        error: Optional[str] = None
+    ) -> None:
+        """
+        Setzt den Status einer Partition. Beim Wechsel auf running wird attempts hochgezählt.
+        """
+        db.execute(
+            text(
+                "UPDATE ingestion_backfill_partition "
+                "SET status = :status, "
+                "    attempts = attempts + CASE WHEN :status = 'running' THEN 1 ELSE 0 END, "
+                "    points_inserted = points_inserted + :points_inserted, "
+                "    error = :error, updated_at = now() "
+                "WHERE sensor_id = :sensor_id AND partition_from = :partition_from AND partition_to = :partition_to"
+            ),
+            {
+                "sensor_id": sensor_id, "partition_from": partition_from, "partition_to": partition_to,
+                "status": status, "points_inserted": points_inserted, "error": error
+            }
+        )
+
+    def get_contiguous_done_by_sensor_ids(
+        self, db: Session, *, sensor_ids: Sequence[str], from_dates: Dict[str, datetime]
+    ) -> Dict[str, datetime]:
+        """
+        Liefert je Sensor das Ende der lückenlosen Folge abgeschlossener Partitionen ab from_dates[sensor_id]
+        (Partitionen werden parallel und damit in beliebiger Reihenfolge abgeschlossen).
+        Sensoren ohne abgeschlossene erste Partition fehlen im Ergebnis.
+        """
+        if not sensor_ids:
+            return {}
+        rows = db.query(
+                sensor_model.IngestionBackfillPartition.sensor_id,
+                sensor_model.IngestionBackfillPartition.partition_from,
+                sensor_model.IngestionBackfillPartition.partition_to
+            ) \
+            .filter(
+                sensor_model.IngestionBackfillPartition.sensor_id.in_(list(sensor_ids)),
+                sensor_model.IngestionBackfillPartition.status == "done"
+            ) \
+            .order_by(sensor_model.IngestionBackfillPartition.sensor_id, sensor_model.IngestionBackfillPartition.partition_from) \
+            .all()
+
+        contiguous: Dict[str, datetime] = {}
+        for sensor_id, partitions in itertools.groupby(rows, key=lambda row: row.sensor_id):
+            if sensor_id not in from_dates:
+                continue
+            through = _contiguous_through(
+                from_dates[sensor_id], [(row.partition_from, row.partition_to) for row in partitions]
+            )
+            if through != from_dates[sensor_id]:
+                contiguous[sensor_id] = through
+        return contiguous
+
+
+class CRUDSensorDataRejected:
+    BATCH_ROWS = 5000 # Zeilen pro INSERT (Parameterlimit von PostgreSQL)
+
+    def create_multi_columnar(
+        self,
+        db: Session,
+        *,
+        sensor_id: str,
+        measurement_timestamps: Sequence[Any],
+        values: Sequence[float],
+        reasons: Sequence[str]
+    ) -> int:
+        """
+        Schreibt verworfene Messwerte eines Sensors nach sensor_data_rejected. Bereits vorhandene
+        (sensor_id, measurement_timestamp) werden übersprungen (Retries). Kein Commit.
+        """
+        timestamps = _to_utc_iso_strings(measurement_timestamps)
+        rows = [
+            {"sensor_id": sensor_id, "measurement_timestamp": str(ts), "value": float(value), "reason": reason}
+            for ts, value, reason in zip(timestamps, values, reasons)
+        ]
+        table = sensor_model.SensorDataRejected.__table__
+        inserted = 0
+        for start in range(0, len(rows), self.BATCH_ROWS):
+            stmt = pg_insert(table).values(rows[start:start + self.BATCH_ROWS]).on_conflict_do_nothing(
+                index_elements=[table.c.sensor_id, table.c.measurement_timestamp]
+            )
+            inserted += db.execute(stmt).rowcount
+        return inserted
+
+
+class CRUDSensorDataRetention:
+    def get_retained_from(self, db: Session, *, hypertable_name: str = "sensor_data") -> Optional[datetime]:
+        row = db.query(sensor_model.SensorDataRetention) \
+            .filter(sensor_model.SensorDataRetention.hypertable_name == hypertable_name) \
+            .first()
+        return row.retained_from if row is not None else None
+
+    def raise_to(self, db: Session, *, retained_from: datetime, hypertable_name: str = "sensor_data") -> bool:
+        """
+        Setzt den Aufbewahrungshorizont auf retained_from, falls er dadurch nicht zurückgesetzt wird.
+        Kein Commit. Gibt zurück, ob der Horizont verschoben wurde.
+        """
+        result = db.execute(
+            text(
+                "INSERT INTO sensor_data_retention (hypertable_name, retained_from) VALUES (:hypertable_name, :retained_from) "
+                "ON CONFLICT (hypertable_name) DO UPDATE SET retained_from = EXCLUDED.retained_from, updated_at = now() "
+                "WHERE sensor_data_retention.retained_from < EXCLUDED.retained_from"
+            ),
+            {"hypertable_name": hypertable_name, "retained_from": retained_from}
+        )
+        return result.rowcount == 1
+
+
+class CRUDContinuousAggregate:
+    def policy_refresh_horizon(self, db: Session) -> Optional[datetime]:
+        """
+        Ältester Zeitpunkt, den die Refresh-Policies bei ihrem nächsten Lauf noch neu berechnen
+        (now() minus kleinstes start_offset, beim Minuten-Rollup 2 Tage). None ohne Policies.
+        """
+        view_names = [view_name for view_name, _ in CONTINUOUS_AGGREGATES]
+        offsets = [
+            row.start_offset for row in db.execute(text(REFRESH_POLICY_OFFSETS_SQL), {"view_names": view_names})
+            if row.start_offset is not None
+        ]
+        if not offsets:
+            return None
+        return datetime.now(timezone.utc) - min(offsets)
+
+    def refresh(self, engine, *, window_start: datetime, window_end: datetime, retained_from: Optional[datetime]) -> List[str]:
+        """
+        Materialisiert alle Continuous Aggregates für [window_start, window_end), je Aggregat um eine Bucket-Größe
+        erweitert, da TimescaleDB nur vollständig enthaltene Buckets aktualisiert. Läuft auf einer eigenen
+        Autocommit-Verbindung (refresh_continuous_aggregate ist in einer Transaktion nicht erlaubt) und beginnt nie
+        vor dem Aufbewahrungshorizont retained_from: ein Refresh über gelöschte Chunks würde die dort nur noch in den
+        Aggregaten liegenden Werte entfernen. Gibt die aktualisierten Views zurück.
+        """
+        refreshed = []
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            for view_name, bucket in CONTINUOUS_AGGREGATES:
+                refresh_start = window_start - bucket
+                if retained_from is not None and refresh_start < retained_from:
+                    refresh_start = retained_from
+                if refresh_start >= window_end + bucket:
+                    continue
+                connection.execute(
+                    text(f"CALL refresh_continuous_aggregate('{view_name}', :window_start, :window_end)"),
+                    {"window_start": refresh_start, "window_end": window_end + bucket}
+                )
+                refreshed.append(view_name)
+        return refreshed
+
+    def refresh_late_writes(self, db: Session, engine, *, earliest_written: datetime) -> Optional[datetime]:
+        """
+        Materialisiert nachträglich geschriebene Messwerte, die vor dem Fenster der Refresh-Policies liegen
+        (Erstabruf einer neuen Box, Nachholen nach einem Ausfall, zurückdatierte Push-Uploads). Ohne diesen Refresh
+        blieben die Buckets dauerhaft ohne diese Werte, obwohl sie unterhalb des Watermarks der Aggregate als
+        vollständig gelten. Gibt das Ende des aktualisierten Fensters zurück, None wenn kein Refresh nötig war.
+        """
+        horizon = self.policy_refresh_horizon(db)
+        if horizon is None or earliest_written >= horizon:
+            return None
+        retained_from = db.execute(text(f"SELECT {_RAW_RETAINED_FROM_SQL}")).scalar()
+        self.refresh(engine, window_start=earliest_written, window_end=horizon, retained_from=retained_from)
+        return horizon
+
+
+class CRUDIngestionMetrics:
+    COLUMNS = ("time", "metric", "value", "sensor_id", "box_id", "flow_run_id", "labels")
+
+    def create_multi(self, db: Session, *, rows: Sequence[Dict[str, Any]]) -> int:
+        """
+        Schreibt Metrik-Beobachtungen (Dicts mit den Spalten aus COLUMNS, labels als JSON-String) in einem
+        executemany nach ingestion_metrics. Kein Commit.
+        """
+        if not rows:
+            return 0
+        db.execute(
+            text(
+                "INSERT INTO ingestion_metrics (time, metric, value, sensor_id, box_id, flow_run_id, labels) "
+                "VALUES (:time, :metric, :value, :sensor_id, :box_id, :flow_run_id, CAST(:labels AS JSONB))"
+            ),
+            list(rows)
+        )
+        return len(rows)
+
+
 # exports 
 # FIXME: refactor this maybe?
 sensor_box = CRUDSensorBox()
 sensor = CRUDSensor()
-sensor_data = CRUDSensorData()
\ No newline at end of file
+sensor_data = CRUDSensorData()
+sensor_ingestion_watermark = CRUDSensorIngestionWatermark()
+ingestion_backfill_partition = CRUDIngestionBackfillPartition()
+ingestion_metrics = CRUDIngestionMetrics()
+sensor_data_rejected = CRUDSensorDataRejected()
+sensor_data_retention = CRUDSensorDataRetention()
+continuous_aggregate = CRUDContinuousAggregate()
\ No newline at end of file
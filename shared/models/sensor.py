@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, PrimaryKeyConstraint, Table, MetaData
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, Identity, Index, Table, MetaData
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from datetime import datetime, timezone
 
@@ -17,6 +17,9 @@ class SensorBox(Base):
     last_data_fetched: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     createdAt: Mapped[datetime] = mapped_column(DateTime(timezone=True))
     updatedAt: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    metadata_hash: Mapped[str | None] = mapped_column(String(64)) # sha256 der Metadaten ohne lastMeasurementAt (Sync-Fast-Path)
+    metadata_etag: Mapped[str | None] = mapped_column(String(255)) # ETag der letzten Metadaten-Antwort
+    metadata_last_modified: Mapped[str | None] = mapped_column(String(64)) # Last-Modified der letzten Metadaten-Antwort
 
     # Beziehung zu Sensor (eine Box hat mehrere Sensoren)
     sensors: Mapped[list["Sensor"]] = relationship("Sensor", back_populates="box")
@@ -26,6 +29,7 @@ class Sensor(Base):
     __tablename__ = "sensor"
 
     sensor_id: Mapped[str] = mapped_column(String(50), primary_key=True) # ID des Sensors aus der API
+    sensor_key: Mapped[int] = mapped_column(Integer, Identity(), unique=True) # Kompakter Schlüssel für sensor_data
     box_id: Mapped[str] = mapped_column(ForeignKey("sensor_box.box_id")) # ID der Sensorbox aus der API
     title: Mapped[str | None] = mapped_column(String(100)) # Der Titel des Sensors
     sensor_type: Mapped[str] = mapped_column(String(50)) # Der technische Typ des Sensors
@@ -42,24 +46,73 @@ class Sensor(Base):
 class SensorData(Base):
     __tablename__ = "sensor_data"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True) # Behalten wir als internen Zähler für die Messdaten
-    sensor_id: Mapped[str] = mapped_column(ForeignKey("sensor.sensor_id")) # ID des Sensors aus der API
+    # Schmales Layout ohne Surrogat-ID: (sensor_key, measurement_timestamp) ist der Schlüssel
+    # (init_scripts/migration_008_sensor_data_narrow_layout.sql)
+    sensor_key: Mapped[int] = mapped_column(ForeignKey("sensor.sensor_key"), primary_key=True) # sensor.sensor_key statt der OpenSenseMap-ID
+    measurement_timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True) # Zeitpunkt der Messung vom Sensor
     value: Mapped[float] = mapped_column(Float)
-    measurement_timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True, index=True) # Zeitpunkt der Messung vom Sensor
 
     # Beziehung zurück zu Sensor
     sensor: Mapped["Sensor"] = relationship("Sensor", back_populates="data")
 
     __table_args__ = (
-        PrimaryKeyConstraint('id', 'measurement_timestamp', 'sensor_id'),
+        # Einziger Index der Tabelle, in der DB mit measurement_timestamp DESC (Ziel für ON CONFLICT)
+        Index('uq_sensor_data_sensor_key_ts', 'sensor_key', 'measurement_timestamp', unique=True),
     )
 
 
+class SensorIngestionWatermark(Base):
+    __tablename__ = "sensor_ingestion_watermark"
+
+    sensor_id: Mapped[str] = mapped_column(ForeignKey("sensor.sensor_id"), primary_key=True) # ID des Sensors aus der API
+    fetched_through: Mapped[datetime | None] = mapped_column(DateTime(timezone=True)) # Lückenlos abgerufen bis (exklusive)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+
+class IngestionBackfillPartition(Base):
+    __tablename__ = "ingestion_backfill_partition"
+
+    sensor_id: Mapped[str] = mapped_column(ForeignKey("sensor.sensor_id"), primary_key=True) # ID des Sensors aus der API
+    partition_from: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    partition_to: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    box_id: Mapped[str] = mapped_column(ForeignKey("sensor_box.box_id"))
+    status: Mapped[str] = mapped_column(String(16), default="pending") # pending, running, done, failed
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    points_inserted: Mapped[int] = mapped_column(Integer, default=0)
+    error: Mapped[str | None] = mapped_column(String)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        Index('ix_ingestion_backfill_partition_box_status', 'box_id', 'status'),
+    )
+
+
+class SensorDataRejected(Base):
+    __tablename__ = "sensor_data_rejected"
+
+    sensor_id: Mapped[str] = mapped_column(ForeignKey("sensor.sensor_id"), primary_key=True) # ID des Sensors aus der API
+    measurement_timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True) # Zeitpunkt der Messung vom Sensor
+    value: Mapped[float] = mapped_column(Float)
+    reason: Mapped[str] = mapped_column(String(16)) # range, spike, stuck (utils/plausibility.py)
+    rejected_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        Index('ix_sensor_data_rejected_reason_ts', 'reason', 'measurement_timestamp'),
+    )
+
+
+class SensorDataRetention(Base):
+    __tablename__ = "sensor_data_retention"
+
+    hypertable_name: Mapped[str] = mapped_column(String(63), primary_key=True) # sensor_data
+    retained_from: Mapped[datetime] = mapped_column(DateTime(timezone=True)) # Rohdaten liegen ab hier vollständig vor, davor nur Rollups
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
 sensor_data_hourly_avg_view = Table(
     "sensor_data_hourly_avg", # Der Name der Materialized View in der Datenbank
     Base.metadata, # Oder verwende eine separate MetaData() Instanz, falls bevorzugt
     Column("hour", DateTime(timezone=True)), # Der Zeitstempel-Spaltenname in der View
-    Column("sensor_id", String(50)),      # Der sensor_id Spaltenname in der View
+    Column("sensor_key", Integer),       # sensor.sensor_key, nicht die OpenSenseMap-ID
     Column("average_value", Float),      # Der aggregierte Wert Spaltenname in der View
 )
 
@@ -68,7 +121,7 @@ sensor_data_daily_avg_view = Table(
     "sensor_data_daily_avg",
     Base.metadata,
     Column("day", DateTime(timezone=True)),
-    Column("sensor_id", String(50)),
+    Column("sensor_key", Integer),
     Column("average_value", Float),
 )
 
@@ -77,7 +130,7 @@ sensor_data_weekly_avg_view = Table(
     "sensor_data_weekly_avg",
     Base.metadata,
     Column("week", DateTime(timezone=True)),
-    Column("sensor_id", String(50)),
+    Column("sensor_key", Integer),
     Column("average_value", Float),
 )
 
@@ -86,7 +139,7 @@ sensor_data_monthly_avg_view = Table(
     "sensor_data_monthly_avg",
     Base.metadata,
     Column("month", DateTime(timezone=True)),
-    Column("sensor_id", String(50)),
+    Column("sensor_key", Integer),
     Column("average_value", Float),
 )
 
@@ -95,7 +148,7 @@ sensor_data_yearly_avg_view = Table(
     "sensor_data_yearly_avg",
     Base.metadata,
     Column("year", DateTime(timezone=True)),
-    Column("sensor_id", String(50)),
+    Column("sensor_key", Integer),
     Column("average_value", Float),
 )
 
@@ -104,9 +157,49 @@ sensor_data_daily_summary_agg_view = Table(
     "sensor_data_daily_summary_agg",
     Base.metadata,
     Column("day", DateTime(timezone=True)),
-    Column("sensor_id", String(50)),
+    Column("sensor_key", Integer),
     Column("min_value", Float),
     Column("max_value", Float),
     Column("average_value", Float),
     Column("count", Integer), 
 )
+
+
+# Hierarchische Rollups (1 Minute -> 1 Stunde -> 1 Tag), zusammenfassbar über Anzahl, Summe und Quadratsumme
+sensor_data_rollup_1m_view = Table(
+    "sensor_data_rollup_1m",
+    Base.metadata,
+    Column("bucket", DateTime(timezone=True)),
+    Column("sensor_key", Integer),
+    Column("value_count", Integer),
+    Column("value_sum", Float),
+    Column("value_sumsq", Float),
+    Column("value_min", Float),
+    Column("value_max", Float),
+)
+
+# Stunden-Rollup
+sensor_data_rollup_1h_view = Table(
+    "sensor_data_rollup_1h",
+    Base.metadata,
+    Column("bucket", DateTime(timezone=True)),
+    Column("sensor_key", Integer),
+    Column("value_count", Integer),
+    Column("value_sum", Float),
+    Column("value_sumsq", Float),
+    Column("value_min", Float),
+    Column("value_max", Float),
+)
+
+# Tages-Rollup
+sensor_data_rollup_1d_view = Table(
+    "sensor_data_rollup_1d",
+    Base.metadata,
+    Column("bucket", DateTime(timezone=True)),
+    Column("sensor_key", Integer),
+    Column("value_count", Integer),
+    Column("value_sum", Float),
+    Column("value_sumsq", Float),
+    Column("value_min", Float),
+    Column("value_max", Float),
+)
@@ -0,0 +1,177 @@
+# shared/plausibility.py
+#
+# Plausibilitätsregeln je Messgröße und vektorisierte Klassifikation eines Batches. Gemeinsam genutzt vom
+# Abruf der OpenSenseMap (ml_service/utils/plausibility.py) und der Push-Ingestion des Backends.
+
+import unicodedata
+from datetime import datetime, timedelta
+from typing import Any, Dict, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+REASON_RANGE = "range"  # Außerhalb des Messbereichs der Messgröße (z.B. -999 °C)
+REASON_SPIKE = "spike"  # Einzelwert, der zu beiden Nachbarn schneller als max_rate_per_minute springt
+REASON_STUCK = "stuck"  # Wert seit mindestens stuck_minutes unverändert
+
+
+class PlausibilityRule(NamedTuple):
+    """ Grenzen einer Messgröße. None deaktiviert die jeweilige Prüfung. """
+    min_value: float | None
+    max_value: float | None
+    max_rate_per_minute: float | None  # Betrag der Änderung pro Minute
+    stuck_minutes: float | None
+
+
+# Schlüssel ist die Einheit: sensor_type ist bei der OpenSenseMap das Bauteil (z.B. "HDC1080" misst
+# Temperatur und Luftfeuchte), die Messgröße ergibt sich erst aus der Einheit.
+PLAUSIBILITY_RULES: Dict[str, PlausibilityRule] = {
+    "°C": PlausibilityRule(-50.0, 60.0, 5.0, 360.0),
+    "%": PlausibilityRule(0.0, 100.0, 20.0, None),        # 100 % bei Nebel über Stunden möglich
+    "hPa": PlausibilityRule(300.0, 1100.0, 2.0, 360.0),   # Stationsdruck, auch für Boxen im Gebirge
+    "Pa": PlausibilityRule(30000.0, 110000.0, 200.0, 360.0),
+    "µg/m³": PlausibilityRule(0.0, 2000.0, None, None),   # Feinstaubspitzen (Feuerwerk, Heizung) sind real
+    "lx": PlausibilityRule(0.0, 200000.0, None, None),    # Nachts stundenlang 0
+    "µW/cm²": PlausibilityRule(0.0, 2000.0, None, None),
+    "dB (A)": PlausibilityRule(0.0, 160.0, None, None),
+}
+
+# Suchfenster für den Beginn einer hängenden Folge im gespeicherten Bestand
+STUCK_LOOKBACK = timedelta(minutes=max(r.stuck_minutes or 0.0 for r in PLAUSIBILITY_RULES.values()))
+
+# Größter Abstand zwischen Anker und erstem Messwert eines Batches, bei dem der Batch als direkt anschließend gilt.
+# Bei größeren Abständen liegen dazwischen nicht abgerufene Daten (Batches kommen innerhalb eines Chunks
+# neueste zuerst, Chunks können fehlschlagen), Sprünge und Folgen dürfen dann nicht verkettet werden.
+MAX_ANCHOR_GAP = timedelta(minutes=30)
+
+
+def _normalize_unit(unit: str) -> str:
+    # NFKC vereinheitlicht Mikro-Zeichen (U+00B5 / U+03BC) und Leerzeichenvarianten
+    return unicodedata.normalize("NFKC", unit).strip()
+
+
+_RULES_BY_UNIT = {_normalize_unit(unit): rule for unit, rule in PLAUSIBILITY_RULES.items()}
+
+
+def rule_for_unit(unit: str | None) -> PlausibilityRule | None:
+    """ Regel zur Einheit eines Sensors oder None (unbekannte Messgröße wird nicht geprüft). """
+    if not unit:
+        return None
+    return _RULES_BY_UNIT.get(_normalize_unit(unit))
+
+
+class PlausibilityAnchor(NamedTuple):
+    """ Letzter plausibler Messwert vor dem Batch (aus der DB oder dem vorherigen Batch). """
+    timestamp: np.datetime64       # datetime64[ns], UTC
+    value: float
+    run_started_at: np.datetime64  # Beginn der Folge identischer Werte, die mit `value` endet
+
+
+class RejectedMeasurements(NamedTuple):
+    """ Verworfene Messwerte eines Batches samt Grund. """
+    timestamps: np.ndarray  # datetime64[ns], UTC
+    values: np.ndarray      # float64
+    reasons: np.ndarray     # object (str)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+def classify_measurements(
+    timestamps: np.ndarray,
+    values: np.ndarray,
+    rule: PlausibilityRule,
+    anchor: PlausibilityAnchor | None = None
+) -> np.ndarray:
+    """
+    Ablehnungsgrund je Messwert in Eingabereihenfolge ("" = plausibel), vektorisiert über den ganzen Batch.
+    Reihenfolge der Prüfungen: Messbereich, dann Ausreißer und hängende Werte unter den Werten im Messbereich.
+    Der Anker wird nur verwendet, wenn er älter als der gesamte Batch ist und der Batch direkt anschließt
+    (höchstens MAX_ANCHOR_GAP nach dem Anker beginnt).
+    """
+    n = len(values)
+    reasons = np.full(n, "", dtype=object)
+    if n == 0:
+        return reasons
+
+    order = np.argsort(timestamps, kind="stable")
+    seconds = timestamps[order].astype("datetime64[ns]").astype("int64") / 1e9
+    sorted_values = values[order]
+    sorted_reasons = np.full(n, "", dtype=object)
+
+    in_range = np.ones(n, dtype=bool)
+    if rule.min_value is not None:
+        in_range &= sorted_values >= rule.min_value
+    if rule.max_value is not None:
+        in_range &= sorted_values <= rule.max_value
+    sorted_reasons[~in_range] = REASON_RANGE
+
+    idx = np.flatnonzero(in_range)
+    if len(idx) == 0:
+        reasons[order] = sorted_reasons
+        return reasons
+    use_anchor = anchor_precedes(anchor, timestamps[order[0]])
+    t, x = seconds[idx], sorted_values[idx]
+
+    if rule.max_rate_per_minute is not None:
+        if use_anchor:
+            t_ext = np.concatenate(([anchor.timestamp.astype("datetime64[ns]").astype("int64") / 1e9], t))
+            x_ext = np.concatenate(([anchor.value], x))
+        else:
+            t_ext, x_ext = t, x
+        delta = np.diff(x_ext)
+        # Mindestabstand 1 s, doppelte Zeitstempel führen sonst zu unendlichen Raten
+        too_fast = np.abs(delta) / np.maximum(np.diff(t_ext), 1.0) * 60.0 > rule.max_rate_per_minute
+        spike = np.zeros(len(x_ext), dtype=bool)
+        # Ausreißer: steiler Sprung hin und zurück (Vorzeichenwechsel), ein steiler Pegelwechsel bleibt erhalten
+        spike[1:-1] = too_fast[:-1] & too_fast[1:] & (delta[:-1] * delta[1:] < 0)
+        if use_anchor:
+            spike = spike[1:]
+        sorted_reasons[idx[spike]] = REASON_SPIKE
+
+    if rule.stuck_minutes is not None:
+        if use_anchor:
+            t_ext = np.concatenate(([anchor.run_started_at.astype("datetime64[ns]").astype("int64") / 1e9], t))
+            x_ext = np.concatenate(([anchor.value], x))
+        else:
+            t_ext, x_ext = t, x
+        new_run = np.empty(len(x_ext), dtype=bool)
+        new_run[0] = True
+        new_run[1:] = x_ext[1:] != x_ext[:-1]
+        run_start = t_ext[new_run][np.cumsum(new_run) - 1]
+        stuck = t_ext - run_start >= rule.stuck_minutes * 60.0
+        if use_anchor:
+            stuck = stuck[1:]
+        stuck &= sorted_reasons[idx] == ""
+        sorted_reasons[idx[stuck]] = REASON_STUCK
+
+    reasons[order] = sorted_reasons
+    return reasons
+
+
+def anchor_precedes(anchor: PlausibilityAnchor | None, earliest: np.datetime64) -> bool:
+    """ Anker liegt vor dem Batch und höchstens MAX_ANCHOR_GAP davor. """
+    if anchor is None or anchor.timestamp >= earliest:
+        return False
+    return earliest - anchor.timestamp <= np.timedelta64(int(MAX_ANCHOR_GAP.total_seconds()), "s")
+
+
+def _to_datetime64(value: datetime) -> np.datetime64:
+    """ TZ-aware datetime -> naive datetime64[ns] in UTC, wie in ParsedMeasurements. """
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert("UTC").tz_localize(None)
+    return ts.to_datetime64().astype("datetime64[ns]")
+
+
+def anchor_from_context(context: Dict[str, Any] | None) -> PlausibilityAnchor | None:
+    """ Anker aus CRUDSensorData.get_plausibility_context, None ohne gespeicherten Messwert. """
+    if not context or context.get("last_timestamp") is None:
+        return None
+    last_ts = _to_datetime64(context["last_timestamp"])
+    run_started_at = context.get("run_started_at")
+    return PlausibilityAnchor(
+        timestamp=last_ts,
+        value=float(context["last_value"]),
+        run_started_at=_to_datetime64(run_started_at) if run_started_at is not None else last_ts
+    )
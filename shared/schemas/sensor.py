@@ -16,6 +16,9 @@ class SensorBoxBase(BaseModel):
 
 class SensorBoxCreate(SensorBoxBase):
     box_id: str
+    metadata_hash: Optional[str] = None
+    metadata_etag: Optional[str] = None
+    metadata_last_modified: Optional[str] = None
 
 class SensorBoxUpdate(SensorBoxBase):
     model_config = ConfigDict(from_attributes=True)
@@ -63,7 +66,6 @@ class SensorDataCreate(SensorDataBase):
 
 class SensorData(SensorDataBase):
     model_config = ConfigDict(from_attributes=True) # Füge diese Zeile hinzu
-    id: int
 
 
 # Schemas für Listen von Objekten
@@ -130,3 +132,14 @@ class SensorDataAggregatedResponse(BaseModel):
     aggregation_type: str 
     interval: str 
     aggregated_data: List[SensorDataAggregatedPoint]
+
+
+class SensorDataIngestResult(BaseModel):
+    """ Antwortschema des Push-Endpunkts: Zählwerte eines gebatchten Uploads """
+    received: int                   # Zeilen im Request
+    accepted: int                   # Zeilen nach Validierung
+    inserted: int                   # Tatsächlich geschriebene Zeilen (Duplikate je nach on_conflict nicht mitgezählt)
+    rejected_invalid: int           # Ungültige sensor_id, Zeitstempel oder Wert
+    rejected_unknown_sensor: int    # Sensor existiert nicht in der Datenbank
+    rejected_implausible: int = 0   # Unplausibel (shared/plausibility.py), nach sensor_data_rejected verschoben
+    unknown_sensor_ids: List[str] = [] # Auszug der unbekannten Sensor-IDs
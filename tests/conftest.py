@@ -0,0 +1,14 @@
+# tests/conftest.py
+
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Die Module des ml_service importieren sich wie im Container als utils.* / tasks.*, shared liegt im Repo-Root
+sys.path.insert(0, os.path.join(ROOT, "services", "ml_service"))
+sys.path.insert(0, ROOT)
+
+# utils.config verlangt die DB-Zugangsdaten, die Unit-Tests öffnen keine Verbindung
+for name in ("DB_USER", "DB_PASSWORD", "DB_HOST", "DB_NAME"):
+    os.environ.setdefault(name, "test")
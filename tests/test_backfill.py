@@ -0,0 +1,53 @@
+# tests/test_backfill.py
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("prefect")
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("httpx")
+
+from shared.crud.crud_sensor import _contiguous_through  # noqa: E402
+from tasks.backfill import split_into_partitions  # noqa: E402
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _day(n):
+    return START + timedelta(days=n)
+
+
+def test_partitions_are_contiguous_and_clipped():
+    partitions = split_into_partitions({"s": (START, _day(75))}, 30)
+    assert partitions == [("s", _day(0), _day(30)), ("s", _day(30), _day(60)), ("s", _day(60), _day(75))]
+
+
+def test_partitions_per_sensor_window():
+    partitions = split_into_partitions({"a": (_day(0), _day(10)), "b": (_day(5), _day(10))}, 7.5)
+    assert partitions == [
+        ("a", _day(0), _day(7.5)),
+        ("a", _day(7.5), _day(10)),
+        ("b", _day(5), _day(10)),
+    ]
+
+
+def test_empty_window_has_no_partitions():
+    assert split_into_partitions({"s": (START, START)}, 30) == []
+    assert split_into_partitions({}, 30) == []
+
+
+def test_contiguous_through_stops_at_gap():
+    partitions = [(_day(0), _day(30)), (_day(30), _day(60)), (_day(90), _day(120))]
+    assert _contiguous_through(START, partitions) == _day(60)
+
+
+def test_contiguous_through_without_first_partition():
+    assert _contiguous_through(START, [(_day(30), _day(60))]) == START
+    assert _contiguous_through(START, []) == START
+
+
+def test_contiguous_through_overlapping_partitions():
+    # Partitionen eines früheren Laufs mit anderer Partitionsgröße
+    partitions = [(_day(0), _day(20)), (_day(10), _day(40)), (_day(30), _day(45))]
+    assert _contiguous_through(START, partitions) == _day(45)
@@ -0,0 +1,87 @@
+# tests/test_chunk_planner.py
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("prefect")
+pytest.importorskip("sqlalchemy")
+
+from utils.chunk_planner import AdaptiveChunkPlanner  # noqa: E402
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _planner(ranges, points_per_day=None, **kwargs):
+    kwargs.setdefault("default_days", 2.0)
+    kwargs.setdefault("target_points", 10000)
+    kwargs.setdefault("min_days", 0.5)
+    kwargs.setdefault("max_days", 30.0)
+    return AdaptiveChunkPlanner(ranges, points_per_day, **kwargs)
+
+
+def _result(sensor_id, chunk_from, chunk_to, points_received=0, success=True):
+    return {
+        "sensor_id": sensor_id,
+        "chunk_from": chunk_from,
+        "chunk_to": chunk_to,
+        "points_received": points_received,
+        "success": success
+    }
+
+
+def test_window_days_from_density():
+    planner = _planner({"dense": (START, START), "sparse": (START, START), "empty": (START, START)},
+                       {"dense": 100000.0, "sparse": 100.0, "empty": 0.0})
+    assert planner.window_days("dense") == 0.5    # 0.1 Tage, begrenzt auf min_days
+    assert planner.window_days("sparse") == 30.0  # 100 Tage, begrenzt auf max_days
+    assert planner.window_days("empty") == 30.0
+    assert planner.window_days("unknown") == 2.0  # ohne Schätzung default_days
+
+
+def test_window_days_without_adaptive():
+    planner = _planner({"s": (START, START)}, {"s": 100000.0}, adaptive=False)
+    assert planner.window_days("s") == 2.0
+
+
+def test_rounds_cover_range_without_gaps():
+    end = START + timedelta(days=5)
+    planner = _planner({"s": (START, end)}, {"s": 5000.0})  # 2 Tage pro Chunk
+    chunks = []
+    while planner.has_remaining():
+        chunks.extend(planner.next_round())
+    assert chunks == [
+        ("s", START, START + timedelta(days=2)),
+        ("s", START + timedelta(days=2), START + timedelta(days=4)),
+        ("s", START + timedelta(days=4), end),
+    ]
+
+
+def test_completed_advances_only_contiguously():
+    planner = _planner({"s": (START, START + timedelta(days=10))}, {"s": 5000.0})
+    (_, first_from, first_to), = planner.next_round()
+    (_, second_from, second_to), = planner.next_round()
+
+    planner.observe(_result("s", second_from, second_to))
+    assert planner.completed_by_sensor() == {"s": START}
+    planner.observe(_result("s", first_from, first_to))
+    assert planner.completed_by_sensor() == {"s": first_to}
+
+
+def test_failed_chunk_stops_sensor():
+    planner = _planner({"a": (START, START + timedelta(days=10)), "b": (START, START + timedelta(days=10))},
+                       {"a": 5000.0, "b": 5000.0})
+    planned = planner.next_round()
+    planner.observe(_result("a", *planned[0][1:], success=False))
+    planner.observe(_result("b", *planned[1][1:], points_received=10000))
+
+    assert [sensor_id for sensor_id, _, _ in planner.next_round()] == ["b"]
+    assert planner.failed_sensor_ids == {"a"}
+    assert planner.fetched_through() == START
+
+
+def test_observe_updates_density_estimate():
+    planner = _planner({"s": (START, START + timedelta(days=10))}, {"s": 5000.0})
+    planner.observe(_result("s", START, START + timedelta(days=2), points_received=30000))
+    # (5000 + 15000) / 2 Punkte pro Tag
+    assert planner.window_days("s") == pytest.approx(1.0)
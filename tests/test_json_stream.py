@@ -0,0 +1,68 @@
+# tests/test_json_stream.py
+
+import asyncio
+import json
+
+import pytest
+
+from utils.json_stream import JSONArrayStreamParser, iter_json_array
+
+DOCUMENT = '[{"value": "12.5", "createdAt": "2024-01-01T00:00:00.000Z"}, {"nested": [1, 2, {"a": "]"}]}, 123, "x,y", true, null]'
+
+
+def _parse_in_pieces(pieces):
+    parser = JSONArrayStreamParser()
+    items = []
+    for piece in pieces:
+        items.extend(parser.feed(piece))
+    items.extend(parser.close())
+    return items
+
+
+@pytest.mark.parametrize("split", range(len(DOCUMENT) + 1))
+def test_split_at_every_position(split):
+    assert _parse_in_pieces([DOCUMENT[:split], DOCUMENT[split:]]) == json.loads(DOCUMENT)
+
+
+def test_single_characters():
+    assert _parse_in_pieces(list(DOCUMENT)) == json.loads(DOCUMENT)
+
+
+def test_number_at_buffer_end_waits_for_more_data():
+    parser = JSONArrayStreamParser()
+    assert parser.feed("[1, 12") == [1]
+    assert parser.feed("3]") == [123]
+    assert parser.close() == []
+
+
+def test_elements_are_returned_as_soon_as_complete():
+    parser = JSONArrayStreamParser()
+    assert parser.feed('[{"a": 1}, {"b"') == [{"a": 1}]
+    assert parser.feed(': 2}]') == [{"b": 2}]
+
+
+def test_empty_array():
+    assert _parse_in_pieces(["[", " ", "]"]) == []
+
+
+@pytest.mark.parametrize("pieces", [["[1, 2"], ['[{"a": 1}'], [""]])
+def test_incomplete_stream_raises(pieces):
+    with pytest.raises(ValueError):
+        _parse_in_pieces(pieces)
+
+
+@pytest.mark.parametrize("text", ['{"a": 1}', "[1 2]", "[1]]"])
+def test_invalid_structure_raises(text):
+    with pytest.raises(ValueError):
+        _parse_in_pieces([text])
+
+
+def test_iter_json_array():
+    async def chunks():
+        for start in range(0, len(DOCUMENT), 7):
+            yield DOCUMENT[start:start + 7]
+
+    async def collect():
+        return [item async for item in iter_json_array(chunks())]
+
+    assert asyncio.run(collect()) == json.loads(DOCUMENT)
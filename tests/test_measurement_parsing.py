@@ -0,0 +1,66 @@
+# tests/test_measurement_parsing.py
+
+from datetime import datetime, timezone
+
+import numpy as np
+
+from utils.measurement_parsing import parse_measurements
+
+
+def _ts(text):
+    return np.datetime64(text, "ns")
+
+
+def test_z_timestamps_fast_path():
+    parsed = parse_measurements([
+        {"createdAt": "2024-03-01T12:00:00.000Z", "value": "21.5"},
+        {"createdAt": "2024-03-01T12:01:00.250Z", "value": 22},
+    ])
+    assert parsed.timestamps.dtype == np.dtype("datetime64[ns]")
+    assert list(parsed.timestamps) == [_ts("2024-03-01T12:00:00"), _ts("2024-03-01T12:01:00.250")]
+    assert list(parsed.values) == [21.5, 22.0]
+    assert parsed.invalid_count == 0
+
+
+def test_offset_timestamps_are_converted_to_utc():
+    parsed = parse_measurements([
+        {"createdAt": "2024-03-01T13:00:00+01:00", "value": "1"},
+        {"createdAt": "2024-03-01T07:30:00-04:30", "value": "2"},
+    ])
+    assert list(parsed.timestamps) == [_ts("2024-03-01T12:00:00"), _ts("2024-03-01T12:00:00")]
+
+
+def test_z_and_offset_mixed_give_same_instant():
+    parsed = parse_measurements([
+        {"createdAt": "2024-03-01T12:00:00.000Z", "value": "1"},
+        {"createdAt": "2024-03-01T14:00:00.000+02:00", "value": "2"},
+    ])
+    assert parsed.timestamps[0] == parsed.timestamps[1] == _ts("2024-03-01T12:00:00")
+
+
+def test_invalid_rows_are_counted_and_dropped():
+    parsed = parse_measurements([
+        {"createdAt": "2024-03-01T12:00:00.000Z", "value": "1"},
+        {"createdAt": "kein Datum", "value": "2"},
+        {"createdAt": "2024-03-01T12:02:00.000Z", "value": "NaN"},
+        {"createdAt": "2024-03-01T12:03:00.000Z", "value": "abc"},
+        {"createdAt": None, "value": "4"},
+        "kein Objekt",
+    ])
+    assert list(parsed.values) == [1.0]
+    assert parsed.invalid_count == 5
+
+
+def test_earliest_and_latest_are_utc_aware():
+    parsed = parse_measurements([
+        {"createdAt": "2024-03-01T12:05:00.000Z", "value": "1"},
+        {"createdAt": "2024-03-01T12:00:00.000Z", "value": "2"},
+    ])
+    assert parsed.earliest_timestamp() == datetime(2024, 3, 1, 12, 0, tzinfo=timezone.utc)
+    assert parsed.latest_timestamp() == datetime(2024, 3, 1, 12, 5, tzinfo=timezone.utc)
+
+
+def test_empty_batch():
+    parsed = parse_measurements([])
+    assert len(parsed) == 0
+    assert parsed.latest_timestamp() is None
@@ -0,0 +1,132 @@
+# tests/test_plausibility.py
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from shared.plausibility import (
+    MAX_ANCHOR_GAP,
+    REASON_RANGE,
+    REASON_SPIKE,
+    REASON_STUCK,
+    PlausibilityAnchor,
+    anchor_from_context,
+    anchor_precedes,
+    classify_measurements,
+    rule_for_unit
+)
+from utils.measurement_parsing import ParsedMeasurements
+from utils.plausibility import PlausibilityFilter
+
+T0 = np.datetime64("2024-03-01T12:00:00", "ns")
+TEMPERATURE = rule_for_unit("°C")  # -50 … 60, 5 °C/min, hängend ab 6 h
+
+
+def _minutes(*offsets):
+    return np.array([T0 + np.timedelta64(int(m * 60), "s") for m in offsets], dtype="datetime64[ns]")
+
+
+def _values(*values):
+    return np.array(values, dtype="float64")
+
+
+def test_rule_for_unit_normalizes_micro_sign():
+    assert rule_for_unit("μg/m³") == rule_for_unit("µg/m³")
+    assert rule_for_unit("unbekannt") is None
+    assert rule_for_unit(None) is None
+
+
+def test_range():
+    reasons = classify_measurements(_minutes(0, 1, 2), _values(20.0, -999.0, 61.0), TEMPERATURE)
+    assert list(reasons) == ["", REASON_RANGE, REASON_RANGE]
+
+
+def test_spike_is_rejected():
+    reasons = classify_measurements(_minutes(0, 1, 2, 3, 4), _values(20.0, 20.0, 35.0, 20.0, 20.0), TEMPERATURE)
+    assert list(reasons) == ["", "", REASON_SPIKE, "", ""]
+
+
+def test_level_shift_is_kept():
+    reasons = classify_measurements(_minutes(0, 1, 2, 3, 4), _values(20.0, 20.0, 35.0, 35.0, 35.0), TEMPERATURE)
+    assert list(reasons) == [""] * 5
+
+
+def test_slow_change_is_not_a_spike():
+    reasons = classify_measurements(_minutes(0, 10, 20), _values(20.0, 35.0, 20.0), TEMPERATURE)
+    assert list(reasons) == [""] * 3
+
+
+def test_reasons_follow_input_order():
+    reasons = classify_measurements(_minutes(4, 3, 2, 1, 0), _values(20.0, 20.0, 35.0, 20.0, 20.0), TEMPERATURE)
+    assert list(reasons) == ["", "", REASON_SPIKE, "", ""]
+
+
+def test_stuck_from_threshold_on():
+    offsets = np.arange(0, 8 * 60 + 1, 60)  # stündlich über 8 h
+    reasons = classify_measurements(_minutes(*offsets), np.full(len(offsets), 21.0), TEMPERATURE)
+    assert list(reasons) == [""] * 6 + [REASON_STUCK] * 3
+
+
+def test_changing_value_restarts_stuck_run():
+    reasons = classify_measurements(_minutes(0, 300, 330, 420), _values(21.0, 21.0, 21.5, 21.5), TEMPERATURE)
+    assert list(reasons) == [""] * 4
+
+
+def _anchor(offset_minutes, value, run_minutes=0.0):
+    timestamp = T0 + np.timedelta64(int(offset_minutes * 60), "s")
+    return PlausibilityAnchor(timestamp, value, timestamp - np.timedelta64(int(run_minutes * 60), "s"))
+
+
+def test_anchor_detects_spike_at_batch_start():
+    timestamps, values = _minutes(1, 2), _values(35.0, 20.0)
+    assert list(classify_measurements(timestamps, values, TEMPERATURE)) == ["", ""]
+    assert list(classify_measurements(timestamps, values, TEMPERATURE, _anchor(0, 20.0))) == [REASON_SPIKE, ""]
+
+
+def test_anchor_continues_stuck_run():
+    anchor = _anchor(0, 21.0, run_minutes=350)
+    reasons = classify_measurements(_minutes(5, 15), _values(21.0, 21.0), TEMPERATURE, anchor)
+    assert list(reasons) == ["", REASON_STUCK]
+
+
+def test_anchor_gap_breaks_stuck_run():
+    gap = MAX_ANCHOR_GAP.total_seconds() / 60
+    anchor = _anchor(0, 21.0, run_minutes=400)
+    assert list(classify_measurements(_minutes(gap), _values(21.0), TEMPERATURE, anchor)) == [REASON_STUCK]
+    assert list(classify_measurements(_minutes(gap + 1), _values(21.0), TEMPERATURE, anchor)) == [""]
+
+
+def test_anchor_after_batch_start_is_ignored():
+    anchor = _anchor(10, 21.0, run_minutes=400)
+    reasons = classify_measurements(_minutes(5, 15), _values(21.0, 21.0), TEMPERATURE, anchor)
+    assert list(reasons) == ["", ""]
+
+
+def test_anchor_precedes():
+    anchor = _anchor(0, 20.0)
+    assert anchor_precedes(anchor, _minutes(30)[0])
+    assert not anchor_precedes(anchor, _minutes(31)[0])
+    assert not anchor_precedes(anchor, _minutes(0)[0])
+    assert not anchor_precedes(None, _minutes(1)[0])
+
+
+def test_anchor_from_context():
+    last = datetime(2024, 3, 1, 13, 0, tzinfo=timezone(timedelta(hours=1)))
+    anchor = anchor_from_context({"unit": "°C", "last_timestamp": last, "last_value": 20, "run_started_at": None})
+    assert anchor == PlausibilityAnchor(T0, 20.0, T0)
+    assert anchor_from_context({"unit": "°C", "last_timestamp": None}) is None
+    assert anchor_from_context(None) is None
+
+
+def test_filter_carries_anchor_across_batches():
+    plausibility_filter = PlausibilityFilter(TEMPERATURE)
+    first = ParsedMeasurements(_minutes(0, 1), _values(20.0, 20.0), 0)
+    second = ParsedMeasurements(_minutes(2, 3), _values(35.0, 20.0), 0)
+
+    accepted, rejected = plausibility_filter.apply(first)
+    assert len(accepted) == 2 and len(rejected) == 0
+    assert plausibility_filter.anchor.timestamp == _minutes(1)[0]
+
+    accepted, rejected = plausibility_filter.apply(second)
+    assert list(accepted.values) == [20.0]
+    assert list(rejected.reasons) == [REASON_SPIKE]
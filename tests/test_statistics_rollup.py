@@ -0,0 +1,104 @@
+# tests/test_statistics_rollup.py
+#
+# Kennzahlen aus den Rollups (get_statistics_by_sensor_id) gegen einen Scan der Rohdaten (_get_statistics_from_raw)
+# auf einer echten TimescaleDB mit allen Migrationen. Läuft nur mit TEST_DATABASE_URL, schreibt einen eigenen
+# Sensor mit synthetischen Messwerten und entfernt ihn danach wieder.
+
+import math
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from shared.crud import crud_sensor  # noqa: E402
+from shared.models import sensor as sensor_model  # noqa: E402
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL nicht gesetzt")
+
+DAYS = 9
+INTERVAL = timedelta(minutes=10)
+REL_TOLERANCE = {"average_value": 1e-9, "stddev_value": 1e-6}
+
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = create_engine(TEST_DATABASE_URL)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture(scope="module")
+def sensor(db, engine):
+    """ Sensor mit Messwerten alle 10 Minuten über DAYS Tage ab Mitternacht (UTC) vor 20 Tagen, Rollups aktualisiert. """
+    data_from = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=20)
+    data_to = data_from + timedelta(days=DAYS)
+    retained_from = crud_sensor.sensor_data_retention.get_retained_from(db)
+    if retained_from is not None and data_from < retained_from:
+        pytest.skip(f"Aufbewahrungshorizont {retained_from} liegt nach dem Testzeitraum")
+
+    box_id, sensor_id = uuid.uuid4().hex[:24], uuid.uuid4().hex[:24]
+    now = datetime.now(timezone.utc)
+    db.add(sensor_model.SensorBox(box_id=box_id, name=f"test-{box_id}", createdAt=now, updatedAt=now))
+    db.add(sensor_model.Sensor(sensor_id=sensor_id, box_id=box_id, sensor_type="test", unit="°C"))
+    db.commit()
+
+    # Naive UTC-Zeitstempel wie in ParsedMeasurements
+    timestamps = np.arange(data_from.replace(tzinfo=None), data_to.replace(tzinfo=None), INTERVAL, dtype="datetime64[ns]")
+    values = np.random.default_rng(7).normal(20.0, 5.0, len(timestamps)).round(2)
+    crud_sensor.sensor_data.create_multi_columnar(db, sensor_id=sensor_id, measurement_timestamps=timestamps, values=values)
+    crud_sensor.continuous_aggregate.refresh(engine, window_start=data_from, window_end=data_to, retained_from=retained_from)
+
+    yield sensor_id, data_from
+
+    db.rollback()
+    db.execute(text("DELETE FROM sensor_data WHERE sensor_key = (SELECT sensor_key FROM sensor WHERE sensor_id = :sensor_id)"), {"sensor_id": sensor_id})
+    db.execute(text("DELETE FROM sensor WHERE sensor_id = :sensor_id"), {"sensor_id": sensor_id})
+    db.execute(text("DELETE FROM sensor_box WHERE box_id = :box_id"), {"box_id": box_id})
+    db.commit()
+    crud_sensor.continuous_aggregate.refresh(engine, window_start=data_from, window_end=data_to, retained_from=retained_from)
+
+
+@pytest.mark.parametrize("offset, span", [
+    (timedelta(hours=3), timedelta(days=7, hours=5)),     # ganze Tage aus dem Rollup, Randtage aus den Rohdaten
+    (timedelta(days=1), timedelta(days=3)),               # Grenzen auf Tagesgrenzen, kein Randtag
+    (timedelta(hours=2), timedelta(hours=18)),            # kein ganzer Tag, nur Rohdaten
+    (timedelta(days=-1, hours=5), timedelta(days=12)),    # über den Datenbestand hinaus
+    (timedelta(days=4, minutes=5), timedelta(days=1)),    # genau ein Tag, nicht auf der Tagesgrenze
+])
+def test_statistics_match_raw_scan(db, sensor, offset, span):
+    sensor_id, data_from = sensor
+    params = dict(sensor_id=sensor_id, from_date=data_from + offset, to_date=data_from + offset + span)
+
+    raw = crud_sensor.sensor_data._get_statistics_from_raw(db, **params)
+    rollup = crud_sensor.sensor_data.get_statistics_by_sensor_id(db, **params)
+
+    assert int(rollup["count"]) == int(raw["count"]) > 0
+    for key in ("average_value", "min_value", "max_value", "stddev_value"):
+        assert math.isclose(
+            float(rollup[key]), float(raw[key]), rel_tol=REL_TOLERANCE.get(key, 0.0), abs_tol=1e-9
+        ), f"{key}: {rollup[key]} statt {raw[key]}"
+
+
+def test_statistics_without_values(db, sensor):
+    sensor_id, data_from = sensor
+    params = dict(sensor_id=sensor_id, from_date=data_from + timedelta(days=DAYS + 1), to_date=data_from + timedelta(days=DAYS + 3))
+
+    rollup = crud_sensor.sensor_data.get_statistics_by_sensor_id(db, **params)
+
+    assert int(rollup["count"]) == 0
+    assert rollup["average_value"] is None and rollup["stddev_value"] is None